@@ -1,100 +1,210 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, g, Response
 from flask_cors import CORS
-from flask_mail import Mail
 from routes.ai import ai
 from routes.applicants import applicants
 from routes.jobs import jobs
 from routes.auth import auth
+from routes.search import search
+from utils.task_queue import start_workers, get_queue, TASK_QUEUE_BACKEND, RESUME_WORKER_MODE
+from utils.analysis_cache import get_analysis_cache
+from utils.mailer import start_outbox_sender, outbox_stats, mail_configured, ACCOUNTS, SMTP_HOST, SMTP_PORT
+from utils.db import ensure_indexes, pool_stats
+from utils.llm import llm_stats
+from utils.blob_store import BLOB_STORE, default_codec
+from utils.rematch import resume_rematch_runs
+from utils.search_index import start_search_sync
+from utils.metrics import HTTP_REQUEST_SECONDS, Gauge, render as render_metrics, CONTENT_TYPE, start_trace, end_trace
+from utils.log import get_logger
 from dotenv import load_dotenv
-import os
-import google.generativeai as genai
+import logging, os, threading, time
 
 # ---------------- Load Environment FIRST ----------------
 load_dotenv()
 
-# ---------------- Flask App Setup ----------------
-app = Flask(__name__)
-CORS(app)
-
-# ---------------- Flask-Mail Config ----------------
-app.config["MAIL_SERVER"] = "smtp.gmail.com"
-app.config["MAIL_PORT"] = 587
-app.config["MAIL_USE_TLS"] = True
-app.config["MAIL_USERNAME"] = os.getenv("MAIL_USERNAME")
-app.config["MAIL_PASSWORD"] = os.getenv("MAIL_PASSWORD")
-
-mail = Mail(app)
-app.extensions["mail"] = mail  # accessible via current_app.extensions['mail']
+log = get_logger("app")
 
 # ---------------- Gemini Setup ----------------
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-print("\n" + "="*50)
-print("🚀 AI HR System - Startup Configuration")
-print("="*50)
-
-# Check GEMINI_API_KEY
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    print(f"✅ Gemini API Key: Loaded (starts with: {GEMINI_API_KEY[:15]}...)")
-else:
-    print("❌ GEMINI_API_KEY: NOT FOUND")
-    print("   Please check your .env file")
-
-# Check Mail Configuration
-if app.config["MAIL_USERNAME"]:
-    print(f"✅ Mail Username: {app.config['MAIL_USERNAME']}")
-else:
-    print("❌ MAIL_USERNAME: NOT FOUND")
-
-if app.config["MAIL_PASSWORD"]:
-    print(f"✅ Mail Password: Loaded (length: {len(app.config['MAIL_PASSWORD'])} chars)")
-else:
-    print("❌ MAIL_PASSWORD: NOT FOUND")
-
-print("="*50 + "\n")
-
-# ---------------- Register Blueprints ----------------
-app.register_blueprint(jobs, url_prefix="/api")
-app.register_blueprint(applicants, url_prefix="/api")
-app.register_blueprint(ai, url_prefix="/api")
-app.register_blueprint(auth, url_prefix="/api")
-
-print("📋 Registered Routes:")
-print("-" * 50)
-for rule in app.url_map.iter_rules():
-    if rule.endpoint != 'static':
-        print(f"  {rule.methods} {rule.rule} -> {rule.endpoint}")
-print("-" * 50 + "\n")
-
-# ---------------- Health Route ----------------
-@app.route("/")
-def home():
-    return jsonify({
-        "message": "AI HR System backend is running",
-        "status": "healthy",
-        "gemini_configured": bool(GEMINI_API_KEY),
-        "mail_configured": bool(app.config["MAIL_USERNAME"] and app.config["MAIL_PASSWORD"])
-    }), 200
-
-@app.route("/api/health")
-def health_check():
-    """Detailed health check endpoint"""
-    return jsonify({
-        "status": "running",
-        "gemini_api": "configured" if GEMINI_API_KEY else "missing",
-        "mail_service": "configured" if app.config["MAIL_USERNAME"] else "missing",
-        "routes": {
-            "jobs": "registered",
-            "applicants": "registered",
-            "ai": "registered",
-            "auth": "registered"
+# Only used by `python app.py`; production runs under gunicorn (gunicorn.conf.py)
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "true").lower() == "true"
+PORT = int(os.getenv("PORT", "5000"))
+
+Gauge("hr_task_queue_depth", "Tasks waiting in the background queue", func=lambda: get_queue().size())
+
+
+# ---------------- Startup Tasks ----------------
+def run_startup_tasks(resume_runs):
+    """Mongo work that used to block startup; runs in a thread so the first request is not kept waiting."""
+    try:
+        ensure_indexes()
+    except Exception as e:
+        log.error("Failed to create MongoDB indexes", extra={"error": str(e)})
+    if resume_runs:
+        try:
+            resume_rematch_runs()
+        except Exception:
+            log.exception("Failed to resume re-match runs")
+
+def health_section(name, func):
+    """One stats block of /api/health; "unavailable" instead of a 500 when its backend (usually Mongo) is down."""
+    try:
+        return func()
+    except Exception as e:
+        log.warning("health check section failed", extra={"section": name, "error": str(e)})
+        return "unavailable"
+
+# ---------------- App Factory ----------------
+def create_app(start_background=True):
+    """Build the Flask app.
+
+    ``start_background`` starts the in-process resume workers, the outbox
+    sender and the search index sync. Under gunicorn every worker process builds its own app, so each
+    gets its own threads (and Mongo client, created on first use).
+
+    Nothing here talks to Mongo or Gemini: index creation runs in a
+    background thread, and the SDKs and document parsers are imported on
+    first use.
+    """
+    app = Flask(__name__)
+    CORS(app)
+
+    # Email goes through utils/mailer.py (outbox + pooled SMTP); its settings are the only mail config
+    mail_username, mail_password = ACCOUNTS["default"]
+    log.info("startup configuration", extra={
+        "gemini_api_key": "loaded" if GEMINI_API_KEY else "missing",
+        "smtp_server": f"{SMTP_HOST}:{SMTP_PORT}",
+        "mail_username": mail_username or "missing",
+        "mail_password": "loaded" if mail_password else "missing",
+    })
+    if not GEMINI_API_KEY:
+        log.error("GEMINI_API_KEY not found, check the .env file")
+    if not mail_configured():
+        log.warning("Mail credentials missing, emails cannot be sent")
+
+    # ---------------- Register Blueprints ----------------
+    app.register_blueprint(jobs, url_prefix="/api")
+    app.register_blueprint(applicants, url_prefix="/api")
+    app.register_blueprint(ai, url_prefix="/api")
+    app.register_blueprint(auth, url_prefix="/api")
+    app.register_blueprint(search, url_prefix="/api")
+
+    if log.isEnabledFor(logging.DEBUG):
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint != 'static':
+                log.debug("route registered", extra={"methods": sorted(rule.methods), "rule": rule.rule, "endpoint": rule.endpoint})
+
+    # ---------------- Background Workers ----------------
+    resume_runs = False
+    if start_background:
+        resume_runs = bool(start_workers(app))
+        start_outbox_sender()
+        start_search_sync()
+
+    # ---------------- Mongo Indexes ----------------
+    threading.Thread(target=run_startup_tasks, args=(resume_runs,), name="startup-tasks", daemon=True).start()
+
+    # ---------------- Request Metrics ----------------
+    @app.before_request
+    def begin_request_timing():
+        g.request_started = time.perf_counter()
+        g.trace_token = start_trace()
+
+    @app.after_request
+    def record_request_timing(response):
+        # Streamed responses are timed up to their first byte
+        started = g.pop("request_started", None)
+        token = g.pop("trace_token", None)
+        if started is None or token is None:
+            return response
+        elapsed = time.perf_counter() - started
+        stages = end_trace(token)
+        endpoint = request.endpoint or "unmatched"
+        HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint, status=response.status_code)
+        if endpoint != "metrics":
+            log.info("request", extra={
+                "method": request.method,
+                "path": request.path,
+                "endpoint": endpoint,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "stages": stages,
+            })
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus scrape endpoint."""
+        return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+    # ---------------- Health Route ----------------
+    @app.route("/")
+    def home():
+        return jsonify({
+            "message": "AI HR System backend is running",
+            "status": "healthy",
+            "gemini_configured": bool(GEMINI_API_KEY),
+            "mail_configured": mail_configured()
+        }), 200
+
+    @app.route("/api/health")
+    def health_check():
+        """Detailed health check endpoint; reports "degraded" rather than failing when Mongo is down"""
+        queued = health_section("task_queue", lambda: get_queue().size())
+        sections = {
+            "analysis_cache": health_section("analysis_cache", lambda: get_analysis_cache().snapshot()),
+            "outbox": health_section("outbox", outbox_stats),
+            "mongo_pool": health_section("mongo_pool", pool_stats),
+            "llm": health_section("llm", llm_stats),
         }
-    }), 200
+        degraded = queued == "unavailable" or "unavailable" in sections.values()
+        return jsonify({
+            "status": "degraded" if degraded else "running",
+            "gemini_api": "configured" if GEMINI_API_KEY else "missing",
+            "mail_service": "configured" if mail_configured() else "missing",
+            "routes": {
+                "jobs": "registered",
+                "applicants": "registered",
+                "ai": "registered",
+                "auth": "registered",
+                "search": "registered"
+            },
+            "server": {
+                "pid": os.getpid(),
+                # Set by asgi.py when the LLM routes are served on the event loop
+                "mode": app.config.get("SERVER_MODE", "sync"),
+            },
+            "task_queue": {
+                "backend": TASK_QUEUE_BACKEND,
+                "worker_mode": RESUME_WORKER_MODE,
+                "queued": queued
+            },
+            "analysis_cache": sections["analysis_cache"],
+            "outbox": sections["outbox"],
+            "blob_store": {"backend": BLOB_STORE, "codec": default_codec()},
+            "mongo_pool": sections["mongo_pool"],
+            "llm": sections["llm"]
+        }), 200
+
+    return app
+
+
+_app_lock = threading.Lock()
+
+def __getattr__(name):
+    # `gunicorn app:app`, `flask run` and `from app import app` build the app on
+    # first access, so importing create_app alone has no side effects
+    if name == "app":
+        global app
+        with _app_lock:
+            if "app" not in globals():
+                app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    print("🌐 Starting Flask server on http://localhost:5000")
-    print("📍 API endpoints available at /api/*")
-    print("\n")
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    app = create_app()
+    log.info(f"Starting Flask development server on http://localhost:{PORT} (API under /api/*); "
+             "use gunicorn -c gunicorn.conf.py in production")
+    app.run(host="0.0.0.0", port=PORT, debug=FLASK_DEBUG)
@@ -0,0 +1,205 @@
+"""ASGI entry point.
+
+    uvicorn asgi:app --port 5000
+    SERVER_MODE=async gunicorn -c gunicorn.conf.py
+
+The routes that do nothing but wait on Gemini (``POST /api/generate-jd`` and
+``POST /api/generate-jd/stream``) run directly on the event loop with
+``generate_async``, so one worker process keeps hundreds of calls in flight
+instead of one per thread. Everything else is the regular Flask app, run on
+a pool of ``GUNICORN_THREADS`` threads through asgiref's ``WsgiToAsgi``.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import app as flask_app
+from routes.ai import parse_jd_request, sse_event, JD_GENERATION_CONFIG
+from utils.llm import generate_async, generate_stream_async, JD_MODEL
+from utils.metrics import HTTP_REQUEST_SECONDS, start_trace, end_trace
+from utils.log import get_logger
+import json, os, time
+
+log = get_logger("asgi")
+
+# Threads for the Flask routes, as in sync mode
+WSGI_THREADS = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# Flask-CORS answers the preflight (OPTIONS goes to Flask); the response needs the header too
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+
+# ---------------- Responses ----------------
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("client disconnected")
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + CORS_HEADERS,
+    })
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+# ---------------- Async Routes ----------------
+async def generate_jd(data, send):
+    title, prompt_text, error = parse_jd_request(data)
+    if error:
+        return await send_json(send, error[1], {"error": error[0]})
+
+    try:
+        response = await generate_async(JD_MODEL, prompt_text, generation_config=JD_GENERATION_CONFIG)
+        jd_text = response.text
+    except Exception as e:
+        log.exception("generate_jd failed", extra={"title": title})
+        return await send_json(send, 500, {"error": f"JD generation failed: {str(e)}"})
+    log.info("generated job description", extra={"title": title, "chars": len(jd_text)})
+    return await send_json(send, 200, {"description": jd_text})
+
+async def generate_jd_stream(data, send):
+    title, prompt_text, error = parse_jd_request(data)
+    if error:
+        return await send_json(send, error[1], {"error": error[0]})
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            # Keep proxies (nginx) from buffering the stream
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ] + CORS_HEADERS,
+    })
+
+    async def event(text):
+        await send({"type": "http.response.body", "body": text.encode("utf-8"), "more_body": True})
+
+    parts = []
+    try:
+        async for text in generate_stream_async(JD_MODEL, prompt_text, generation_config=JD_GENERATION_CONFIG):
+            parts.append(text)
+            await event(sse_event({"text": text}))
+        jd_text = "".join(parts)
+        log.info("streamed job description", extra={"title": title, "chars": len(jd_text)})
+        await event(sse_event({"description": jd_text}, event="done"))
+    except Exception as e:
+        log.exception("generate_jd_stream failed", extra={"title": title})
+        await event(sse_event({"error": f"JD generation failed: {str(e)}"}, event="error"))
+    await send({"type": "http.response.body", "body": b""})
+    return 200
+
+# Endpoint names match the Flask ones so metrics and logs line up across modes
+ROUTES = {
+    ("POST", "/api/generate-jd"): ("ai.generate_jd", generate_jd),
+    ("POST", "/api/generate-jd/stream"): ("ai.generate_jd_stream", generate_jd_stream),
+}
+
+
+# ---------------- Application ----------------
+_wsgi_executor = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix="wsgi")
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """asgiref runs every WSGI call on one shared thread (thread_sensitive); the Flask views are
+    thread-safe, so each request gets a pool thread instead. Built on ``build_environ``,
+    ``start_response`` and ``sync_send`` only, not on the body of asgiref's own ``run_wsgi_app``."""
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.call_wsgi_app, thread_sensitive=False, executor=_wsgi_executor)(body)
+
+    def call_wsgi_app(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            self.sync_send({"type": "http.response.start", "status": 400, "headers": [(b"content-type", b"text/plain")]})
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request"})
+            return
+        sent = 0
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                if self.response_content_length is not None:
+                    output = output[:self.response_content_length - sent]
+                self.sync_send({"type": "http.response.body", "body": output, "more_body": True})
+                sent += len(output)
+                if sent == self.response_content_length:
+                    break
+        finally:
+            # WSGI: the server closes the iterable (ends streamed responses, runs teardown hooks)
+            if hasattr(response, "close"):
+                response.close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+class AsyncApp:
+    """ASGI app: native handlers for ``ROUTES``, the Flask app for everything else."""
+
+    def __init__(self, wsgi_app, routes=ROUTES):
+        self.wsgi_app = wsgi_app
+        self.fallback = ThreadedWsgiToAsgi(wsgi_app)
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        route = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if route is None:
+            return await self.fallback(scope, receive, send)
+
+        endpoint, handler = route
+        started = time.perf_counter()
+        token = start_trace()
+        status = 500
+        try:
+            try:
+                data = json.loads(await read_body(receive) or b"null")
+            except ValueError:
+                status = await send_json(send, 400, {"error": "Request body must be JSON"})
+            else:
+                status = await handler(data, send)
+        finally:
+            elapsed = time.perf_counter() - started
+            stages = end_trace(token)
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=scope["method"], endpoint=endpoint, status=status)
+            log.info("request", extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "endpoint": endpoint,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "stages": stages,
+            })
+
+    async def lifespan(self, receive, send):
+        # The Flask app is built (and its background threads started) at import
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+flask_app.config["SERVER_MODE"] = "async"
+app = AsyncApp(flask_app)
@@ -0,0 +1,182 @@
+"""End-to-end HTTP benchmark of the main API flows.
+
+    cd backend
+    pip install mongomock   # only for --mongo mongomock
+    python -m benchmarks.bench_e2e --mongo mongomock --llm-latency-ms 800 --concurrency 16 --requests 200
+    python -m benchmarks.bench_e2e --mongo mongodb://localhost:27017 --scenarios upload --format pdf
+
+Boots the Flask app on a local port with the fake Gemini model
+(``--llm-latency-ms`` per call), a local SMTP sink and either mongomock or a
+real mongod (scratch database ``ai_hr_bench_e2e``, dropped afterwards). It
+then drives ``/jobs``, ``/generate-jd``, ``/upload-resume`` and ``/send-response``
+(plus ``send_responses``: the same ``--requests`` emails in one ``/send-responses`` call)
+with ``--concurrency`` keep-alive clients and reports throughput and
+p50/p95/p99 latency per scenario. ``--target http://host:port`` drives an
+already running server instead (its own Mongo, model and SMTP settings apply).
+
+Everything is seeded (``--seed``), so two runs send the same requests. Use
+``--json results.json`` to keep a run for comparison.
+"""
+import argparse, json, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import (
+    prepare_environment, use_mongomock, drop_bench_database, SMTPSink, serve, HTTPDriver,
+    json_request, multipart_request, summarize, print_table,
+)
+from benchmarks.corpus import make_resume, make_job, write_pdf, write_docx
+
+SCENARIOS = ("jobs", "generate_jd", "upload", "send_response", "send_responses")
+HR_EMAIL = "bench-hr@example.com"
+# Both /send-response(s) subjects end with this
+RESPONSE_SUBJECT = "AI HR System"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="fake Gemini latency per call")
+    parser.add_argument("--smtp-delay-ms", type=float, default=0, help="SMTP sink delay per message")
+    parser.add_argument("--mongo", default="mongomock", help="'mongomock' or a MongoDB URI")
+    parser.add_argument("--format", choices=("pdf", "docx", "mixed"), default="mixed", help="generated resume files")
+    parser.add_argument("--async-upload", action="store_true", help="upload with ?async=true and wait for the workers")
+    parser.add_argument("--workers", type=int, default=None, help="RESUME_WORKERS for async uploads")
+    parser.add_argument("--target", help="base URL of a running server to benchmark instead of booting one")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write the results to this file")
+    return parser.parse_args()
+
+# ---------------- Request sets ----------------
+def resume_files(directory, count, file_format, rng):
+    """Generate ``count`` distinct resumes; returns [(filename, bytes)]."""
+    files = []
+    for index in range(count):
+        _, _, _, lines = make_resume(rng, index)
+        extension = file_format if file_format != "mixed" else ("pdf", "docx")[index % 2]
+        path = os.path.join(directory, f"bench_{index:05d}.{extension}")
+        if extension == "pdf":
+            write_pdf(path, [lines[:len(lines) // 2], lines[len(lines) // 2:]])
+        else:
+            write_docx(path, lines)
+        with open(path, "rb") as f:
+            files.append((os.path.basename(path), f.read()))
+    return files
+
+def candidate(index, rng):
+    return {
+        "email": f"candidate{index}@example.com",
+        "name": f"Candidate {index}",
+        "fit_score": rng.choice([92.5, 60.0]),
+        "interview_date": "2030-01-15",
+        "interview_time": "10:00",
+    }
+
+def build_requests(scenario, args, rng, job_id, files):
+    if scenario == "jobs":
+        return [json_request("POST", "/api/jobs", {**make_job(rng), "hr_email": HR_EMAIL, "rematch": False})
+                for _ in range(args.requests)]
+    if scenario == "generate_jd":
+        return [json_request("POST", "/api/generate-jd", {
+            key: value for key, value in make_job(rng).items() if key in ("title", "skills", "experience")
+        }) for _ in range(args.requests)]
+    if scenario == "upload":
+        query = "?async=true" if args.async_upload else ""
+        return [multipart_request(f"/api/upload-resume/{job_id}{query}", "resume", name, content)
+                for name, content in files]
+    if scenario == "send_response":
+        return [json_request("POST", "/api/send-response", candidate(i, rng)) for i in range(args.requests)]
+    if scenario == "send_responses":
+        return [json_request("POST", "/api/send-responses", {
+            "candidates": [candidate(i, rng) for i in range(args.requests)],
+        })]
+    raise ValueError(f"Unknown scenario {scenario}")
+
+def wait_for_applicants(driver, results, timeout=600.0):
+    """Poll queued uploads until none is pending; returns seconds waited."""
+    ids = [data["applicant_id"] for status, data, _ in results if status == 202 and isinstance(data, dict)]
+    started = time.perf_counter()
+    while ids and time.perf_counter() - started < timeout:
+        status_results, _ = driver.run([("GET", f"/api/applicants/{applicant_id}/status", None, None) for applicant_id in ids])
+        ids = [applicant_id for applicant_id, (_, data, _) in zip(ids, status_results)
+               if isinstance(data, dict) and data.get("status") in ("pending", "processing", "deferred")]
+        if ids:
+            time.sleep(0.2)
+    return time.perf_counter() - started
+
+# ---------------- Main ----------------
+def main():
+    args = parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.TemporaryDirectory(prefix="bench_e2e_")
+    sink = server = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        sink = SMTPSink(delay_ms=args.smtp_delay_ms).start()
+        prepare_environment(args.llm_latency_ms, sink.port, None if args.mongo == "mongomock" else args.mongo,
+                            workers=args.workers)
+        if args.mongo == "mongomock":
+            use_mongomock()
+        # Uploads are written under ./uploads of the working directory
+        os.chdir(workdir.name)
+        from app import app
+        server, base_url = serve(app)
+
+    rng = random.Random(args.seed)
+    driver = HTTPDriver(base_url, args.concurrency)
+    driver.send(*json_request("POST", "/api/signup", {"email": HR_EMAIL, "password": "bench", "company_name": "Bench Corp"}))
+    status, data, _ = driver.send(*json_request("POST", "/api/jobs", {**make_job(rng), "hr_email": HR_EMAIL, "rematch": False}))
+    if status != 201:
+        raise SystemExit(f"Could not create the benchmark job: {status} {data}")
+    job_id = data["job_id"]
+    files = resume_files(workdir.name, args.requests, args.format, rng) if "upload" in scenarios else []
+
+    print(f"target={base_url} mongo={'(target)' if args.target else args.mongo} llm_latency_ms={args.llm_latency_ms} "
+          f"concurrency={args.concurrency} requests/scenario={args.requests}")
+    rows = []
+    for scenario in scenarios:
+        # Uploads queue rejection emails too; count only the /send-response(s) ones
+        delivered_before = sink.count(RESPONSE_SUBJECT) if sink else 0
+        results, wall = driver.run(build_requests(scenario, args, rng, job_id, files))
+        row = summarize(scenario, results, wall, args.concurrency)
+        if scenario == "upload" and args.async_upload:
+            row["drain_s"] = round(wait_for_applicants(driver, results), 2)
+        if scenario == "send_response" and sink:
+            waited = sink.wait_for(delivered_before + row["ok"], subject_contains=RESPONSE_SUBJECT, timeout=120)
+            row["delivered"] = sink.count(RESPONSE_SUBJECT) - delivered_before
+            row["drain_s"] = round(waited, 2) if waited is not None else "timeout"
+        if scenario == "send_responses":
+            # Sent before the response; the report says how many went through
+            row["delivered"] = sum(data.get("sent", 0) for status, data, _ in results if isinstance(data, dict))
+        failures = [(status, data) for status, data, _ in results if not 200 <= status < 300]
+        if failures:
+            row["first_error"] = str(failures[0])[:200]
+        rows.append(row)
+
+    print_table(rows, extra_columns=("drain_s", "delivered"))
+    for row in rows:
+        if "first_error" in row:
+            print(f"{row['scenario']}: {row['errors']} error(s), first: {row['first_error']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+    if server is not None:
+        server.shutdown()
+        if args.mongo != "mongomock":
+            drop_bench_database()
+    if sink is not None:
+        sink.stop()
+    os.chdir(os.path.dirname(workdir.name))
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
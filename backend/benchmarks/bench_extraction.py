@@ -0,0 +1,84 @@
+"""Compare the legacy and streaming resume text extractors.
+
+    cd backend
+    python -m benchmarks.bench_extraction --count 100 --large 5 --large-pages 200
+
+Reports throughput, worst-case per-file latency and peak traced memory for
+both implementations over the same generated corpus.
+"""
+import argparse, os, statistics, sys, tempfile, time, tracemalloc
+import PyPDF2, docx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_corpus
+from utils.extraction import extract_text
+
+
+def legacy_extract_text(file_path):
+    """The original extractor: string concatenation over every page/paragraph."""
+    ext = file_path.rsplit(".", 1)[1].lower()
+    text = ""
+    try:
+        if ext == "pdf":
+            with open(file_path, "rb") as f:
+                reader = PyPDF2.PdfReader(f)
+                for page in reader.pages:
+                    page_text = page.extract_text()
+                    if page_text:
+                        text += page_text + " "
+        elif ext == "docx":
+            doc = docx.Document(file_path)
+            for para in doc.paragraphs:
+                text += para.text + " "
+        return text.strip()
+    except Exception as e:
+        print("[ERROR][legacy_extract_text]", e)
+        return ""
+
+def run(name, extractor, paths):
+    latencies, chars = [], 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        chars += len(extractor(path))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    return {
+        "extractor": name,
+        "files": len(paths),
+        "seconds": elapsed,
+        "files_per_s": len(paths) / elapsed if elapsed else 0.0,
+        "chars": chars,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "peak_mb": peak / 1024 / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50, help="regular resumes per format")
+    parser.add_argument("--pages", type=int, default=2, help="pages per regular PDF")
+    parser.add_argument("--large", type=int, default=3, help="number of oversized PDFs")
+    parser.add_argument("--large-pages", type=int, default=200, help="pages per oversized PDF")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(os.path.join(directory, "regular"), count=args.count, pages=args.pages)
+        paths += generate_corpus(os.path.join(directory, "large"), count=args.large,
+                                 pages=args.large_pages, seed=7, formats=("pdf",))
+
+        rows = [run("legacy", legacy_extract_text, paths), run("streaming", extract_text, paths)]
+
+    print(f"{'extractor':<10} {'files':>6} {'sec':>8} {'files/s':>9} {'chars':>10} {'p50 ms':>8} {'max ms':>9} {'peak MB':>8}")
+    for row in rows:
+        print(f"{row['extractor']:<10} {row['files']:>6} {row['seconds']:>8.2f} {row['files_per_s']:>9.1f} "
+              f"{row['chars']:>10} {row['p50_ms']:>8.1f} {row['max_ms']:>9.1f} {row['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
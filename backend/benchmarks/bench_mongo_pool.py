@@ -0,0 +1,104 @@
+"""Load test for the Mongo client pool at and beyond saturation.
+
+Needs a reachable MongoDB (MONGO_URI). Works in a scratch database
+(``ai_hr_bench``) that is dropped afterwards.
+
+    cd backend
+    python -m benchmarks.bench_mongo_pool --threads 64 --pool-size 8 --wait-queue-timeout-ms 250
+    python -m benchmarks.bench_mongo_pool --threads 64 --pool-size 8 --op slow --op-ms 50
+
+With more threads than pooled connections, requests queue for a connection;
+the report shows how the wait-queue timeout turns that into fast failures
+instead of stalled workers, and how close the pool ran to full utilization.
+"""
+import argparse, os, statistics, sys, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mongo connection pool saturation test")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--wait-queue-timeout-ms", type=int, default=250)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--op", choices=("ping", "find", "slow"), default="find",
+                        help="slow runs a server-side sleep ($where), unavailable on some hosted clusters")
+    parser.add_argument("--op-ms", type=int, default=20, help="server-side sleep for --op slow")
+    return parser.parse_args()
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def main():
+    args = parse_args()
+    # Pool settings are read when utils.db is imported
+    os.environ["MONGO_MAX_POOL_SIZE"] = str(args.pool_size)
+    os.environ["MONGO_WAIT_QUEUE_TIMEOUT_MS"] = str(args.wait_queue_timeout_ms)
+    from utils.db import get_client, pool_stats
+
+    bench = get_client()["ai_hr_bench"]
+    bench.items.drop()
+    bench.items.insert_many([{"n": i, "payload": "x" * 200} for i in range(1000)])
+    bench.items.create_index("n")
+
+    def operation(i):
+        if args.op == "ping":
+            bench.command("ping")
+        elif args.op == "find":
+            bench.items.find_one({"n": i % 1000})
+        else:
+            bench.items.find_one({"$where": f"sleep({args.op_ms}) || true"})
+
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    samples = []
+
+    def worker(seed):
+        i, local_latencies, local_errors = seed, [], {}
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                operation(i)
+                local_latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                local_errors[type(e).__name__] = local_errors.get(type(e).__name__, 0) + 1
+            i += 1
+        with lock:
+            latencies.extend(local_latencies)
+            for name, count in local_errors.items():
+                errors[name] = errors.get(name, 0) + count
+
+    def monitor():
+        while time.monotonic() < deadline:
+            samples.append(pool_stats()["in_use"])
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=worker, args=(n * 7919,)) for n in range(args.threads)]
+    threads.append(threading.Thread(target=monitor))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    bench.client.drop_database("ai_hr_bench")
+    latencies.sort()
+    stats = pool_stats()
+    print(f"threads={args.threads} pool={args.pool_size} wait_queue_timeout={args.wait_queue_timeout_ms}ms op={args.op}")
+    print(f"ok={len(latencies)} throughput={len(latencies) / elapsed:.1f} ops/s errors={errors or 0}")
+    print(f"latency ms: p50={percentile(latencies, 50) * 1000:.2f} p95={percentile(latencies, 95) * 1000:.2f} "
+          f"p99={percentile(latencies, 99) * 1000:.2f} max={(latencies[-1] if latencies else 0) * 1000:.2f}")
+    print(f"pool: peak_in_use={stats['peak_in_use']}/{args.pool_size} "
+          f"mean_in_use={statistics.mean(samples) if samples else 0:.1f} "
+          f"avg_wait={stats['avg_wait_ms']}ms max_wait={stats['max_wait_ms']}ms "
+          f"checkout_failures={stats['checkout_failures']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Analysis prompt size and LLM latency versus the resume token budget.
+
+    cd backend
+    python -m benchmarks.bench_prompt
+    python -m benchmarks.bench_prompt --budgets raw,0,6000,3000,1500,800 --llm-latency-ms 400 --ms-per-1k-tokens 80
+
+Builds a synthetic corpus of resumes from one page to fourteen (page
+headers and footers repeated on every page, stock closing lines), then for
+each budget builds every analysis prompt and sends it to the fake Gemini
+model, whose latency grows with the prompt (``--ms-per-1k-tokens``, the
+per-input-token cost of a real model). ``raw`` is the old prompt: the full
+resume and job description, untouched; ``0`` is normalization and
+boilerplate removal without a cut.
+
+Besides latency the table shows what was kept: the share of resumes whose
+email survived, the share of their skills still present, and how many
+prompts were over ``--context-limit`` tokens.
+"""
+import argparse, json, os, random, statistics, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import prepare_environment, percentile
+from benchmarks.corpus import make_resume, make_job
+
+# Roles per resume: one page of roles up to a pasted-in career history
+PARAGRAPHS = (12, 40, 120, 600)
+LINES_PER_PAGE = 45
+JD_FILLER = (
+    "About Us: We are a fast-growing company on a mission to change how people work. Our culture values "
+    "ownership, curiosity and kindness, and our teams are spread across three continents.",
+    "Benefits: Competitive salary, equity, health insurance, gym membership, learning budget, "
+    "flexible hours and remote work.",
+    "We are an equal opportunity employer and consider all applicants without regard to race, religion, "
+    "gender, sexual orientation, national origin, disability or age.",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prompt budget benchmark")
+    parser.add_argument("--budgets", default="raw,0,6000,3000,1500,800",
+                        help="resume token budgets; 'raw' is the unprocessed prompt, 0 means no cut")
+    parser.add_argument("--jd-budget", type=int, default=800)
+    parser.add_argument("--resumes", type=int, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="fixed cost of a fake model call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=60, help="added per 1000 prompt tokens")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--context-limit", type=int, default=30000, help="prompt tokens counted as over the limit")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="write the results to this file")
+    return parser.parse_args()
+
+# ---------------- Corpus ----------------
+def paginate(name, lines):
+    """The lines as a PDF extraction returns them: a header and a page footer on every page."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+    out = []
+    for number, page in enumerate(pages, 1):
+        out += [f"{name}  |  Curriculum Vitae  |  Confidential"] + page + [f"Page {number} of {len(pages)}"]
+    return out
+
+def build_corpus(count, seed):
+    rng = random.Random(seed)
+    resumes = []
+    for index in range(count):
+        name, email, skills, lines = make_resume(rng, index, paragraphs=PARAGRAPHS[index % len(PARAGRAPHS)])
+        lines += ["Interests", "Chess, hiking and open source", "References available upon request"]
+        text = "\n".join(paginate(name, lines))
+        resumes.append({"text": text, "email": email, "skills": skills})
+    job = make_job(rng)
+    description = "\n".join([JD_FILLER[0], job["description"], JD_FILLER[1], JD_FILLER[2]])
+    return resumes, description
+
+# ---------------- Run ----------------
+def build_prompt(resume, job_desc, budget, jd_budget):
+    from utils.prompt_builder import condense_resume, condense_job_description
+    from utils.resume_pipeline import build_analysis_prompt
+
+    if budget == "raw":
+        return build_analysis_prompt(resume, job_desc), resume
+    text = condense_resume(resume, budget=int(budget))["text"]
+    return build_analysis_prompt(text, condense_job_description(job_desc, budget=jd_budget)["text"]), text
+
+def run_budget(budget, resumes, job_desc, args):
+    from utils.llm import ANALYSIS_MODEL, estimate_tokens, generate_text
+
+    def one(resume):
+        started = time.perf_counter()
+        prompt, text = build_prompt(resume["text"], job_desc, budget, args.jd_budget)
+        built = time.perf_counter()
+        generate_text(ANALYSIS_MODEL, prompt)
+        lowered = text.lower()
+        return {
+            "build_ms": (built - started) * 1000,
+            "total_ms": (time.perf_counter() - started) * 1000,
+            "tokens": estimate_tokens(prompt),
+            "email": resume["email"] in text,
+            "skills": sum(skill.lower() in lowered for skill in resume["skills"]) / len(resume["skills"]),
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, resumes))
+    wall = time.perf_counter() - started
+    tokens = [result["tokens"] for result in results]
+    totals = [result["total_ms"] / 1000 for result in results]
+    return {
+        "budget": budget,
+        "prompts": len(results),
+        "avg_tokens": round(statistics.mean(tokens)),
+        "max_tokens": max(tokens),
+        "over_limit": sum(token > args.context_limit for token in tokens),
+        "build_p50_ms": round(statistics.median(result["build_ms"] for result in results), 2),
+        "p50_ms": round(percentile(totals, 50) * 1000, 1),
+        "p95_ms": round(percentile(totals, 95) * 1000, 1),
+        "wall_s": round(wall, 2),
+        "email_kept": round(sum(result["email"] for result in results) / len(results), 2),
+        "skills_kept": round(statistics.mean(result["skills"] for result in results), 2),
+    }
+
+# ---------------- Main ----------------
+def main():
+    args = parse_args()
+    prepare_environment(args.llm_latency_ms, extra={
+        "LLM_FAKE_MS_PER_1K_TOKENS": str(args.ms_per_1k_tokens),
+        "LLM_MAX_CONCURRENCY": str(max(args.concurrency, 1)),
+    })
+    resumes, job_desc = build_corpus(args.resumes, args.seed)
+    budgets = [budget.strip() for budget in args.budgets.split(",") if budget.strip()]
+
+    print(f"resumes={len(resumes)} llm_latency_ms={args.llm_latency_ms} ms_per_1k_tokens={args.ms_per_1k_tokens} "
+          f"jd_budget={args.jd_budget} concurrency={args.concurrency}")
+    rows = [run_budget(budget, resumes, job_desc, args) for budget in budgets]
+    baseline = rows[0]["avg_tokens"]
+    for row in rows:
+        row["tokens_saved_pct"] = round(100 * (1 - row["avg_tokens"] / baseline), 1) if baseline else 0.0
+
+    columns = ["budget", "prompts", "avg_tokens", "max_tokens", "tokens_saved_pct", "over_limit",
+               "build_p50_ms", "p50_ms", "p95_ms", "wall_s", "email_kept", "skills_kept"]
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Query latency and recall of the semantic search index at scale.
+
+    cd backend
+    python -m benchmarks.bench_search --vectors 1000000 --queries 200
+
+Embeds a few thousand generated resumes, expands them to ``--vectors``
+vectors by adding noise (embedding a million real resumes would only
+measure the tokenizer), builds an on-disk index in a temporary directory and
+reports build time, query latency percentiles and recall@k of the IVF
+index against an exact flat scan. Hashed-term similarities are low and
+close together, so the mean similarity of the returned top-k relative to
+the exact top-k is reported as well: a missed neighbour is usually replaced
+by one that scores almost the same.
+"""
+import argparse, os, random, sys, tempfile, time
+import numpy as np
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_resume, make_job
+from utils.search_index import SearchIndex, embed, SEARCH_VECTOR_DIM, SEARCH_INDEX_PROBES
+
+
+def synthetic_vectors(base, count, noise, seed, chunk=100000):
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, chunk):
+        rows = base[rng.integers(0, len(base), min(chunk, count - start))]
+        rows = rows + rng.normal(0, noise, rows.shape).astype(np.float32)
+        yield rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=1000000)
+    parser.add_argument("--base", type=int, default=3000, help="distinct generated resumes to embed")
+    parser.add_argument("--noise", type=float, default=0.03, help="per-dimension noise added to copies")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--probes", type=int, default=SEARCH_INDEX_PROBES)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    base = np.array([embed("\n".join(make_resume(rng, i)[3])) for i in range(args.base)], dtype=np.float32)
+    jobs = [make_job(rng) for _ in range(args.queries)]
+    queries = [embed(f"{job['title']} {job['description']}", job["skills"]) for job in jobs]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SearchIndex(directory=directory, train_min=args.vectors + 1, probes=args.probes)
+        started = time.perf_counter()
+        for vectors in synthetic_vectors(base, args.vectors, args.noise, seed=5):
+            index.add([ObjectId() for _ in range(len(vectors))], vectors)
+        load_s = time.perf_counter() - started
+
+        # Exact answers from a flat scan, before the IVF lists exist
+        flat_latencies, truth = [], []
+        for query in queries[:min(20, len(queries))]:
+            t0 = time.perf_counter()
+            truth.append(index.search(query, args.k))
+            flat_latencies.append(time.perf_counter() - t0)
+
+        started = time.perf_counter()
+        index.train()
+        train_s = time.perf_counter() - started
+        index.save()
+
+        latencies, recalls, quality = [], [], []
+        for i, query in enumerate(queries):
+            t0 = time.perf_counter()
+            found = index.search(query, args.k)
+            latencies.append(time.perf_counter() - t0)
+            if i < len(truth):
+                expected = {applicant_id for applicant_id, _ in truth[i]}
+                recalls.append(len(expected & {applicant_id for applicant_id, _ in found}) / args.k)
+                quality.append(np.mean([s for _, s in found]) / np.mean([s for _, s in truth[i]]))
+
+        started = time.perf_counter()
+        reopened = SearchIndex(directory=directory, probes=args.probes)
+        reopen_s = time.perf_counter() - started
+        size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1024 / 1024
+
+    print(f"vectors={index.count} dim={SEARCH_VECTOR_DIM} lists={len(index.centroids)} probes={args.probes} k={args.k}")
+    print(f"load {load_s:.1f}s  train {train_s:.1f}s  reopen {reopen_s:.1f}s ({reopened.count} vectors)  on disk {size_mb:.0f} MB")
+    print(f"flat scan   p50 {percentile(flat_latencies, 50):8.1f} ms  p95 {percentile(flat_latencies, 95):8.1f} ms")
+    print(f"ivf search  p50 {percentile(latencies, 50):8.1f} ms  p95 {percentile(latencies, 95):8.1f} ms  "
+          f"recall@{args.k} {np.mean(recalls):.3f}  similarity vs exact {np.mean(quality):.3f}")
+
+
+if __name__ == "__main__":
+    main()
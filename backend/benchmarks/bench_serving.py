@@ -0,0 +1,116 @@
+"""Sync (gthread) vs async (uvicorn) serving throughput on an LLM-bound route.
+
+    cd backend
+    pip install gunicorn uvicorn asgiref mongomock
+    python -m benchmarks.bench_serving --llm-latency-ms 2000 --concurrency 16,64,256
+
+Starts gunicorn with ``gunicorn.conf.py`` once per mode (``SERVER_MODE=sync``
+and ``async``) with the fake Gemini model at ``--llm-latency-ms`` per call,
+then fires ``POST /api/generate-jd`` at each concurrency level. A sync worker
+holds at most ``--threads`` calls at a time; an async worker holds as many as
+``LLM_MAX_CONCURRENCY`` allows (raised to ``--llm-max-concurrency`` here so the
+server model is what gets measured).
+"""
+import argparse, json, os, socket, subprocess, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import prepare_environment, use_mongomock, HTTPDriver, json_request, summarize, print_table
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("sync", "async")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sync vs async serving benchmark")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--concurrency", default="16,64,256", help="comma-separated client concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="requests per level (default: 4x the concurrency)")
+    parser.add_argument("--llm-latency-ms", type=float, default=2000)
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers per mode")
+    parser.add_argument("--threads", type=int, default=16, help="gthread threads per sync worker")
+    parser.add_argument("--llm-max-concurrency", type=int, default=1024)
+    parser.add_argument("--mongo", default="mongomock", help="'mongomock' or a MongoDB URI")
+    parser.add_argument("--json", help="write the results to this file")
+    # Internal: run one gunicorn server in this process
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+# ---------------- Server ----------------
+def serve(args):
+    """Child process: gunicorn with the production config (SERVER_MODE, threads and workers from the env)."""
+    if args.mongo == "mongomock":
+        # Patched before gunicorn forks, so every worker inherits it
+        use_mongomock()
+    os.chdir(BACKEND_DIR)
+    sys.argv = ["gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{args.port}"]
+    from gunicorn.app.wsgiapp import run
+    run()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(mode, args):
+    port = free_port()
+    env = dict(os.environ, SERVER_MODE=mode, WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_serving", "--serve", mode, "--port", str(port), "--mongo", args.mongo],
+        cwd=BACKEND_DIR, env=env,
+    )
+    driver = HTTPDriver(f"http://127.0.0.1:{port}", 1, timeout=5)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{mode} server exited with code {process.returncode}")
+        status, _, _ = driver.send("GET", "/api/health")
+        if status == 200:
+            return process, f"http://127.0.0.1:{port}"
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f"{mode} server did not come up within 60s")
+
+# ---------------- Main ----------------
+def main():
+    args = parse_args()
+    if args.serve:
+        return serve(args)
+
+    prepare_environment(args.llm_latency_ms, mongo_uri=None if args.mongo == "mongomock" else args.mongo, extra={
+        "LLM_MAX_CONCURRENCY": str(args.llm_max_concurrency),
+        # No resume uploads here; keep the workers' own threads out of the picture
+        "RESUME_WORKERS": "0",
+    })
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    body = {"title": "Backend Engineer", "skills": "Python, Flask, MongoDB", "experience": "3+ years"}
+
+    print(f"llm_latency_ms={args.llm_latency_ms} workers={args.workers} sync_threads={args.threads} "
+          f"llm_max_concurrency={args.llm_max_concurrency}")
+    rows = []
+    for mode in modes:
+        process, base_url = start_server(mode, args)
+        try:
+            for concurrency in levels:
+                count = args.requests or concurrency * 4
+                driver = HTTPDriver(base_url, concurrency)
+                results, wall = driver.run([json_request("POST", "/api/generate-jd", body)] * count)
+                row = summarize("generate_jd", results, wall, concurrency)
+                row["mode"] = mode
+                # The best a server holding every request in flight could do
+                row["ideal_rps"] = round(concurrency / (args.llm_latency_ms / 1000), 1) if args.llm_latency_ms else ""
+                rows.append(row)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_table(rows, extra_columns=("mode", "ideal_rps"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Cold start: import cost of the app and time to the first HTTP response.
+
+    cd backend
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --modes sync,async --top 20
+
+Two measurements, each in fresh processes:
+
+* ``import``    - ``python -X importtime`` on ``import app; app.app`` (module
+  import plus ``create_app()``), with the heaviest imports of the last run and
+  a check that the lazily loaded SDKs and parsers stayed out of startup;
+* ``first_response`` - gunicorn started with ``gunicorn.conf.py`` (one worker)
+  until ``GET /`` answers, i.e. what an autoscaled worker costs before it can
+  serve.
+
+Mongo does not have to be running: nothing on these paths talks to it. The
+background threads that do just log their connection errors (hidden unless
+``--verbose``).
+"""
+import argparse, http.client, json, os, socket, statistics, subprocess, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import prepare_environment
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Imported on first use, not at startup
+LAZY_MODULES = ("google.generativeai", "PyPDF2", "docx")
+
+IMPORT_SNIPPET = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app
+print(json.dumps({"import_ms": (imported - started) * 1000, "create_app_ms": (time.perf_counter() - imported) * 1000}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="sync", help="gunicorn SERVER_MODE(s) for the first-response check")
+    parser.add_argument("--top", type=int, default=15, help="heaviest imports to list")
+    parser.add_argument("--mongo", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--verbose", action="store_true", help="show the children's logs")
+    parser.add_argument("--json", help="write the results to this file")
+    return parser.parse_args()
+
+# ---------------- Import Time ----------------
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from ``-X importtime`` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            entries.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2))
+        except ValueError:
+            continue  # the header line
+    return entries
+
+def measure_import(env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120)
+    process_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"import failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = process_ms
+    return timings, parse_importtime(result.stderr)
+
+# ---------------- First Response ----------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_response(port, process, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server exited with code {process.returncode}")
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return True
+        except (ConnectionError, OSError, http.client.HTTPException):
+            time.sleep(0.005)
+        finally:
+            connection.close()
+    return False
+
+def measure_first_response(mode, env, verbose):
+    port = free_port()
+    env = dict(env, SERVER_MODE=mode, WEB_CONCURRENCY="1")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"],
+        cwd=BACKEND_DIR, env=env,
+        stdout=None if verbose else subprocess.DEVNULL, stderr=None if verbose else subprocess.DEVNULL,
+    )
+    try:
+        if not wait_for_response(port, process):
+            raise SystemExit(f"{mode} server did not answer within 60s")
+        return (time.perf_counter() - started) * 1000
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+# ---------------- Report ----------------
+def stats_row(name, values):
+    return {"metric": name, "runs": len(values), "median_ms": round(statistics.median(values), 1),
+            "min_ms": round(min(values), 1), "max_ms": round(max(values), 1)}
+
+def main():
+    args = parse_args()
+    prepare_environment(mongo_uri=args.mongo, extra={"LOG_LEVEL": os.getenv("LOG_LEVEL", "INFO" if args.verbose else "CRITICAL")})
+    env = dict(os.environ)
+
+    samples = {"import_ms": [], "create_app_ms": [], "process_ms": []}
+    entries = []
+    for _ in range(args.runs):
+        timings, entries = measure_import(env)
+        for key in samples:
+            samples[key].append(timings[key])
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for mode in modes:
+        samples[f"first_response_{mode}_ms"] = [measure_first_response(mode, env, args.verbose) for _ in range(args.runs)]
+
+    rows = [stats_row(name, values) for name, values in samples.items()]
+    print(f"{'metric':28} {'median_ms':>10} {'min_ms':>10} {'max_ms':>10}")
+    for row in rows:
+        print(f"{row['metric']:28} {row['median_ms']:>10} {row['min_ms']:>10} {row['max_ms']:>10}")
+
+    # Only the outermost imports of each tree, so nothing is counted twice
+    heaviest = sorted((entry for entry in entries if entry[3] <= 1), key=lambda entry: -entry[2])[:args.top]
+    print(f"\nheaviest imports (last run, cumulative ms):")
+    for name, _, cumulative_us, depth in heaviest:
+        print(f"  {'  ' * depth}{name:40} {cumulative_us / 1000:8.1f}")
+    imported = {entry[0] for entry in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    print("\nlazy modules imported at startup: " + (", ".join(eager) if eager else "none"))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows, "eager_lazy_modules": eager,
+                       "heaviest_imports": [{"module": name, "cumulative_ms": round(us / 1000, 1)}
+                                            for name, _, us, _ in heaviest]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Single-model vs tiered resume analysis: latency per resume and decision agreement.
+
+    cd backend
+    python -m benchmarks.bench_tiers
+    python -m benchmarks.bench_tiers --margins 0.05,0.1,0.2 --fast-noise 0.08 --resumes 400
+
+Scores a synthetic corpus with ``analyze_resume`` (analysis cache off), once
+with ``ANALYSIS_MODEL`` alone and once per escalation margin in tiered mode.
+Both models are fakes: the slow one returns the reference score after
+``--slow-latency-ms``; the fast one answers after ``--fast-latency-ms`` with
+that score shifted by up to ``--fast-noise`` (deterministically per resume),
+and returns unusable output for ``--fast-invalid`` of the resumes.
+
+``agreement`` is the share of resumes that land on the same side of the 0.85
+threshold as with the slow model alone; ``false_rejects`` counts candidates
+the slow model passes but the tiered run would reject.
+"""
+import argparse, json, os, random, statistics, sys, time, zlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import prepare_environment, percentile
+from benchmarks.corpus import make_resume, make_job
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tiered analysis benchmark")
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--margins", default="0.05,0.1,0.2", help="escalation margins to try in tiered mode")
+    parser.add_argument("--slow-latency-ms", type=float, default=400)
+    parser.add_argument("--fast-latency-ms", type=float, default=100)
+    parser.add_argument("--fast-noise", type=float, default=0.05, help="max deviation of the fast model's score")
+    parser.add_argument("--fast-invalid", type=float, default=0.02, help="share of fast responses that fail validation")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--json", help="write the results to this file")
+    return parser.parse_args()
+
+# ---------------- Fake Models ----------------
+def tiered_fake_factory(args):
+    from utils.llm import FakeGenerativeModel, ANALYSIS_FAST_MODEL
+
+    class TieredFakeModel(FakeGenerativeModel):
+        def __init__(self, model_name, **kwargs):
+            super().__init__(model_name, **kwargs)
+            self.fast = model_name == ANALYSIS_FAST_MODEL
+            self.latency_ms = args.fast_latency_ms if self.fast else args.slow_latency_ms
+
+        def respond(self, prompt):
+            text = super().respond(prompt)
+            if not self.fast:
+                return text
+            digest = zlib.crc32(prompt.encode("utf-8"))
+            if digest % 10000 < args.fast_invalid * 10000:
+                return "I could not analyze this resume."
+            result = json.loads(text)
+            shift = ((digest >> 8) % 2001 / 1000 - 1) * args.fast_noise
+            result["fit_score"] = round(min(1.0, max(0.0, result["fit_score"] + shift)), 2)
+            return json.dumps(result)
+
+    return TieredFakeModel
+
+# ---------------- Run ----------------
+def run_mode(name, models, margin, resumes, job_desc, args):
+    from utils import resume_pipeline
+
+    resume_pipeline.ANALYSIS_ESCALATION_MARGIN = margin
+
+    def one(text):
+        started = time.perf_counter()
+        score = resume_pipeline.analyze_resume(text, job_desc, models=models)["fit_score"]
+        return score, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, resumes))
+    wall = time.perf_counter() - started
+    latencies = [seconds for _, seconds in results]
+    return {
+        "mode": name,
+        "margin": margin if len(models) > 1 else "",
+        "resumes": len(results),
+        "avg_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "wall_s": round(wall, 2),
+    }, [score for score, _ in results]
+
+def escalations():
+    from utils.metrics import ANALYSIS_ESCALATIONS
+
+    return sum(ANALYSIS_ESCALATIONS.value(path="analysis", reason=reason) for reason in ("borderline", "invalid"))
+
+# ---------------- Main ----------------
+def main():
+    args = parse_args()
+    prepare_environment(args.slow_latency_ms, extra={
+        "ANALYSIS_CACHE_ENABLED": "false",
+        "LLM_MAX_CONCURRENCY": str(max(args.concurrency, 1)),
+    })
+    from utils.llm import set_model_factory, ANALYSIS_MODEL, ANALYSIS_FAST_MODEL
+    from utils.resume_pipeline import REJECTION_THRESHOLD
+
+    set_model_factory(tiered_fake_factory(args))
+    rng = random.Random(args.seed)
+    resumes = ["\n".join(make_resume(rng, index)[3]) for index in range(args.resumes)]
+    job_desc = make_job(rng)["description"]
+
+    print(f"resumes={len(resumes)} slow={ANALYSIS_MODEL} ({args.slow_latency_ms} ms) fast={ANALYSIS_FAST_MODEL} "
+          f"({args.fast_latency_ms} ms, noise {args.fast_noise}, invalid {args.fast_invalid})")
+    reference_row, reference = run_mode("single", [ANALYSIS_MODEL], 0.0, resumes, job_desc, args)
+    rows = [reference_row]
+    for margin in [float(margin) for margin in args.margins.split(",") if margin.strip()]:
+        before = escalations()
+        row, scores = run_mode("tiered", [ANALYSIS_FAST_MODEL, ANALYSIS_MODEL], margin, resumes, job_desc, args)
+        passed = [(ref >= REJECTION_THRESHOLD, score >= REJECTION_THRESHOLD) for ref, score in zip(reference, scores)]
+        row["escalated_pct"] = round(100 * (escalations() - before) / len(resumes), 1)
+        row["agreement"] = round(sum(ref == got for ref, got in passed) / len(passed), 3)
+        row["false_rejects"] = sum(ref and not got for ref, got in passed)
+        row["false_passes"] = sum(got and not ref for ref, got in passed)
+        rows.append(row)
+
+    columns = ["mode", "margin", "resumes", "avg_ms", "p50_ms", "p95_ms", "wall_s",
+               "escalated_pct", "agreement", "false_rejects", "false_passes"]
+    widths = [max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(width) for column, width in zip(columns, widths)))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
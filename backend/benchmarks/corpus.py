@@ -0,0 +1,110 @@
+"""Synthetic resume/job corpus for the benchmarks.
+
+PDFs are written by hand (one Helvetica text stream per page) so the
+benchmarks need nothing beyond the app's own dependencies; DOCX files use
+python-docx.
+"""
+import os, random
+import docx
+
+FIRST_NAMES = ["Ayesha", "Bilal", "Carlos", "Dana", "Elif", "Farah", "Gustavo", "Hina", "Ivan", "Jia"]
+LAST_NAMES = ["Khan", "Lopez", "Müller", "Nakamura", "Okafor", "Petrov", "Qureshi", "Rossi", "Smith", "Tanaka"]
+SKILLS = [
+    "Python", "Django", "Flask", "FastAPI", "SQL", "PostgreSQL", "MongoDB", "React", "Node.js",
+    "JavaScript", "TypeScript", "AWS", "Docker", "Kubernetes", "Machine Learning", "NLP",
+    "TensorFlow", "PyTorch", "Pandas", "Spark", "Java", "Go", "C++", "Excel", "Tableau",
+]
+ROLES = ["Software Engineer", "Data Scientist", "Backend Developer", "ML Engineer", "Frontend Developer", "DevOps Engineer"]
+FILLER = (
+    "Delivered features end to end, collaborated with product and design, reviewed code, "
+    "mentored junior engineers and improved reliability of production services."
+).split()
+
+
+def make_resume(rng, index, paragraphs=12):
+    """Return (name, email, skills, lines) for one synthetic candidate."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = f"{name.split()[0].lower()}.{index}@example.com"
+    skills = rng.sample(SKILLS, rng.randint(4, 9))
+    lines = [name, email, "Summary", f"{rng.choice(ROLES)} with {rng.randint(1, 12)} years of experience.",
+             "Skills", ", ".join(skills), "Experience"]
+    for _ in range(paragraphs):
+        lines.append(f"{rng.choice(ROLES)} at Company {rng.randint(1, 500)}: " + " ".join(rng.choices(FILLER, k=24)))
+    lines += ["Education", f"BSc Computer Science, University {rng.randint(1, 50)}",
+              "Projects", f"Built a {rng.choice(skills)} service handling {rng.randint(1, 900)}k requests/day"]
+    return name, email, skills, lines
+
+def make_job(rng):
+    skills = rng.sample(SKILLS, 5)
+    title = rng.choice(ROLES)
+    description = (
+        f"Job Summary: We are hiring a {title}. Responsibilities: build and operate services using "
+        f"{', '.join(skills)}. Requirements: {rng.randint(2, 6)}+ years of experience with {skills[0]} and {skills[1]}."
+    )
+    return {"title": title, "skills": ", ".join(skills), "description": description, "experience": "3 years"}
+
+# ---------------- Writers ----------------
+def _pdf_escape(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages):
+    """Write a minimal PDF where each entry of ``pages`` is a list of text lines."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(None)  # page object, filled in below
+        page_ids.append(len(objects))
+        objects[-1] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects) - 1))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def write_docx(path, lines, table_rows=None, header=None):
+    doc = docx.Document()
+    if header:
+        doc.sections[0].header.paragraphs[0].text = header
+    for line in lines:
+        doc.add_paragraph(line)
+    if table_rows:
+        table = doc.add_table(rows=0, cols=len(table_rows[0]))
+        for row in table_rows:
+            cells = table.add_row().cells
+            for cell, value in zip(cells, row):
+                cell.text = value
+    doc.save(path)
+
+def generate_corpus(directory, count=50, pages=2, seed=42, formats=("pdf", "docx")):
+    """Write ``count`` resumes of each format into ``directory``; returns the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        name, email, skills, lines = make_resume(rng, index, paragraphs=max(12, pages * 12))
+        if "pdf" in formats:
+            path = os.path.join(directory, f"resume_{index:05d}.pdf")
+            # Spread the experience section over the requested number of pages
+            per_page = max(1, len(lines) // pages)
+            write_pdf(path, [lines[i:i + per_page] for i in range(0, len(lines), per_page)][:pages] or [lines])
+            paths.append(path)
+        if "docx" in formats:
+            path = os.path.join(directory, f"resume_{index:05d}.docx")
+            table = [["Skill", "Years"]] + [[skill, str(rng.randint(1, 8))] for skill in skills]
+            write_docx(path, lines[2:], table_rows=table, header=f"{name} | {email}")
+            paths.append(path)
+    return paths
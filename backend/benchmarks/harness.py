@@ -0,0 +1,263 @@
+"""Shared pieces of the end-to-end benchmarks.
+
+* ``prepare_environment`` - env for a self-contained app: fake Gemini model,
+  SMTP pointed at the sink, scratch Mongo database, quiet logs. Must run
+  before anything imports the app.
+* ``use_mongomock``       - run against an in-memory mongomock client instead
+  of a real mongod (``pip install mongomock``).
+* ``SMTPSink``            - a minimal local SMTP server that accepts and counts
+  messages (optionally with a per-message delay).
+* ``serve``               - the Flask app on a real HTTP socket, in a thread.
+* ``HTTPDriver``          - fires requests at a fixed concurrency over
+  keep-alive connections and records per-request latency.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from urllib.parse import urlsplit
+import http.client, inspect, json, os, socketserver, sys, threading, time, uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DATABASE = "ai_hr_bench_e2e"
+
+
+# ---------------- Environment ----------------
+def prepare_environment(llm_latency_ms=0, smtp_port=None, mongo_uri=None, workers=None, extra=None):
+    os.environ.update({
+        "LLM_FAKE": "true",
+        "LLM_FAKE_LATENCY_MS": str(llm_latency_ms),
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY") or "bench",
+        "MONGO_DB_NAME": BENCH_DATABASE,
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_USE_TLS": "false",
+        # The sink accepts anything; no login
+        "MAIL_USERNAME": "", "MAIL_PASSWORD": "", "EMAIL_USER": "", "EMAIL_PASS": "",
+        "OUTBOX_POLL_INTERVAL": "0.2",
+        "SEARCH_INDEX_DIR": "",
+        "REMATCH_ON_CREATE": "false",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+    if smtp_port is not None:
+        os.environ["SMTP_PORT"] = str(smtp_port)
+    if mongo_uri:
+        os.environ["MONGO_URI"] = mongo_uri
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    if workers is not None:
+        os.environ["RESUME_WORKERS"] = str(workers)
+    os.environ.update(extra or {})
+
+def use_mongomock():
+    """Back utils.db with mongomock; call after prepare_environment, before importing the app."""
+    import mongomock
+    from mongomock.collection import BulkOperationBuilder
+    import utils.db
+
+    # pymongo >= 4.9 passes sort= to the bulk builder, which mongomock 4.x does not take
+    for name in ("add_update", "add_replace"):
+        original = getattr(BulkOperationBuilder, name)
+        if "sort" not in inspect.signature(original).parameters:
+            def compatible(self, *args, _original=original, sort=None, **kwargs):
+                return _original(self, *args, **kwargs)
+            setattr(BulkOperationBuilder, name, compatible)
+    utils.db.MongoClient = mongomock.MongoClient
+
+def drop_bench_database():
+    from utils.db import get_client
+    get_client().drop_database(BENCH_DATABASE)
+
+
+# ---------------- SMTP sink ----------------
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        self.reply("220 localhost benchmark SMTP sink")
+        data, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if data is not None:
+                if line.rstrip(b"\r\n") == b".":
+                    sink.record(recipients, b"".join(data))
+                    data, recipients = None, []
+                    self.reply("250 OK: queued")
+                else:
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                continue
+            command = line.decode("latin-1").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-localhost\r\n250 8BITMIME\r\n")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                data = []
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                if verb == "RSET":
+                    recipients = []
+                self.reply("250 OK")
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Local SMTP server that stores nothing but counts; ``delay_ms`` simulates a slow relay."""
+
+    def __init__(self, host="127.0.0.1", port=0, delay_ms=0):
+        self.delay_ms = delay_ms
+        self.messages = 0
+        self.recipients = []
+        self.subjects = {}
+        self._lock = threading.Lock()
+        self._server = _ThreadingSMTPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+
+    def record(self, recipients, raw):
+        if self.delay_ms:
+            time.sleep(self.delay_ms / 1000)
+        subject = str(make_header(decode_header(message_from_bytes(raw).get("Subject", ""))))
+        with self._lock:
+            self.messages += 1
+            self.recipients.extend(recipients)
+            self.subjects[subject] = self.subjects.get(subject, 0) + 1
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, subject_contains=None):
+        with self._lock:
+            if subject_contains is None:
+                return self.messages
+            return sum(n for subject, n in self.subjects.items() if subject_contains in subject)
+
+    def wait_for(self, count, subject_contains=None, timeout=60.0):
+        """Block until ``count`` (matching) messages arrived; returns the seconds waited (None on timeout)."""
+        started = time.perf_counter()
+        while time.perf_counter() - started < timeout:
+            if self.count(subject_contains) >= count:
+                return time.perf_counter() - started
+            time.sleep(0.02)
+        return None
+
+
+# ---------------- HTTP ----------------
+def serve(app, host="127.0.0.1", port=0):
+    """Serve a WSGI app on a threaded werkzeug server; returns (server, base_url)."""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    import logging
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no access log line per request
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"  # keep-alive, like a real client would use
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-http", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+def json_request(method, path, payload):
+    return method, path, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"}
+
+def multipart_request(path, field, filename, content, fields=None):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                 f"Content-Type: application/octet-stream\r\n\r\n".encode() + content + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return "POST", path, b"".join(parts), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+class HTTPDriver:
+    """Send prepared requests at a fixed concurrency; one keep-alive connection per worker."""
+
+    def __init__(self, base_url, concurrency, timeout=300.0):
+        target = urlsplit(base_url)
+        self.host, self.port = target.hostname, target.port or 80
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def send(self, method, path, body=None, headers=None):
+        """One request; returns (status, parsed body or raw text, seconds)."""
+        started = time.perf_counter()
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                raw = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    return 0, None, time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = raw.decode("utf-8", "replace")
+        return response.status, data, elapsed
+
+    def run(self, requests):
+        """Send every (method, path, body, headers) request; returns (results, wall seconds)."""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            results = list(pool.map(lambda request: self.send(*request), requests))
+        return results, time.perf_counter() - started
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def summarize(name, results, wall, concurrency):
+    latencies = [seconds for _, _, seconds in results]
+    ok = sum(1 for status, _, _ in results if 200 <= status < 300)
+    return {
+        "scenario": name,
+        "requests": len(results),
+        "concurrency": concurrency,
+        "ok": ok,
+        "errors": len(results) - ok,
+        "throughput_rps": round(len(results) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "wall_s": round(wall, 2),
+    }
+
+def print_table(rows, extra_columns=()):
+    columns = ["scenario", "requests", "concurrency", "ok", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms"]
+    columns += list(extra_columns)
+    widths = [max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(width) for column, width in zip(columns, widths)))
@@ -0,0 +1,37 @@
+"""gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py                    # WSGI (app:app), threaded workers
+    SERVER_MODE=async gunicorn -c gunicorn.conf.py  # ASGI (asgi:app) on uvicorn workers
+
+Each worker process builds its own app, with its own Mongo client, resume
+workers and outbox sender. With more than one worker, prefer
+``TASK_QUEUE_BACKEND=mongo`` so every process sees the same task queue.
+"""
+import multiprocessing, os
+
+SERVER_MODE = os.getenv("SERVER_MODE", "sync").lower()
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, multiprocessing.cpu_count()))))
+
+if SERVER_MODE == "async":
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "app:app"
+    worker_class = "gthread"
+    # Each thread holds one request (and one Gemini call) at a time
+    threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# A single Gemini analysis may take LLM_TIMEOUT (120s) plus retries
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers now and then; the jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "50"))
+
+# Requests are logged by the app itself (see utils/log.py)
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
@@ -0,0 +1,14 @@
+from bson import ObjectId
+
+# Large fields that listings leave out unless explicitly asked for
+HEAVY_APPLICANT_FIELDS = ("resume_text", "prescreen_features", "search_vector")
+
+def applicant_serializer(applicant):
+    applicant = dict(applicant)
+    applicant["id"] = str(applicant.pop("_id"))
+    for key, value in applicant.items():
+        if isinstance(value, ObjectId):
+            applicant[key] = str(value)
+    applicant.pop("prescreen_features", None)
+    applicant.pop("search_vector", None)
+    return applicant
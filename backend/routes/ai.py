@@ -1,100 +1,124 @@
-import os
-import time
-from flask import Blueprint, request, jsonify, current_app
-from flask_mail import Message
-import google.generativeai as genai
+import os, json, re, time
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from utils.db import db
+from utils.mailer import queue_email, send_now
+from utils.llm import generate, generate_stream, JD_MODEL, LLM_FAKE
+from utils.resume_pipeline import REJECTION_THRESHOLD
+from utils.metrics import stage
+from utils.log import get_logger
 
 ai = Blueprint("ai", __name__)
+log = get_logger("routes.ai")
 
 # ---------------- Gemini Setup ----------------
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Validate API key on startup
 if not GEMINI_API_KEY:
-    print("[ERROR] GEMINI_API_KEY not found in environment variables!")
-    print("[ERROR] Make sure .env file exists and contains GEMINI_API_KEY")
+    log.error("GEMINI_API_KEY not found in environment variables; make sure .env exists and contains it")
 elif GEMINI_API_KEY.strip() == "":
-    print("[ERROR] GEMINI_API_KEY is empty!")
-else:
-    print(f"[INFO] Gemini API key loaded successfully (first 10 chars): {GEMINI_API_KEY[:10]}...")
-    genai.configure(api_key=GEMINI_API_KEY)
-
-# ---------------- Helper Function for Safe Email ----------------
-def send_email_safely(mail, msg, retries=3, delay=2):
-    for attempt in range(1, retries + 1):
-        try:
-            mail.send(msg)
-            return True
-        except Exception as e:
-            print(f"[WARN] Email send attempt {attempt} failed: {e}")
-            if attempt < retries:
-                time.sleep(delay)
-            else:
-                raise e
+    log.error("GEMINI_API_KEY is empty")
 
 # ---------------- Job Description Generation ----------------
-@ai.route("/generate-jd", methods=["POST"])
-def generate_jd():
-    data = request.get_json()
-    title = data.get("title")
-    skills = data.get("skills")
-    experience = data.get("experience")
-
-    if not title or not skills or not experience:
-        return jsonify({"error": "Missing title, skills, or experience"}), 400
+JD_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "max_output_tokens": 800
+}
 
-    prompt_text = (
+def build_jd_prompt(title, skills, experience):
+    return (
         f"Generate a professional plain-text job description for {title}. "
         f"Include Job Summary, Responsibilities, and Requirements. "
         f"Required skills: {skills}. Expected experience: {experience}. "
         f"Return plain text only."
     )
 
+def parse_jd_request(data):
+    """Validate a JD request body; returns (title, prompt, None) or (title, None, (error, status)).
+
+    Shared with the async routes in ``asgi.py``.
+    """
+    data = data or {}
+    title = data.get("title")
+    skills = data.get("skills")
+    experience = data.get("experience")
+
+    if not title or not skills or not experience:
+        return title, None, ("Missing title, skills, or experience", 400)
+    if not GEMINI_API_KEY and not LLM_FAKE:
+        return title, None, ("Gemini API key not configured", 500)
+    return title, build_jd_prompt(title, skills, experience), None
+
+@ai.route("/generate-jd", methods=["POST"])
+def generate_jd():
+    title, prompt_text, error = parse_jd_request(request.get_json())
+    if error:
+        return jsonify({"error": error[0]}), error[1]
+
     try:
-        # Check if API key is configured
-        if not GEMINI_API_KEY:
-            return jsonify({"error": "Gemini API key not configured"}), 500
-        
-        print(f"[DEBUG] Using API key: {GEMINI_API_KEY[:15]}...")
-        print(f"[DEBUG] Generating JD for: {title}")
-        
-        # ✅ Using Gemini 2.0 Flash (latest and fastest model)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(
-            prompt_text,
-            generation_config=genai.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=800
-            )
-        )
+        log.debug("generating job description", extra={"title": title})
+        response = generate(JD_MODEL, prompt_text, generation_config=JD_GENERATION_CONFIG)
         jd_text = response.text
-        print(f"[SUCCESS] Generated JD (length: {len(jd_text)} chars)")
+        log.info("generated job description", extra={"title": title, "chars": len(jd_text)})
         return jsonify({"description": jd_text})
     except Exception as e:
-        import traceback
-        print("[ERROR][generate_jd]", e)
-        print(traceback.format_exc())
+        log.exception("generate_jd failed", extra={"title": title})
         return jsonify({"error": f"JD generation failed: {str(e)}"}), 500
 
-# ---------------- Send Interview / Rejection Email ----------------
-@ai.route("/send-response", methods=["POST"])
-def send_response():
-    data = request.json
-    candidate_email = data.get("email")
-    fit_score = data.get("fit_score")
-    candidate_name = data.get("name")
-    interview_date = data.get("interview_date")
-    interview_time = data.get("interview_time")
+# ---------------- Streaming Job Description Generation ----------------
+def sse_event(data, event=None):
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
 
-    if not candidate_email or fit_score is None:
-        return jsonify({"error": "Missing email or fit score"}), 400
+@ai.route("/generate-jd/stream", methods=["POST"])
+def generate_jd_stream():
+    """Same as /generate-jd, but sends the text as Server-Sent Events while Gemini writes it.
 
-    try:
-        mail = current_app.extensions.get('mail')
+    Events: unnamed ``{"text": chunk}`` messages, then ``done`` with the full
+    description, or ``error`` if generation fails part-way.
+    """
+    title, prompt_text, error = parse_jd_request(request.get_json())
+    if error:
+        return jsonify({"error": error[0]}), error[1]
+
+    def events():
+        started = time.perf_counter()
+        parts = []
+        try:
+            for text in generate_stream(JD_MODEL, prompt_text, generation_config=JD_GENERATION_CONFIG):
+                if not parts:
+                    log.info("first job description chunk", extra={
+                        "title": title, "ttft_ms": round((time.perf_counter() - started) * 1000, 2)})
+                parts.append(text)
+                yield sse_event({"text": text})
+            jd_text = "".join(parts)
+            log.info("streamed job description", extra={"title": title, "chars": len(jd_text)})
+            yield sse_event({"description": jd_text}, event="done")
+        except Exception as e:
+            log.exception("generate_jd_stream failed", extra={"title": title})
+            yield sse_event({"error": f"JD generation failed: {str(e)}"}, event="error")
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        # Keep proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------------- Send Interview / Rejection Email ----------------
+# Fit score (percent) that earns an interview; the same cutoff as the automatic rejection emails
+INTERVIEW_THRESHOLD = round(REJECTION_THRESHOLD * 100, 2)
 
-        if float(fit_score) > 85:
-            subject = "🎉 Interview Invitation - AI HR System"
-            body = f"""
+def response_email(candidate_name, fit_score, interview_date=None, interview_time=None, outcome=None):
+    """(outcome, subject, body) of a candidate response; the outcome follows the score unless given."""
+    outcome = outcome or ("interview" if float(fit_score) >= INTERVIEW_THRESHOLD else "rejection")
+    if outcome == "interview":
+        subject = "🎉 Interview Invitation - AI HR System"
+        body = f"""
 Dear {candidate_name},
 
 Congratulations! Your profile has been shortlisted with a Fit Score of {fit_score}.
@@ -108,9 +132,9 @@ Please confirm your availability by replying to this email.
 Best regards,
 HR Team
 """
-        else:
-            subject = "Your Application Update - AI HR System"
-            body = f"""
+    else:
+        subject = "Your Application Update - AI HR System"
+        body = f"""
 Dear {candidate_name},
 
 Thank you for applying. Your profile scored {fit_score} in our screening. 
@@ -119,12 +143,162 @@ We appreciate your interest and encourage you to apply for future opportunities.
 Best regards,
 HR Team
 """
+    return outcome, subject, body
 
-        msg = Message(subject, sender=current_app.config["MAIL_USERNAME"], recipients=[candidate_email])
-        msg.body = body
-        send_email_safely(mail, msg)
-        return jsonify({"message": "Email sent successfully ✅"}), 200
+@ai.route("/send-response", methods=["POST"])
+def send_response():
+    data = request.json
+    candidate_email = data.get("email")
+    fit_score = data.get("fit_score")
+    candidate_name = data.get("name")
+    interview_date = data.get("interview_date")
+    interview_time = data.get("interview_time")
 
+    if not candidate_email or fit_score is None:
+        return jsonify({"error": "Missing email or fit score"}), 400
+
+    try:
+        _, subject, body = response_email(candidate_name, fit_score, interview_date, interview_time)
+
+        # Retries with backoff happen in the outbox sender, not on the request thread
+        message_id = queue_email(candidate_email, subject, body, kind="response")
+        return jsonify({"message": "Email queued for delivery ✅", "outbox_id": str(message_id)}), 202
+
+    except Exception as e:
+        log.exception("send_response failed")
+        return jsonify({"error": f"Email queueing failed: {e}"}), 500
+
+# ---------------- Bulk Interview / Rejection Emails ----------------
+BULK_RESPONSE_MAX = int(os.getenv("BULK_RESPONSE_MAX", "1000"))
+OUTCOMES = ("interview", "rejection")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+def job_candidates(job_id, outcome, threshold, resend):
+    """Analyzed applicants of a job on the ``outcome`` side of ``threshold`` (a percentage)."""
+    cutoff = threshold / 100
+    query = {
+        "job_id": job_id,
+        "status": "completed",
+        "fit_score": {"$gte": cutoff} if outcome == "interview" else {"$lt": cutoff},
+    }
+    if not resend:
+        # Applicants who already got a response in an earlier round, including ones still in the outbox
+        query["response_email.status"] = {"$nin": ["sent", "queued"]}
+    projection = {"candidate_name": 1, "candidate_email": 1, "fit_score": 1}
+    return [{
+        "applicant_id": applicant["_id"],
+        "email": applicant.get("candidate_email"),
+        "name": applicant.get("candidate_name") or "Candidate",
+        "fit_score": round((applicant.get("fit_score") or 0) * 100, 2),
+        "outcome": outcome,
+    } for applicant in db.applicants.find(query, projection).sort("fit_score", -1)]
+
+def mark_responded(report):
+    """Remember on each applicant which response went out, so a later round can skip them."""
+    operations = [UpdateOne({"_id": entry["applicant_id"]}, {"$set": {"response_email": {
+        "outcome": entry["outcome"], "status": entry["status"], "outbox_id": entry["outbox_id"],
+        "at": datetime.utcnow(),
+    }}}) for entry in report if entry.get("applicant_id") and entry["status"] != "skipped"]
+    if operations:
+        db.applicants.bulk_write(operations, ordered=False)
+
+@ai.route("/send-responses", methods=["POST"])
+def send_responses():
+    """Interview invitations or rejections for many candidates, sent in this request.
+
+    Takes either {"candidates": [{"email", "name", "fit_score", "interview_date",
+    "interview_time", "outcome"}]} or {"job_id", "outcome": "interview" |
+    "rejection", "threshold": 85, "resend": false}, which picks the job's
+    analyzed applicants at or above (interview) or below (rejection) the
+    threshold. "interview_date"/"interview_time" at the top level apply to
+    every candidate without their own; an invitation without both is not
+    sent. Returns a per-recipient report.
+    """
+    data = request.get_json(silent=True) or {}
+    started = time.perf_counter()
+    candidates = data.get("candidates")
+    job_id = data.get("job_id")
+    outcome = data.get("outcome")
+
+    from_job = candidates is None
+    if from_job and not job_id:
+        return jsonify({"error": "Provide candidates or a job_id"}), 400
+    if outcome is not None and outcome not in OUTCOMES:
+        return jsonify({"error": f"outcome must be one of {', '.join(OUTCOMES)}"}), 400
+    if from_job:
+        if outcome is None:
+            return jsonify({"error": "outcome is required with job_id"}), 400
+        try:
+            threshold = float(data.get("threshold", INTERVIEW_THRESHOLD))
+        except (TypeError, ValueError):
+            return jsonify({"error": "threshold must be a number"}), 400
+        if outcome == "interview" and not (data.get("interview_date") and data.get("interview_time")):
+            return jsonify({"error": "interview_date and interview_time are required for interview invitations"}), 400
+        if not ObjectId.is_valid(job_id):
+            return jsonify({"error": "Job not found"}), 404
+        with stage("mongo_lookup"):
+            if not db.jobs.find_one({"_id": ObjectId(job_id)}, {"_id": 1}):
+                return jsonify({"error": "Job not found"}), 404
+            candidates = job_candidates(job_id, outcome, threshold, bool(data.get("resend")))
+    elif not isinstance(candidates, list):
+        return jsonify({"error": "candidates must be a list"}), 400
+    if len(candidates) > BULK_RESPONSE_MAX:
+        return jsonify({"error": f"At most {BULK_RESPONSE_MAX} candidates per request"}), 400
+
+    # Rendered locally; invalid and repeated recipients are reported, not sent
+    report, messages, seen = [], [], set()
+    for candidate in candidates:
+        candidate = candidate if isinstance(candidate, dict) else {}
+        email = (candidate.get("email") or "").strip()
+        entry = {"email": email, "name": candidate.get("name"), "fit_score": candidate.get("fit_score"),
+                 "outcome": candidate.get("outcome") or outcome, "status": "skipped", "outbox_id": None, "error": None}
+        if candidate.get("applicant_id"):
+            entry["applicant_id"] = candidate["applicant_id"]
+        report.append(entry)
+        if not EMAIL_RE.match(email):
+            entry["error"] = "missing or invalid email"
+            continue
+        if email.lower() in seen:
+            entry["error"] = "duplicate recipient"
+            continue
+        if isinstance(entry["fit_score"], bool) or not isinstance(entry["fit_score"], (int, float)):
+            entry["error"] = "missing or invalid fit_score"
+            continue
+        if entry["outcome"] is not None and entry["outcome"] not in OUTCOMES:
+            entry["error"] = f"outcome must be one of {', '.join(OUTCOMES)}"
+            continue
+        interview_date = candidate.get("interview_date") or data.get("interview_date")
+        interview_time = candidate.get("interview_time") or data.get("interview_time")
+        entry["outcome"], subject, body = response_email(
+            entry["name"] or "Candidate", entry["fit_score"], interview_date, interview_time, entry["outcome"])
+        if entry["outcome"] == "interview" and not (interview_date and interview_time):
+            entry["error"] = "missing interview_date or interview_time"
+            continue
+        seen.add(email.lower())
+        messages.append((entry, {"to": email, "subject": subject, "body": body, "kind": "response"}))
+
+    try:
+        results = send_now([message for _, message in messages])
     except Exception as e:
-        print("[ERROR][send_response]", e)
-        return jsonify({"error": f"Email sending failed: {e}"}), 500
\ No newline at end of file
+        log.exception("send_responses failed", extra={"recipients": len(messages)})
+        return jsonify({"error": f"Email dispatch failed: {e}"}), 500
+    for (entry, _), result in zip(messages, results):
+        entry.update(result)
+
+    if from_job:
+        try:
+            with stage("mongo_insert"):
+                mark_responded(report)
+        except Exception:
+            log.exception("could not record responses on applicants", extra={"job_id": job_id})
+        for entry in report:
+            entry["applicant_id"] = str(entry["applicant_id"])
+
+    counts = {status: sum(entry["status"] == status for entry in report) for status in ("sent", "queued", "failed", "skipped")}
+    log.info("bulk responses dispatched", extra={"job_id": job_id, "total": len(report), **counts})
+    return jsonify({
+        "total": len(report),
+        **counts,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": report,
+    }), 200
@@ -1,52 +1,75 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, Response, stream_with_context, after_this_request
 from werkzeug.utils import secure_filename
-from utils.db import db
+from utils.db import db, bulk_collection
+from utils.task_queue import enqueue, PRIORITY_LOW
+from utils.analysis_cache import get_analysis_cache
+from utils.extraction import extract_text, extract_each, MAX_RESUME_BYTES
+from utils.resume_pipeline import (
+    load_job_context, BATCH_SCORING_MAX_RESUMES, empty_analysis, analyze_resume,
+    applicant_fields, analysis_response, notify_candidate, prescreen, prescreened_analysis,
+)
+from utils.pagination import page_size, fetch_page, parse_fields
+from models.applicant import applicant_serializer, HEAVY_APPLICANT_FIELDS
+from utils.prescreen import get_scorer, featurize, encode_features, decode_features
+from utils.dedup import fingerprint, find_duplicate, FingerprintIndex
+from utils.blob_store import store_upload, release_upload, text_fields, resume_texts, TEXT_FIELDS, HAS_RESUME_TEXT
+from utils.search_index import search_fields
+from utils.job_stats import record_insert
+from utils.metrics import stage, RESUMES
+from utils.log import get_logger
 from datetime import datetime
-import os, json, PyPDF2, docx, re, traceback
-import google.generativeai as genai
+import os, json, time, zipfile
 from bson import ObjectId
-from flask_mail import Message
-import dotenv
-
-dotenv.load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from pymongo import UpdateOne
+from bson.errors import InvalidId
 
 applicants = Blueprint("applicants", __name__)
+log = get_logger("routes.applicants")
 
 UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 ALLOWED_EXTENSIONS = {"pdf", "docx"}
+# When true, uploads are queued for background analysis unless the request asks for ?async=false
+RESUME_ASYNC_DEFAULT = os.getenv("RESUME_ASYNC_DEFAULT", "false").lower() == "true"
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "1000"))
+# Uncompressed bytes one uploaded ZIP may expand to, counted while copying (not from entry headers)
+BULK_MAX_ARCHIVE_BYTES = int(os.getenv("BULK_MAX_ARCHIVE_BYTES", str(500 * 1024 * 1024)))
+# When true, bulk uploads score several resumes per Gemini call unless ?batch_scoring=false
+BATCH_SCORING_DEFAULT = os.getenv("BATCH_SCORING_DEFAULT", "false").lower() == "true"
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text(file_path):
-    ext = file_path.rsplit(".", 1)[1].lower()
-    text = ""
-    try:
-        if ext == "pdf":
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + " "
-        elif ext == "docx":
-            doc = docx.Document(file_path)
-            for para in doc.paragraphs:
-                text += para.text + " "
-        return text.strip()
-    except Exception as e:
-        print("[ERROR][extract_text]", e)
-        return ""
+def flag(name, default):
+    value = request.args.get(name, request.form.get(name))
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
 
-def send_email(mail, recipient, subject, body):
-    try:
-        msg = Message(subject, sender=current_app.config["MAIL_USERNAME"], recipients=[recipient])
-        msg.body = body
-        mail.send(msg)
-    except Exception as e:
-        print("[ERROR][send_email]", e)
+def wants_async():
+    return flag("async", RESUME_ASYNC_DEFAULT)
+
+def stored_analysis(applicant):
+    """Rebuild the upload API's analysis payload from a completed applicant document."""
+    analysis_result = empty_analysis()
+    analysis_result.update({key: applicant[key] for key in analysis_result if key in applicant})
+    analysis_result["summary"] = applicant.get("skills_summary", analysis_result["summary"])
+    return analysis_response(analysis_result)
+
+def duplicate_response(duplicate):
+    """Answer an upload with the applicant it duplicates instead of processing it again."""
+    existing = duplicate["applicant"]
+    status = existing.get("status", "completed")
+    response = {
+        "message": "Duplicate resume; returning the existing applicant",
+        "duplicate": True,
+        "match": duplicate["match"],
+        "applicant_id": str(existing["_id"]),
+        "status": status,
+    }
+    if status == "completed":
+        response.update(stored_analysis(existing))
+    return jsonify(response), 200
 
 @applicants.route("/upload-resume/<job_id>", methods=["POST"])
 def upload_resume(job_id):
@@ -62,141 +85,485 @@ def upload_resume(job_id):
             return jsonify({"error": f"File type not allowed. Allowed: {ALLOWED_EXTENSIONS}"}), 400
 
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
+        # Stored under a content hash, so same-named uploads cannot overwrite each other
+        with stage("file_save"):
+            file_path, file_hash, file_fields = store_upload(file.stream, filename, UPLOAD_FOLDER)
+
+        @after_this_request
+        def discard_working_copy(response):
+            # The original is in the blob store; the local copy was only needed for extraction
+            release_upload(file_path)
+            return response
+
+        check_duplicates = not flag("allow_duplicates", False)
 
-        resume_text = extract_text(file_path)
+        # ----------- Same file already uploaded for this job -----------
+        with stage("mongo_lookup"):
+            duplicate = find_duplicate(db.applicants, job_id, {"file_hash": file_hash}) if check_duplicates else None
+        if duplicate:
+            RESUMES.inc(outcome="duplicate")
+            return duplicate_response(duplicate)
+
+        if wants_async():
+            return enqueue_resume(job_id, filename, file_fields, file_hash, check_duplicates)
+
+        with stage("extract_text"):
+            resume_text = extract_text(file_path)
         if not resume_text.strip():
+            RESUMES.inc(outcome="no_text")
             return jsonify({"fit_score": 0, "summary": "Parsing failed (no text found)"}), 200
 
-        job = db.jobs.find_one({"_id": ObjectId(job_id)})
+        # ----------- Same (or nearly the same) resume text -----------
+        with stage("fingerprint"):
+            fingerprints = {"file_hash": file_hash, **fingerprint(resume_text)}
+        with stage("mongo_lookup"):
+            duplicate = find_duplicate(db.applicants, job_id, fingerprints) if check_duplicates else None
+            if not duplicate:
+                job, company_name = load_job_context(job_id)
+        if duplicate:
+            RESUMES.inc(outcome="duplicate")
+            return duplicate_response(duplicate)
         if not job:
             return jsonify({"error": "Job not found"}), 404
         job_desc = job.get("description", "")
-        job_title = job.get("title", "the position")
-        created_by = job.get("created_by")  # HR/admin email
-
-        # Fetch company name from HR/admin
-        company_name = "Our Company"
-        if created_by:
-            hr_doc = db.users.find_one({"email": created_by})
-            if hr_doc and hr_doc.get("company_name"):
-                company_name = hr_doc["company_name"]
-
-        analysis_result = {
-            "fit_score": 0,
-            "summary": "Parsing failed",
-            "education": [],
-            "skills": [],
-            "experience": [],
-            "projects": [],
-            "weak_areas": [],
-            "recommendations": [],
-            "candidate_name": "",
-            "candidate_email": ""
-        }
 
-        # ----------- Gemini Resume Analysis -----------
-        try:
-            prompt = f"""
-You are an AI HR assistant. Analyze this resume against the job description.
-Return ONLY a valid JSON like this:
-{{
-  "fit_score": <float 0-1>,
-  "summary": "<short professional summary>",
-  "education": ["<degree/institution>"],
-  "skills": ["<skill1>", "<skill2>"],
-  "experience": ["<role1>", "<role2>"],
-  "projects": ["<project1>", "<project2>"],
-  "weak_areas": ["<weak1>", "<weak2>"],
-  "recommendations": ["<rec1>", "<rec2>"],
-  "candidate_name": "<full name if available>",
-  "candidate_email": "<email if available>"
-}}
-Job Description:
-{job_desc}
-Resume Text:
-{resume_text}
-"""
-            model = genai.GenerativeModel("models/gemini-2.5-pro")
-            response = model.generate_content(prompt)
-            raw_text = response.text.strip()
-            match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-            if match:
-                result = json.loads(match.group(0))
-                for key in analysis_result.keys():
-                    if key in result:
-                        analysis_result[key] = result[key]
-        except Exception as e:
-            print("[ERROR][Gemini AI parsing]", e)
-            traceback.print_exc()
+        # ----------- Local pre-screen before the LLM -----------
+        with stage("prescreen"):
+            [prescreen_score], [decision], [prescreen_features] = prescreen([resume_text], job)
+        if decision == "defer":
+            return defer_resume(job_id, filename, resume_text, prescreen_score, prescreen_features,
+                                file_fields, fingerprints)
+        if decision == "skip":
+            analysis_result = prescreened_analysis(prescreen_score)
+        else:
+            analysis_result = analyze_resume(resume_text, job_desc)
 
         applicant = {
             "job_id": job_id,
             "filename": filename,
-            "resume_text": resume_text,
-            "fit_score": analysis_result["fit_score"],
-            "skills_summary": analysis_result["summary"],
-            "education": analysis_result.get("education", []),
-            "skills": analysis_result.get("skills", []),
-            "experience": analysis_result.get("experience", []),
-            "projects": analysis_result.get("projects", []),
-            "weak_areas": analysis_result.get("weak_areas", []),
-            "recommendations": analysis_result.get("recommendations", []),
-            "candidate_name": analysis_result.get("candidate_name", ""),
-            "candidate_email": analysis_result.get("candidate_email", ""),
+            **file_fields,
+            **text_fields(resume_text),
+            **fingerprints,
+            **applicant_fields(analysis_result),
+            "prescreen_score": prescreen_score,
+            "prescreen_features": prescreen_features,
+            "prescreened_out": decision == "skip",
+            "status": "completed",
             "uploaded_at": datetime.utcnow(),
         }
-        applicant_id = db.applicants.insert_one(applicant).inserted_id
+        with stage("embed"):
+            applicant.update(search_fields(resume_text, analysis_result.get("skills")))
+        with stage("mongo_insert"):
+            applicant_id = db.applicants.insert_one(applicant).inserted_id
+            record_insert([applicant])
 
-        # ----------- Send Email based on Fit Score -----------
-        mail = current_app.extensions.get("mail")
-        candidate_email = analysis_result.get("candidate_email")
-        if not candidate_email:
-            email_match = re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", resume_text)
-            candidate_email = email_match.group(0) if email_match else None
-
-        if candidate_email:
-            candidate_name = analysis_result.get("candidate_name", "Candidate")
-            if analysis_result["fit_score"] < 0.85:
-                # Rejection email sent automatically
-                email_msg = f"""
-Generate ONLY a professional, polite, and encouraging rejection email for {candidate_name} 
-who applied for the {job_title} position at {company_name}.
-Mention that they scored {analysis_result['fit_score']*100:.2f}% in the initial screening.
-Do NOT include any extra commentary or mention AI generation.
-Return ONLY the email text.
-"""
-                try:
-                    model = genai.GenerativeModel("models/gemini-2.5-pro")
-                    email_response = model.generate_content(email_msg)
-                    polite_reply = email_response.text.strip()
-                    polite_reply = re.sub(r"^(Of course.*?email\.?)\s*", "", polite_reply, flags=re.IGNORECASE)
-                    email_subject = f"Application Update for {job_title} at {company_name}"
-                    send_email(mail, candidate_email, email_subject, polite_reply)
-                except Exception as e:
-                    print("[ERROR][send rejection email]", e)
-            else:
-                # Score >= 85% → do not send invitation automatically
-                # HR/admin must schedule date/time and send invitation manually
-                print(f"[INFO] Candidate {candidate_name} scored {analysis_result['fit_score']*100:.2f}%. Awaiting HR scheduling.")
+        with stage("email"):
+            notify_candidate(resume_text, analysis_result, job, company_name, applicant_id)
+        RESUMES.inc(outcome="prescreened_out" if decision == "skip" else "completed")
 
         return jsonify({
             "message": "Resume analyzed successfully",
-            "fit_score": round(analysis_result["fit_score"] * 100, 2),
-            "summary": analysis_result["summary"],
-            "education": analysis_result["education"],
-            "skills": analysis_result["skills"],
-            "experience": analysis_result["experience"],
-            "projects": analysis_result["projects"],
-            "weak_areas": analysis_result["weak_areas"],
-            "recommendations": analysis_result["recommendations"],
-            "candidate_name": analysis_result.get("candidate_name", ""),
-            "candidate_email": analysis_result.get("candidate_email", ""),
+            **analysis_response(analysis_result),
+            "prescreen_score": prescreen_score,
             "applicant_id": str(applicant_id)
         }), 201
 
     except Exception as e:
-        print("[ERROR][upload_resume]", e)
-        traceback.print_exc()
+        log.exception("upload_resume failed", extra={"job_id": job_id})
         return jsonify({"error": "Failed to upload/analyze resume", "details": str(e)}), 500
+
+def enqueue_resume(job_id, filename, file_fields, file_hash, check_duplicates=True):
+    if not db.jobs.find_one({"_id": ObjectId(job_id)}, {"_id": 1}):
+        return jsonify({"error": "Job not found"}), 404
+
+    applicant = {
+        "job_id": job_id,
+        "filename": filename,
+        **file_fields,
+        "file_hash": file_hash,
+        "status": "pending",
+        "uploaded_at": datetime.utcnow(),
+    }
+    applicant_id = db.applicants.insert_one(applicant).inserted_id
+    record_insert([applicant])
+    task_id = enqueue("analyze_resume", {"applicant_id": str(applicant_id), "check_duplicates": check_duplicates})
+    return jsonify({
+        "message": "Resume queued for analysis",
+        "applicant_id": str(applicant_id),
+        "task_id": str(task_id),
+        "status": "pending",
+        "status_url": f"/api/applicants/{applicant_id}/status",
+    }), 202
+
+def defer_resume(job_id, filename, resume_text, prescreen_score, prescreen_features, file_fields, fingerprints):
+    applicant = {
+        "job_id": job_id,
+        "filename": filename,
+        **file_fields,
+        **text_fields(resume_text),
+        **fingerprints,
+        **search_fields(resume_text),
+        "prescreen_score": prescreen_score,
+        "prescreen_features": prescreen_features,
+        "status": "deferred",
+        "uploaded_at": datetime.utcnow(),
+    }
+    with stage("mongo_insert"):
+        applicant_id = db.applicants.insert_one(applicant).inserted_id
+        record_insert([applicant])
+    RESUMES.inc(outcome="deferred")
+    task_id = enqueue("analyze_resume", {"applicant_id": str(applicant_id), "deferred": True}, priority=PRIORITY_LOW)
+    return jsonify({
+        "message": "Resume is below the pre-screening cutoff; analysis deferred",
+        "applicant_id": str(applicant_id),
+        "task_id": str(task_id),
+        "status": "deferred",
+        "prescreen_score": prescreen_score,
+        "status_url": f"/api/applicants/{applicant_id}/status",
+    }), 202
+
+@applicants.route("/applicants/<applicant_id>/status", methods=["GET"])
+def applicant_status(applicant_id):
+    try:
+        applicant = db.applicants.find_one({"_id": ObjectId(applicant_id)}, {"resume_text": 0, "prescreen_features": 0})
+    except InvalidId:
+        return jsonify({"error": "Invalid applicant id"}), 400
+    if not applicant:
+        return jsonify({"error": "Applicant not found"}), 404
+
+    status = applicant.get("status", "completed")
+    response = {"applicant_id": applicant_id, "job_id": applicant.get("job_id"), "status": status}
+    if "prescreen_score" in applicant:
+        response["prescreen_score"] = applicant["prescreen_score"]
+    if status == "completed":
+        response.update(stored_analysis(applicant))
+    elif status == "failed":
+        response["error"] = applicant.get("error", "Analysis failed")
+    elif status == "duplicate":
+        response["duplicate_of"] = applicant.get("duplicate_of")
+    return jsonify(response), 200
+
+@applicants.route("/analysis-cache/stats", methods=["GET"])
+def analysis_cache_stats():
+    return jsonify(get_analysis_cache().snapshot()), 200
+
+# ---------------- Applicant Listing ----------------
+@applicants.route("/jobs/<job_id>/applicants", methods=["GET"])
+def list_applicants(job_id):
+    """Applicants of a job, best fit first (or newest first with ?sort=uploaded_at)."""
+    try:
+        limit = page_size(request.args.get("limit"))
+        sort_field = request.args.get("sort", "fit_score")
+        if sort_field not in ("fit_score", "uploaded_at"):
+            return jsonify({"error": "sort must be fit_score or uploaded_at"}), 400
+
+        query = {"job_id": job_id}
+        if sort_field == "fit_score":
+            # Pending applicants have no score yet and would break the keyset order
+            query["fit_score"] = {"$type": "number"}
+        # Uploads recognised as duplicates only point at the original applicant
+        query["status"] = request.args.get("status") or {"$ne": "duplicate"}
+
+        projection = parse_fields(request.args.get("fields"))
+        if projection:
+            projection[sort_field] = 1
+            with_text = "resume_text" in projection
+            if with_text:
+                projection["resume_blob"] = 1
+        else:
+            included = set(filter(None, request.args.get("include", "").split(",")))
+            projection = {field: 0 for field in HEAVY_APPLICANT_FIELDS if field not in included}
+            with_text = "resume_text" in included
+
+        try:
+            docs, next_cursor = fetch_page(
+                db.applicants, query, sort_field, limit, request.args.get("cursor"), projection or None
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if with_text:
+            # Fetched from the blob store only when asked for
+            texts = resume_texts(docs)
+            for doc in docs:
+                doc.pop("resume_blob", None)
+                if doc["_id"] in texts:
+                    doc["resume_text"] = texts[doc["_id"]]
+
+        return jsonify({
+            "applicants": [applicant_serializer(doc) for doc in docs],
+            "next_cursor": next_cursor,
+            "limit": limit,
+        }), 200
+    except Exception as e:
+        log.exception("list_applicants failed", extra={"job_id": job_id})
+        return jsonify({"error": f"Failed to fetch applicants: {str(e)}"}), 500
+
+# ---------------- Pre-screen Ranking ----------------
+@applicants.route("/jobs/<job_id>/prescreen-ranking", methods=["GET"])
+def prescreen_ranking(job_id):
+    """Re-rank every stored applicant of a job with the local pre-screen scorer."""
+    try:
+        job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    except InvalidId:
+        return jsonify({"error": "Invalid job id"}), 400
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    limit = request.args.get("limit", default=50, type=int)
+    started = time.perf_counter()
+    pool = list(db.applicants.find(
+        {"job_id": job_id, **HAS_RESUME_TEXT},
+        {"prescreen_features": 1, "candidate_name": 1, "candidate_email": 1, "fit_score": 1, "filename": 1},
+    ))
+    # Applicants stored before pre-screening existed have no features yet
+    missing = [applicant["_id"] for applicant in pool if "prescreen_features" not in applicant]
+    backfill = {}
+    if missing:
+        texts = resume_texts(db.applicants.find({"_id": {"$in": missing}}, TEXT_FIELDS))
+        backfill = {applicant_id: featurize(text) for applicant_id, text in texts.items()}
+    features = [backfill[a["_id"]] if a["_id"] in backfill else decode_features(a["prescreen_features"]) for a in pool]
+    fetched = time.perf_counter()
+
+    scores = get_scorer(job).score_features(features)
+    order = scores.argsort()[::-1][:limit]
+    scored = time.perf_counter()
+
+    if flag("store", False) and pool:
+        updates = []
+        for applicant, feature, score in zip(pool, features, scores):
+            fields = {"prescreen_score": round(float(score), 4)}
+            if applicant["_id"] in backfill:
+                fields["prescreen_features"] = encode_features(*feature)
+            updates.append(UpdateOne({"_id": applicant["_id"]}, {"$set": fields}))
+        db.applicants.bulk_write(updates, ordered=False)
+
+    return jsonify({
+        "job_id": job_id,
+        "pool_size": len(pool),
+        "fetch_ms": round((fetched - started) * 1000, 2),
+        "score_ms": round((scored - fetched) * 1000, 2),
+        "ranking": [{
+            "applicant_id": str(pool[i]["_id"]),
+            "filename": pool[i].get("filename", ""),
+            "candidate_name": pool[i].get("candidate_name", ""),
+            "candidate_email": pool[i].get("candidate_email", ""),
+            "fit_score": pool[i].get("fit_score"),
+            "prescreen_score": round(float(scores[i]), 4),
+        } for i in order],
+    }), 200
+
+# ---------------- Bulk Resume Ingestion ----------------
+class FileTooLarge(ValueError):
+    pass
+
+
+class LimitedReader:
+    """Binary stream wrapper that raises FileTooLarge once more than ``limit`` bytes were read."""
+
+    def __init__(self, source, limit):
+        self.source = source
+        self.limit = limit
+        self.count = 0
+
+    def read(self, size=-1):
+        room = self.limit - self.count + 1  # one byte past the limit is enough to detect it
+        chunk = self.source.read(room if size is None or size < 0 else min(size, room))
+        self.count += len(chunk)
+        if self.count > self.limit:
+            raise FileTooLarge(f"File larger than {self.limit} bytes")
+        return chunk
+
+
+def save_bulk_files(uploads):
+    """Save multi-file and ZIP uploads; returns (saved, rejected) lists.
+
+    Files over ``MAX_RESUME_BYTES`` and ZIP entries past the archive's
+    ``BULK_MAX_ARCHIVE_BYTES`` budget are rejected. Sizes are counted while
+    copying, so an entry whose header understates its size is still caught.
+    """
+    saved, rejected = [], []
+
+    for upload in uploads:
+        if not upload.filename:
+            continue
+        if upload.filename.lower().endswith(".zip"):
+            expanded = 0
+            try:
+                with zipfile.ZipFile(upload.stream) as archive:
+                    for entry in archive.infolist():
+                        if entry.is_dir():
+                            continue
+                        name = os.path.basename(entry.filename)
+                        if not allowed_file(name):
+                            rejected.append({"filename": entry.filename, "status": "rejected", "error": "File type not allowed"})
+                            continue
+                        if len(saved) >= BULK_MAX_FILES:
+                            rejected.append({"filename": entry.filename, "status": "rejected", "error": f"Batch limit of {BULK_MAX_FILES} files reached"})
+                            continue
+                        if entry.file_size > MAX_RESUME_BYTES:
+                            rejected.append({"filename": entry.filename, "status": "rejected", "error": f"File larger than {MAX_RESUME_BYTES} bytes"})
+                            continue
+                        if expanded + entry.file_size > BULK_MAX_ARCHIVE_BYTES:
+                            rejected.append({"filename": entry.filename, "status": "rejected", "error": f"Archive expands beyond {BULK_MAX_ARCHIVE_BYTES} bytes"})
+                            continue
+                        filename = secure_filename(name)
+                        limit = min(MAX_RESUME_BYTES, BULK_MAX_ARCHIVE_BYTES - expanded)
+                        with archive.open(entry) as src:
+                            reader = LimitedReader(src, limit)
+                            try:
+                                file_path, file_hash, file_fields = store_upload(reader, filename, UPLOAD_FOLDER)
+                            except FileTooLarge as e:
+                                error = str(e) if limit == MAX_RESUME_BYTES else f"Archive expands beyond {BULK_MAX_ARCHIVE_BYTES} bytes"
+                                rejected.append({"filename": entry.filename, "status": "rejected", "error": error})
+                                continue
+                            finally:
+                                expanded += reader.count
+                        saved.append({"filename": filename, "file_path": file_path, "file_hash": file_hash,
+                                      "file_fields": file_fields})
+            except zipfile.BadZipFile:
+                rejected.append({"filename": upload.filename, "status": "rejected", "error": "Invalid ZIP archive"})
+            continue
+
+        if not allowed_file(upload.filename):
+            rejected.append({"filename": upload.filename, "status": "rejected", "error": "File type not allowed"})
+            continue
+        if len(saved) >= BULK_MAX_FILES:
+            rejected.append({"filename": upload.filename, "status": "rejected", "error": f"Batch limit of {BULK_MAX_FILES} files reached"})
+            continue
+        filename = secure_filename(upload.filename)
+        try:
+            file_path, file_hash, file_fields = store_upload(LimitedReader(upload.stream, MAX_RESUME_BYTES), filename, UPLOAD_FOLDER)
+        except FileTooLarge as e:
+            rejected.append({"filename": upload.filename, "status": "rejected", "error": str(e)})
+            continue
+        saved.append({"filename": filename, "file_path": file_path, "file_hash": file_hash, "file_fields": file_fields})
+    return saved, rejected
+
+def ingest_bulk(job_id, job_context, saved, rejected, batch_scoring=False, check_duplicates=True):
+    """Extract every saved file in the process pool, then insert and queue the applicants.
+
+    Yields one progress event per file as its extraction finishes and a final
+    ``done`` event carrying the per-file results. Resumes already stored for
+    the job, or repeated within the batch, are reported as duplicates and
+    not queued.
+    """
+    try:
+        yield from _ingest_bulk(job_id, job_context, saved, rejected, batch_scoring, check_duplicates)
+    finally:
+        # Also when the client goes away mid-stream
+        for item in saved:
+            release_upload(item["file_path"])
+
+def _ingest_bulk(job_id, job_context, saved, rejected, batch_scoring, check_duplicates):
+    results = list(rejected)
+    documents = []
+    duplicates = 0
+    batch_index = FingerprintIndex()
+    total = len(saved)
+    extracted = extract_each([item["file_path"] for item in saved])
+    for done, (index, resume_text, error) in enumerate(extracted, start=1):
+        item = saved[index]
+        if error:
+            log.error("text extraction failed", extra={"job_id": job_id, "file": item["filename"], "error": error})
+            result = {"filename": item["filename"], "status": "failed", "error": error}
+        elif resume_text.strip():
+            fingerprints = {"file_hash": item["file_hash"], **fingerprint(resume_text)}
+            duplicate = None
+            if check_duplicates:
+                match = batch_index.find(fingerprints)
+                if match:
+                    duplicate = {"applicant_id": match[0], "match": match[1]}
+                else:
+                    found = find_duplicate(db.applicants, job_id, fingerprints, projection={"_id": 1})
+                    if found:
+                        duplicate = {"applicant_id": str(found["applicant"]["_id"]), "match": found["match"]}
+
+            if duplicate:
+                duplicates += 1
+                result = {"filename": item["filename"], "status": "duplicate", "duplicate_of": duplicate["applicant_id"],
+                          "match": duplicate["match"]}
+            else:
+                applicant_id = ObjectId()
+                batch_index.add(str(applicant_id), fingerprints)
+                documents.append({
+                    "_id": applicant_id,
+                    "job_id": job_id,
+                    "filename": item["filename"],
+                    **item["file_fields"],
+                    **text_fields(resume_text),
+                    **fingerprints,
+                    **search_fields(resume_text),
+                    "status": "pending",
+                    "uploaded_at": datetime.utcnow(),
+                })
+                result = {"filename": item["filename"], "status": "pending", "applicant_id": str(applicant_id)}
+        else:
+            result = {"filename": item["filename"], "status": "failed", "error": "Parsing failed (no text found)"}
+        results.append(result)
+        yield {"event": "extracted", "done": done, "total": total, **result}
+
+    if documents:
+        bulk_collection("applicants").insert_many(documents, ordered=False)
+        record_insert(documents)
+        if batch_scoring:
+            for start in range(0, len(documents), BATCH_SCORING_MAX_RESUMES):
+                chunk = documents[start:start + BATCH_SCORING_MAX_RESUMES]
+                enqueue("analyze_resume_batch", {
+                    "applicant_ids": [str(document["_id"]) for document in chunk],
+                    "job_context": job_context,
+                })
+        else:
+            for document in documents:
+                enqueue("analyze_resume", {"applicant_id": str(document["_id"]), "job_context": job_context})
+
+    yield {
+        "event": "done",
+        "total": total + len(rejected),
+        "queued": len(documents),
+        "duplicates": duplicates,
+        "failed": len(results) - len(documents) - duplicates,
+        "results": results,
+    }
+
+@applicants.route("/upload-resumes/<job_id>", methods=["POST"])
+def upload_resumes(job_id):
+    try:
+        uploads = request.files.getlist("resumes") + request.files.getlist("resume")
+        if not uploads:
+            return jsonify({"error": "No files uploaded"}), 400
+
+        # Look the job up once for the whole batch rather than once per resume
+        job, company_name = load_job_context(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+
+        saved, rejected = save_bulk_files(uploads)
+        job_context = {
+            "_id": str(job["_id"]),
+            "title": job.get("title", "the position"),
+            "description": job.get("description", ""),
+            "skills": job.get("skills", ""),
+            "prescreen_cutoff": job.get("prescreen_cutoff"),
+            "prescreen_action": job.get("prescreen_action"),
+            "rejection_email_mode": job.get("rejection_email_mode"),
+            "company_name": company_name,
+        }
+        events = ingest_bulk(job_id, job_context, saved, rejected, flag("batch_scoring", BATCH_SCORING_DEFAULT),
+                             not flag("allow_duplicates", False))
+
+        if flag("stream", False):
+            return Response(
+                stream_with_context(json.dumps(event) + "\n" for event in events),
+                mimetype="application/x-ndjson",
+            )
+
+        summary = None
+        for event in events:
+            summary = event
+        summary.pop("event")
+        summary["message"] = f"{summary['queued']} resume(s) queued for analysis"
+        return jsonify(summary), 202
+
+    except Exception as e:
+        log.exception("upload_resumes failed", extra={"job_id": job_id})
+        return jsonify({"error": "Failed to upload resumes", "details": str(e)}), 500
@@ -1,32 +1,20 @@
 from flask import Blueprint, request, jsonify
 from utils.db import users_collection
-from email.mime.text import MIMEText
-import smtplib, os
+from utils.mailer import queue_email
+from utils.log import get_logger
 from dotenv import load_dotenv
 
 load_dotenv()
 auth = Blueprint("auth", __name__)
+log = get_logger("routes.auth")
 
 def send_email(to_email, subject, body):
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
-    sender_email = os.getenv("EMAIL_USER")
-    sender_password = os.getenv("EMAIL_PASS")
-
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = sender_email
-    msg["To"] = to_email
-
+    # Delivered by the background outbox sender over a pooled SMTP connection
     try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.sendmail(sender_email, to_email, msg.as_string())
-        server.quit()
+        queue_email(to_email, subject, body, account="auth", kind="password_recovery")
         return True
     except Exception as e:
-        print("❌ Email sending error:", e)
+        log.error("email queueing failed", extra={"to": to_email, "error": str(e)})
         return False
 
 @auth.route("/signup", methods=["POST"])
@@ -1,9 +1,44 @@
 from flask import Blueprint, request, jsonify
 from utils.db import db
+from utils.pagination import page_size, fetch_page, parse_fields, keyset_sort
 from datetime import datetime
 from flask_cors import cross_origin
+from bson import ObjectId
+from bson.errors import InvalidId
+from utils.prescreen import PRESCREEN_ACTIONS
+from utils.rejection_templates import REJECTION_EMAIL_MODES, clear_generated_templates
+from utils.rematch import start_rematch, latest_run, run_response, REMATCH_ON_CREATE
+from utils.job_stats import job_stats
+from utils.log import get_logger
 
 jobs = Blueprint("jobs", __name__)
+log = get_logger("routes.jobs")
+
+def parse_prescreen_settings(data):
+    """Validate optional prescreen_cutoff / prescreen_action fields; returns (settings, error)."""
+    settings = {}
+    if data.get("prescreen_cutoff") is not None:
+        try:
+            cutoff = float(data["prescreen_cutoff"])
+        except (TypeError, ValueError):
+            return None, "prescreen_cutoff must be a number between 0 and 1"
+        if not 0 <= cutoff <= 1:
+            return None, "prescreen_cutoff must be a number between 0 and 1"
+        settings["prescreen_cutoff"] = cutoff
+    if data.get("prescreen_action") is not None:
+        if data["prescreen_action"] not in PRESCREEN_ACTIONS:
+            return None, f"prescreen_action must be one of: {', '.join(PRESCREEN_ACTIONS)}"
+        settings["prescreen_action"] = data["prescreen_action"]
+    return settings, None
+
+def parse_rejection_email_mode(data):
+    """Validate the optional rejection_email_mode field; returns (settings, error)."""
+    mode = data.get("rejection_email_mode")
+    if mode is None:
+        return {}, None
+    if mode not in REJECTION_EMAIL_MODES:
+        return None, f"rejection_email_mode must be one of: {', '.join(REJECTION_EMAIL_MODES)}"
+    return {"rejection_email_mode": mode}, None
 
 @jobs.route("/jobs", methods=["POST"])
 @cross_origin()
@@ -20,6 +55,13 @@ def create_job():
 
         hr_email = data["hr_email"]
 
+        prescreen_settings, error = parse_prescreen_settings(data)
+        if error:
+            return jsonify({"error": error}), 400
+        email_settings, error = parse_rejection_email_mode(data)
+        if error:
+            return jsonify({"error": error}), 400
+
         # Fetch HR/admin from users collection
         hr_doc = db.users.find_one({"email": hr_email})
         if not hr_doc:
@@ -32,31 +74,186 @@ def create_job():
             "experience": data.get("experience", ""),
             "created_by": hr_email,                  # link HR/admin
             "company_name": hr_doc.get("company_name", "Our Company"),  # fetch company name
-            "created_at": datetime.utcnow()
+            "created_at": datetime.utcnow(),
+            **prescreen_settings,
+            **email_settings
         }
 
         result = db.jobs.insert_one(job_doc)
-        return jsonify({
+        response = {
             "message": "Job created successfully",
             "job_id": str(result.inserted_id),
             "company_name": job_doc["company_name"]
-        }), 201
+        }
+        # Match resumes already stored for other jobs against the new one, in the background
+        if REMATCH_ON_CREATE and data.get("rematch", True):
+            try:
+                response["rematch_run_id"] = str(start_rematch(str(result.inserted_id))["_id"])
+            except Exception as e:
+                log.error("failed to start re-match", extra={"job_id": str(result.inserted_id), "error": str(e)})
+        return jsonify(response), 201
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("create_job failed")
         return jsonify({"error": f"Failed to create job: {str(e)}"}), 500
 
 
 @jobs.route("/jobs", methods=["GET"])
 @cross_origin()
 def list_jobs():
+    """Jobs, newest first: a bare list of all of them, or one page with ?limit= / ?cursor=."""
     try:
-        jobs_list = list(db.jobs.find().sort("created_at", -1))
+        paginated = "limit" in request.args or "cursor" in request.args
+        limit = page_size(request.args.get("limit"))
+        query = {}
+        if request.args.get("created_by"):
+            query["created_by"] = request.args["created_by"]
+
+        projection = parse_fields(request.args.get("fields"))
+        if projection:
+            projection["created_at"] = 1  # needed to build the next cursor
+
+        if paginated:
+            try:
+                jobs_list, next_cursor = fetch_page(
+                    db.jobs, query, "created_at", limit, request.args.get("cursor"), projection
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            jobs_list = list(db.jobs.find(query, projection).sort(keyset_sort("created_at")))
+
         for job in jobs_list:
             job["_id"] = str(job["_id"])
-        return jsonify(jobs_list), 200
+        if not paginated:
+            # Clients that do not ask for pages keep getting the plain array
+            return jsonify(jobs_list), 200
+        return jsonify({"jobs": jobs_list, "next_cursor": next_cursor, "limit": limit}), 200
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("list_jobs failed")
         return jsonify({"error": f"Failed to fetch jobs: {str(e)}"}), 500
+
+
+@jobs.route("/jobs/<job_id>/prescreen", methods=["PUT"])
+@cross_origin()
+def update_prescreen(job_id):
+    data = request.get_json() or {}
+    settings, error = parse_prescreen_settings(data)
+    if error:
+        return jsonify({"error": error}), 400
+    if not settings:
+        return jsonify({"error": "Provide prescreen_cutoff and/or prescreen_action"}), 400
+
+    try:
+        result = db.jobs.update_one({"_id": ObjectId(job_id)}, {"$set": settings})
+    except InvalidId:
+        return jsonify({"error": "Invalid job id"}), 400
+    if result.matched_count == 0:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"message": "Pre-screen settings updated", "job_id": job_id, **settings}), 200
+
+
+@jobs.route("/jobs/<job_id>/rejection-email", methods=["PUT"])
+@cross_origin()
+def update_rejection_email(job_id):
+    """Switch how rejection emails are written for a job; always drops its cached LLM-written template."""
+    data = request.get_json() or {}
+    settings, error = parse_rejection_email_mode(data)
+    if error:
+        return jsonify({"error": error}), 400
+    if not settings:
+        return jsonify({"error": "Provide rejection_email_mode"}), 400
+
+    try:
+        result = db.jobs.update_one({"_id": ObjectId(job_id)}, {"$set": settings})
+    except InvalidId:
+        return jsonify({"error": "Invalid job id"}), 400
+    if result.matched_count == 0:
+        return jsonify({"error": "Job not found"}), 404
+    cleared = clear_generated_templates(job_id)
+    return jsonify({"message": "Rejection email settings updated", "job_id": job_id,
+                    "templates_cleared": cleared, **settings}), 200
+
+
+# ---------------- Re-matching Stored Applicants ----------------
+def find_job_id(job_id):
+    """Return (job_id, error_response) for a job that must exist."""
+    try:
+        exists = db.jobs.count_documents({"_id": ObjectId(job_id)}, limit=1)
+    except InvalidId:
+        return None, (jsonify({"error": "Invalid job id"}), 400)
+    if not exists:
+        return None, (jsonify({"error": "Job not found"}), 404)
+    return job_id, None
+
+@jobs.route("/jobs/<job_id>/rematch", methods=["POST"])
+@cross_origin()
+def rematch_job(job_id):
+    """Score every stored applicant of other jobs against this job (background, resumable)."""
+    job_id, error = find_job_id(job_id)
+    if error:
+        return error
+    restart = str(request.args.get("restart", (request.get_json(silent=True) or {}).get("restart", ""))).lower() in ("1", "true", "yes")
+    try:
+        run = start_rematch(job_id, restart=restart)
+    except Exception as e:
+        log.exception("rematch_job failed", extra={"job_id": job_id})
+        return jsonify({"error": f"Failed to start re-match: {str(e)}"}), 500
+    return jsonify({"message": "Re-match running", **run_response(run)}), 202
+
+@jobs.route("/jobs/<job_id>/rematch", methods=["GET"])
+@cross_origin()
+def rematch_status(job_id):
+    job_id, error = find_job_id(job_id)
+    if error:
+        return error
+    run = latest_run(job_id)
+    if not run:
+        return jsonify({"error": "No re-match has been run for this job"}), 404
+    return jsonify(run_response(run)), 200
+
+MATCH_SORT_FIELDS = ("fit_score", "prescreen_score")
+
+@jobs.route("/jobs/<job_id>/matches", methods=["GET"])
+@cross_origin()
+def list_matches(job_id):
+    """Ranked matches from the stored pool; sort=fit_score (analyzed only, default) or prescreen_score."""
+    job_id, error = find_job_id(job_id)
+    if error:
+        return error
+    sort = request.args.get("sort", "fit_score")
+    if sort not in MATCH_SORT_FIELDS:
+        return jsonify({"error": f"sort must be one of: {', '.join(MATCH_SORT_FIELDS)}"}), 400
+
+    query = {"job_id": job_id}
+    if sort == "fit_score":
+        query["analyzed"] = True
+    limit = page_size(request.args.get("limit"))
+    try:
+        matches, next_cursor = fetch_page(db.job_matches, query, sort, limit, request.args.get("cursor"), {"run_id": 0})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    for match in matches:
+        match["_id"] = str(match["_id"])
+    run = latest_run(job_id)
+    return jsonify({
+        "matches": matches,
+        "next_cursor": next_cursor,
+        "limit": limit,
+        "rematch": run_response(run),
+    }), 200
+
+# ---------------- Applicant Statistics ----------------
+@jobs.route("/jobs/<job_id>/stats", methods=["GET"])
+@cross_origin()
+def get_job_stats(job_id):
+    """Counts, fit-score histogram, top skills and top candidates of a job's applicants (one document read)."""
+    job_id, error = find_job_id(job_id)
+    if error:
+        return error
+    try:
+        top_skills = min(max(int(request.args.get("top_skills", 20)), 0), 100)
+    except ValueError:
+        return jsonify({"error": "top_skills must be an integer"}), 400
+    return jsonify(job_stats(job_id, top_skills=top_skills)), 200
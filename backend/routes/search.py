@@ -0,0 +1,76 @@
+from flask import Blueprint, request, jsonify
+from utils.db import db
+from utils.search_index import get_search_index, embed
+from models.applicant import applicant_serializer, HEAVY_APPLICANT_FIELDS
+from bson import ObjectId
+from bson.errors import InvalidId
+from utils.log import get_logger
+import time
+
+search = Blueprint("search", __name__)
+log = get_logger("routes.search")
+
+DEFAULT_K = 20
+MAX_K = 100
+RESULT_PROJECTION = {field: 0 for field in HEAVY_APPLICANT_FIELDS + ("simhash_bands",)}
+
+# ---------------- Semantic Candidate Search ----------------
+@search.route("/search", methods=["GET", "POST"])
+def search_candidates():
+    """Top-k stored applicants (across all jobs) closest to free text or to a job's description and skills."""
+    try:
+        params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+        try:
+            k = min(MAX_K, max(1, int(params.get("k", DEFAULT_K))))
+        except (TypeError, ValueError):
+            return jsonify({"error": "k must be an integer"}), 400
+
+        query_text = (params.get("q") or "").strip()
+        job_id = params.get("job_id")
+        if job_id:
+            try:
+                job = db.jobs.find_one({"_id": ObjectId(job_id)}, {"description": 1, "skills": 1, "title": 1})
+            except InvalidId:
+                return jsonify({"error": "Invalid job id"}), 400
+            if not job:
+                return jsonify({"error": "Job not found"}), 404
+            query_vector = embed(f"{job.get('title', '')} {job.get('description', '')} {query_text}", job.get("skills"))
+        elif query_text:
+            query_vector = embed(query_text)
+        else:
+            return jsonify({"error": "Provide q (free text) or job_id"}), 400
+
+        started = time.perf_counter()
+        index = get_search_index()
+        # Syncing with Mongo happens in the background (utils/search_index.py); this only picks up its saves
+        index.refresh()
+        # Over-fetch: duplicates of one resume across jobs and unusable applicants are dropped below
+        hits = index.search(query_vector, k * 3)
+        search_ms = (time.perf_counter() - started) * 1000
+
+        docs = {doc["_id"]: doc for doc in db.applicants.find(
+            {"_id": {"$in": [applicant_id for applicant_id, _ in hits]}}, RESULT_PROJECTION
+        )}
+        results, seen = [], set()
+        for applicant_id, similarity in hits:
+            doc = docs.get(applicant_id)
+            if not doc or doc.get("status") in ("failed", "duplicate"):
+                continue
+            # The same resume uploaded for several jobs is listed once, at its best match
+            content = doc.get("content_hash") or applicant_id
+            if content in seen:
+                continue
+            seen.add(content)
+            results.append({**applicant_serializer(doc), "similarity": round(similarity, 4)})
+            if len(results) >= k:
+                break
+
+        return jsonify({
+            "results": results,
+            "k": k,
+            "search_ms": round(search_ms, 2),
+            "index": index.stats(),
+        }), 200
+    except Exception as e:
+        log.exception("search_candidates failed")
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
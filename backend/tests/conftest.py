@@ -0,0 +1,35 @@
+"""Shared test setup: the fake Gemini model and an in-memory mongomock database.
+
+Run from ``backend/``: ``python -m pytest -q`` (needs ``pytest`` and ``mongomock``).
+The environment is prepared here, before any test module imports ``utils``,
+because the modules read their settings at import time.
+"""
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import prepare_environment, use_mongomock
+
+prepare_environment(extra={
+    "MONGO_URI": "mongodb://tests",
+    "MONGO_DB_NAME": "ai_hr_tests",
+    "OUTBOX_MODE": "off",
+    "RESUME_WORKER_MODE": "off",
+    "LOG_LEVEL": "CRITICAL",
+})
+use_mongomock()
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    yield
+    from utils.db import get_client, DATABASE_NAME
+    get_client().drop_database(DATABASE_NAME)
+
+
+@pytest.fixture
+def db():
+    from utils.db import db
+    return db
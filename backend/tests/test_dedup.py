@@ -0,0 +1,72 @@
+from bson import ObjectId
+from utils.dedup import fingerprint, find_duplicate, hamming, FingerprintIndex, DEDUP_MAX_DISTANCE
+import random
+
+JOB_ID = "job-1"
+
+
+def resume(seed, words=1000):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+def edited(text):
+    """The same resume with one word changed, as after fixing a typo."""
+    words = text.split()
+    words[len(words) // 2] = "corrected"
+    return " ".join(words)
+
+def store(db, text, **fields):
+    applicant = {"job_id": JOB_ID, "status": "completed", **fingerprint(text), **fields}
+    applicant["_id"] = db.applicants.insert_one(applicant).inserted_id
+    return applicant
+
+
+def test_near_duplicate_fingerprints_are_close():
+    original = resume(1)
+    assert hamming(fingerprint(original)["simhash"], fingerprint(edited(original))["simhash"]) <= DEDUP_MAX_DISTANCE
+    assert hamming(fingerprint(original)["simhash"], fingerprint(resume(2))["simhash"]) > DEDUP_MAX_DISTANCE
+
+def test_whitespace_and_case_do_not_change_the_content_hash():
+    text = resume(3)
+    assert fingerprint(text)["content_hash"] == fingerprint("  " + text.upper().replace(" ", "\n  "))["content_hash"]
+
+def test_find_duplicate_matches(db):
+    original = resume(4)
+    stored = store(db, original)
+
+    exact = find_duplicate(db.applicants, JOB_ID, fingerprint(original))
+    assert (exact["applicant"]["_id"], exact["match"]) == (stored["_id"], "exact")
+
+    near = find_duplicate(db.applicants, JOB_ID, fingerprint(edited(original)))
+    assert near["applicant"]["_id"] == stored["_id"]
+    assert near["match"] == "near"
+    assert near["distance"] <= DEDUP_MAX_DISTANCE
+
+    assert find_duplicate(db.applicants, JOB_ID, fingerprint(resume(5))) is None
+    assert find_duplicate(db.applicants, "other-job", fingerprint(original)) is None
+
+def test_find_duplicate_ignores_later_and_failed_applicants(db):
+    original = resume(6)
+    stored = store(db, original)
+    store(db, resume(7), status="failed")
+
+    assert find_duplicate(db.applicants, JOB_ID, fingerprint(original), before_id=stored["_id"]) is None
+    assert find_duplicate(db.applicants, JOB_ID, fingerprint(resume(7))) is None
+    assert find_duplicate(db.applicants, JOB_ID, fingerprint(original), before_id=ObjectId()) is not None
+
+def test_find_duplicate_projection_keeps_the_fingerprint(db):
+    original = resume(8)
+    store(db, original)
+    near = find_duplicate(db.applicants, JOB_ID, fingerprint(edited(original)), projection={"_id": 1})
+    assert near["match"] == "near"
+
+def test_fingerprint_index_within_one_batch():
+    index = FingerprintIndex()
+    original = resume(9)
+    index.add("first", fingerprint(original))
+
+    assert index.find(fingerprint(original))[:2] == ("first", "exact")
+    assert index.find({"file_hash": "abc", **fingerprint(resume(10))}) is None
+    key, match, distance = index.find(fingerprint(edited(original)))
+    assert (key, match) == ("first", "near") and distance <= DEDUP_MAX_DISTANCE
@@ -0,0 +1,79 @@
+from utils.job_stats import job_stats, record_insert, update_applicant, rebuild, get_stats_collection
+from utils.resume_pipeline import process_pending_applicant
+import pytest
+
+JOB_ID = "job-1"
+
+
+def insert_pending(db, count):
+    documents = [{"job_id": JOB_ID, "status": "pending", "filename": f"r{i}.pdf"} for i in range(count)]
+    db.applicants.insert_many(documents)
+    record_insert(documents)
+    return [document["_id"] for document in documents]
+
+def analyzed(score, skills=("Python",)):
+    return {"$set": {"status": "completed", "fit_score": score, "skills": list(skills), "candidate_name": "A"}}
+
+def stored_counters(job_id=JOB_ID):
+    """The job's stats document without timestamps and zero counters (a rebuild leaves those out)."""
+    document = get_stats_collection().find_one({"_id": job_id})
+    document.pop("updated_at")
+    for group in ("status", "histogram", "skills"):
+        document[group] = {key: count for key, count in document.get(group, {}).items() if count}
+    return {key: value for key, value in document.items() if value != 0}
+
+
+def test_completion_moves_applicants_out_of_progress(db):
+    first, second = insert_pending(db, 2)
+    update_applicant(first, analyzed(0.9))
+
+    stats = job_stats(JOB_ID)
+    assert (stats["applicants"], stats["in_progress"], stats["scored"]) == (2, 1, 1)
+    assert (stats["above_threshold"], stats["below_threshold"]) == (1, 0)
+    assert stats["top_candidates"][0]["fit_score"] == 0.9
+
+def test_re_analysis_replaces_the_previous_contribution(db):
+    [applicant_id] = insert_pending(db, 1)
+    update_applicant(applicant_id, analyzed(0.9, ["Python", "SQL"]))
+    update_applicant(applicant_id, {"$set": {"status": "processing"}})
+    update_applicant(applicant_id, analyzed(0.4, ["Java"]))
+
+    stats = job_stats(JOB_ID)
+    assert (stats["applicants"], stats["scored"]) == (1, 1)
+    assert stats["avg_fit_score"] == pytest.approx(0.4)
+    assert (stats["above_threshold"], stats["below_threshold"]) == (0, 1)
+    assert sum(bucket["count"] for bucket in stats["histogram"]) == 1
+    assert stats["top_skills"] == [{"skill": "java", "count": 1}]
+    assert [entry["fit_score"] for entry in stats["top_candidates"]] == [0.4]
+
+def test_incremental_counters_match_a_rebuild(db):
+    ids = insert_pending(db, 6)
+    for index, applicant_id in enumerate(ids):
+        update_applicant(applicant_id, analyzed(index / 6))
+    update_applicant(ids[0], analyzed(0.95))
+    update_applicant(ids[1], {"$set": {"status": "failed"}})
+    update_applicant(ids[2], {"$set": {"status": "duplicate"}, "$unset": {"fit_score": ""}})
+
+    incremental = stored_counters()
+    rebuild([JOB_ID])
+    rebuilt = stored_counters()
+    assert incremental.pop("score_sum") == pytest.approx(rebuilt.pop("score_sum"))
+    assert incremental == rebuilt
+
+def test_pipeline_re_analysis_counts_the_applicant_once(db):
+    db.users.insert_one({"email": "hr@example.com", "company_name": "Acme"})
+    job_id = str(db.jobs.insert_one({"title": "Dev", "description": "Python developer", "skills": "Python",
+                                     "hr_email": "hr@example.com", "company_name": "Acme"}).inserted_id)
+    document = {"job_id": job_id, "status": "pending", "resume_text": "Ada Lovelace ada@example.com Python SQL"}
+    db.applicants.insert_one(document)
+    record_insert([document])
+
+    process_pending_applicant({"applicant_id": str(document["_id"]), "check_duplicates": False})
+    first = job_stats(job_id)
+    update_applicant(document["_id"], {"$set": {"status": "pending", "resume_text": "Ada Lovelace Java AWS Docker"}})
+    process_pending_applicant({"applicant_id": str(document["_id"]), "check_duplicates": False})
+    second = job_stats(job_id)
+
+    assert (first["applicants"], first["scored"], second["applicants"], second["scored"]) == (1, 1, 1, 1)
+    assert second["avg_fit_score"] == pytest.approx(db.applicants.find_one()["fit_score"])
+    assert len(second["top_candidates"]) == 1
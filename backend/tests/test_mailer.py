@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from utils.mailer import (
+    OutboxSender, queue_email, backoff_delay, OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_MAX, OUTBOX_MAX_ATTEMPTS,
+)
+import smtplib
+import pytest
+
+
+class FakeServer:
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.sent = []
+
+    def sendmail(self, sender, recipients, message):
+        if recipients[0] in self.refuse:
+            raise smtplib.SMTPRecipientsRefused({recipients[0]: (550, b"no such user")})
+        self.sent.append(recipients[0])
+
+
+class FakePool:
+    """Stands in for SMTPConnectionPool; ``server`` None means the SMTP server is unreachable."""
+
+    username = "hr@example.com"
+
+    def __init__(self, server=None):
+        self.server = server
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        if self.server is None:
+            raise ConnectionRefusedError(111, "Connection refused")
+        return self.server
+
+    def release(self, server):
+        pass
+
+    def discard(self, server):
+        pass
+
+
+@pytest.fixture
+def sender(db):
+    sender = OutboxSender(collection=db.outbox)
+    sender.prepare()
+    return sender
+
+def queue(count):
+    return [queue_email(f"c{i}@example.com", "Your application", f"Body {i}") for i in range(count)]
+
+
+def test_backoff_doubles_up_to_the_cap():
+    assert [backoff_delay(n) for n in (1, 2, 3)] == [OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_BASE * 2, OUTBOX_BACKOFF_BASE * 4]
+    assert backoff_delay(100) == OUTBOX_BACKOFF_MAX
+
+def test_sent_messages_drop_their_body(db, sender):
+    queue(2)
+    server = FakeServer()
+    sender.send_batch(FakePool(server), sender.claim_batch())
+
+    assert server.sent == ["c0@example.com", "c1@example.com"]
+    for message in db.outbox.find():
+        assert message["status"] == "sent"
+        assert "body" not in message
+        assert message["expires_at"] > datetime.utcnow()
+
+def test_transient_failure_is_retried_with_backoff(db, sender):
+    [message_id] = queue(1)
+    before = datetime.utcnow()
+    sender.send_batch(FakePool(), sender.claim_batch())
+
+    message = db.outbox.find_one({"_id": message_id})
+    assert (message["status"], message["attempts"]) == ("queued", 1)
+    assert message["body"] == "Body 0"
+    # Mongo keeps milliseconds
+    assert message["next_attempt_at"] >= before.replace(microsecond=before.microsecond // 1000 * 1000) + \
+        timedelta(seconds=backoff_delay(1))
+    # Not due yet
+    assert sender.claim_batch() == []
+
+def test_message_fails_after_max_attempts(db, sender):
+    [message_id] = queue(1)
+    for attempt in range(1, OUTBOX_MAX_ATTEMPTS + 1):
+        db.outbox.update_one({"_id": message_id}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+        [message] = sender.claim_batch()
+        assert message["attempts"] == attempt
+        sender.send_batch(FakePool(), [message])
+
+    message = db.outbox.find_one({"_id": message_id})
+    assert message["status"] == "failed"
+    assert "body" not in message
+
+def test_permanent_refusal_fails_at_once(db, sender):
+    queue(2)
+    server = FakeServer(refuse={"c0@example.com"})
+    sender.send_batch(FakePool(server), sender.claim_batch())
+
+    statuses = {message["to"]: (message["status"], message["attempts"]) for message in db.outbox.find()}
+    assert statuses == {"c0@example.com": ("failed", 1), "c1@example.com": ("sent", 1)}
+
+def test_connect_failure_stops_the_batch(db, sender):
+    queue(4)
+    pool = FakePool()
+    sender.send_batch(pool, sender.claim_batch())
+
+    assert pool.acquired == 1
+    messages = list(db.outbox.find())
+    assert [message["status"] for message in messages] == ["queued"] * 4
+    # Only the message that was tried used up an attempt; the rest retry with it
+    assert sorted(message["attempts"] for message in messages) == [0, 0, 0, 1]
+    retry_times = [message["next_attempt_at"] for message in messages]
+    assert max(retry_times) - min(retry_times) < timedelta(seconds=1)
+    assert min(retry_times) > datetime.utcnow()
+
+def test_stale_claims_are_requeued(db, sender):
+    queue(1)
+    sender.claim_batch()
+    db.outbox.update_many({}, {"$set": {"claimed_at": datetime.utcnow() - timedelta(minutes=10)}})
+    assert sender.requeue_stale() == 1
+    assert db.outbox.find_one()["status"] == "queued"
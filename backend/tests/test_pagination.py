@@ -0,0 +1,51 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from utils.pagination import encode_cursor, decode_cursor, fetch_page, page_size, MAX_PAGE_SIZE
+import pytest
+
+
+def test_cursor_round_trip():
+    doc_id = ObjectId()
+    created = datetime(2024, 5, 17, 9, 30, 15, 123000)
+    for value in (created, 0.8731, 42, "name"):
+        assert decode_cursor(encode_cursor(value, doc_id)) == (value, doc_id)
+
+def test_malformed_cursor_is_a_value_error():
+    for cursor in ("not-a-cursor", encode_cursor(1, ObjectId())[:-4], ""):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+def test_page_size_is_clamped():
+    assert page_size(None) == 20
+    assert page_size("abc") == 20
+    assert page_size("0") == 1
+    assert page_size(str(MAX_PAGE_SIZE * 10)) == MAX_PAGE_SIZE
+
+@pytest.mark.parametrize("field", ["created_at", "fit_score"])
+def test_pages_cover_every_document_once(db, field):
+    start = datetime(2024, 1, 1)
+    # Repeated sort values, so the _id tie-breaker decides the order within a value
+    db.items.insert_many([{"created_at": start + timedelta(minutes=i % 7), "fit_score": (i % 5) / 5, "n": i}
+                          for i in range(53)])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        docs, cursor = fetch_page(db.items, {}, field, 10, cursor)
+        seen += docs
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 6
+    assert sorted(doc["n"] for doc in seen) == list(range(53))
+    keys = [(doc[field], doc["_id"]) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_filter_and_projection_apply_to_every_page(db):
+    db.items.insert_many([{"created_at": datetime(2024, 1, 1) + timedelta(hours=i), "owner": i % 2, "n": i}
+                          for i in range(9)])
+    docs, cursor = fetch_page(db.items, {"owner": 1}, "created_at", 3, None, {"n": 1, "created_at": 1})
+    more, last = fetch_page(db.items, {"owner": 1}, "created_at", 3, cursor, {"n": 1, "created_at": 1})
+    assert [doc["n"] for doc in docs + more] == [7, 5, 3, 1]
+    assert last is None
+    assert "owner" not in docs[0]
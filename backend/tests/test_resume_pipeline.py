@@ -0,0 +1,63 @@
+from utils import resume_pipeline
+from utils.resume_pipeline import process_pending_batch, process_pending_applicant
+from utils.job_stats import record_insert
+import pytest
+
+
+@pytest.fixture
+def job(db):
+    db.users.insert_one({"email": "hr@example.com", "company_name": "Acme"})
+    job = {"title": "Dev", "description": "Python developer", "skills": "Python", "hr_email": "hr@example.com"}
+    return str(db.jobs.insert_one(job).inserted_id)
+
+@pytest.fixture
+def reject_everyone(monkeypatch):
+    monkeypatch.setattr(resume_pipeline, "REJECTION_THRESHOLD", 2)
+
+def pending(db, job_id, texts):
+    documents = [{"job_id": job_id, "status": "pending", "resume_text": text} for text in texts]
+    db.applicants.insert_many(documents)
+    record_insert(documents)
+    return [str(document["_id"]) for document in documents]
+
+
+def test_retried_batch_does_not_email_twice(db, job, reject_everyone):
+    ids = pending(db, job, [f"Candidate {i} c{i}@example.com Python" for i in range(3)])
+    process_pending_batch({"applicant_ids": ids})
+    assert db.outbox.count_documents({}) == 3
+
+    # A worker died after finishing one applicant but before acking the task
+    db.applicants.update_one({}, {"$set": {"status": "processing"}})
+    process_pending_batch({"applicant_ids": ids})
+
+    assert db.outbox.count_documents({}) == 3
+    assert {applicant["status"] for applicant in db.applicants.find()} == {"completed"}
+    assert all(applicant["response_email"]["outbox_id"] for applicant in db.applicants.find())
+
+def test_finished_applicant_is_not_reprocessed(db, job, reject_everyone):
+    [applicant_id] = pending(db, job, ["Candidate c@example.com Python"])
+    process_pending_applicant({"applicant_id": applicant_id})
+    completed_at = db.applicants.find_one()["completed_at"]
+
+    process_pending_applicant({"applicant_id": applicant_id})
+    assert db.applicants.find_one()["completed_at"] == completed_at
+    assert db.outbox.count_documents({}) == 1
+
+def test_prescreened_out_applicants_get_no_score_or_email(db, job):
+    db.jobs.update_one({}, {"$set": {"prescreen_cutoff": 0.99, "prescreen_action": "skip"}})
+    [applicant_id] = pending(db, job, ["Candidate c@example.com pastry chef"])
+    process_pending_applicant({"applicant_id": applicant_id})
+
+    applicant = db.applicants.find_one()
+    assert applicant["prescreened_out"] is True
+    assert applicant["fit_score"] is None
+    assert "prescreen_score" in applicant
+    assert db.outbox.count_documents({}) == 0
+
+def test_prescreened_out_email_can_be_enabled(db, job, monkeypatch):
+    monkeypatch.setattr(resume_pipeline, "PRESCREEN_REJECTION_EMAIL", True)
+    db.jobs.update_one({}, {"$set": {"prescreen_cutoff": 0.99, "prescreen_action": "skip"}})
+    [applicant_id] = pending(db, job, ["Candidate c@example.com pastry chef"])
+    process_pending_applicant({"applicant_id": applicant_id})
+
+    assert db.outbox.count_documents({"kind": "rejection"}) == 1
@@ -0,0 +1,73 @@
+from utils.task_queue import MemoryQueue, MongoQueue, WorkerPool, task_handler, PRIORITY_LOW
+
+
+def flaky_handler(kind, failures):
+    """Register a handler that raises ``failures`` times before succeeding; returns its call log."""
+    calls = []
+
+    @task_handler(kind)
+    def handle(payload):
+        calls.append(payload)
+        if len(calls) <= failures:
+            raise RuntimeError("transient failure")
+
+    return calls
+
+
+def test_failed_task_is_retried_until_it_succeeds():
+    calls = flaky_handler("test_flaky", failures=1)
+    queue = MemoryQueue(max_attempts=3)
+    pool = WorkerPool(queue, workers=0)
+    queue.put("test_flaky", {"n": 1})
+
+    pool.run_task(queue.get(timeout=0))
+    assert queue.size() == 1
+
+    task = queue.get(timeout=0)
+    assert task["attempts"] == 2
+    pool.run_task(task)
+    assert queue.size() == 0
+    assert calls == [{"n": 1}, {"n": 1}]
+
+
+def test_task_is_dropped_after_max_attempts():
+    calls = flaky_handler("test_broken", failures=10)
+    queue = MemoryQueue(max_attempts=3)
+    pool = WorkerPool(queue, workers=0)
+    queue.put("test_broken", {})
+
+    while (task := queue.get(timeout=0)) is not None:
+        pool.run_task(task)
+    assert len(calls) == 3
+
+
+def test_unknown_kind_is_not_run():
+    queue = MemoryQueue(max_attempts=1)
+    queue.put("test_no_such_handler", {})
+    WorkerPool(queue, workers=0).run_task(queue.get(timeout=0))
+    assert queue.size() == 0
+
+
+def test_low_priority_tasks_wait_behind_normal_ones():
+    queue = MemoryQueue()
+    queue.put("test_order", {"n": "deferred"}, priority=PRIORITY_LOW)
+    queue.put("test_order", {"n": "first"})
+    queue.put("test_order", {"n": "second"})
+    assert [queue.get(timeout=0)["payload"]["n"] for _ in range(3)] == ["first", "second", "deferred"]
+
+
+def test_mongo_queue_requeues_then_fails(db):
+    flaky_handler("test_mongo_broken", failures=10)
+    queue = MongoQueue(db.tasks, max_attempts=2, poll_interval=0)
+    pool = WorkerPool(queue, workers=0)
+    task_id = queue.put("test_mongo_broken", {})
+
+    pool.run_task(queue.get(timeout=0))
+    assert db.tasks.find_one({"_id": task_id})["status"] == "queued"
+
+    pool.run_task(queue.get(timeout=0))
+    stored = db.tasks.find_one({"_id": task_id})
+    assert stored["status"] == "failed"
+    assert stored["attempts"] == 2
+    assert "transient failure" in stored["error"]
+    assert queue.get(timeout=0) is None
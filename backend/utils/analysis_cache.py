@@ -0,0 +1,141 @@
+"""Content-addressed cache for resume analysis results.
+
+Keys are a SHA-256 over the normalized resume text, the job description, the
+prompt version and the model name, so any change to one of them is a miss.
+Lookups go through an in-process LRU first and fall back to the Mongo
+``analysis_cache`` collection, whose documents expire through a TTL index.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from utils.log import get_logger
+import hashlib, os, re, threading, time
+
+load_dotenv()
+log = get_logger("analysis_cache")
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def cache_key(resume_text, job_desc, prompt_version, model_name):
+    digest = hashlib.sha256()
+    for part in (normalize_text(resume_text), normalize_text(job_desc), str(prompt_version), model_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    def __init__(self, max_size=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class AnalysisCache:
+    def __init__(self, collection=None, max_size=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL):
+        self.memory = LRUCache(max_size, ttl)
+        self.collection = collection
+        self.ttl = ttl
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0}
+        self._stats_lock = threading.Lock()
+        self._indexed = False
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _ensure_index(self):
+        if not self._indexed:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return dict(value)
+
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+            except Exception as e:
+                log.warning("analysis cache lookup failed", extra={"error": str(e)})
+                doc = None
+            if doc:
+                self.memory.set(key, doc["result"])
+                self._count("mongo_hits")
+                return dict(doc["result"])
+
+        self._count("misses")
+        return None
+
+    def set(self, key, result, model_name=None):
+        self.memory.set(key, dict(result))
+        self._count("stores")
+        if self.collection is None:
+            return
+        try:
+            self._ensure_index()
+            now = datetime.utcnow()
+            self.collection.replace_one(
+                {"_id": key},
+                {"result": result, "model": model_name, "created_at": now,
+                 "expires_at": now + timedelta(seconds=self.ttl)},
+                upsert=True,
+            )
+        except Exception as e:
+            log.warning("analysis cache store failed", extra={"error": str(e)})
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["mongo_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["enabled"] = ANALYSIS_CACHE_ENABLED
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_analysis_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from utils.db import lazy_collection
+            _cache = AnalysisCache(lazy_collection("analysis_cache"))
+        return _cache
@@ -0,0 +1,393 @@
+"""Compressed storage for resume text and uploaded files.
+
+Applicant documents keep only a small reference to their resume, e.g.
+
+    "resume_blob": {"store": "local", "key": "<sha256>", "codec": "zstd", "size": 5234, "stored_size": 1890}
+    "file_blob":   {"store": "local", "key": "<sha256>", "codec": "none", "size": 81920, "stored_size": 81920, "ext": "pdf"}
+
+``key`` is the SHA-256 of the uncompressed bytes (for files it equals the
+applicant's ``file_hash``), so identical resumes are stored once and every
+read is checked against it. Two backends share one interface:
+
+* ``local``  - ``BLOB_STORE_DIR/<key[:2]>/<key>.<codec>``, written atomically;
+* ``gridfs`` - the ``resume_blobs`` GridFS bucket of the app database, for
+  deployments whose workers do not share a disk.
+
+Blobs are compressed with zstd when the ``zstandard`` package is installed,
+zlib otherwise; data that does not shrink (most PDFs) is stored as is. The
+codec is part of the reference, so blobs written with either stay readable.
+``BLOB_STORE=off`` keeps the old layout: text inline, files under ``uploads/``.
+
+Readers that need the text call ``resume_text_of`` (one applicant) or
+``resume_texts`` (a batch); listings and scans only ever see the reference.
+
+    python -m utils.blob_store [--dry-run] [--keep-files] [--batch-size 200]
+
+moves the inline text and ``uploads/`` files of existing applicants into the
+store.
+"""
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from utils.log import get_logger
+import hashlib, os, tempfile, threading, zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used instead
+    zstandard = None
+
+load_dotenv()
+log = get_logger("blob_store")
+
+BLOB_STORE = os.getenv("BLOB_STORE", "local").lower()  # local | gridfs | off
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(os.getcwd(), "blob_store"))
+BLOB_GRIDFS_BUCKET = os.getenv("BLOB_GRIDFS_BUCKET", "resume_blobs")
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zstd").lower()  # zstd | zlib | none
+BLOB_ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "10"))
+BLOB_ZLIB_LEVEL = int(os.getenv("BLOB_ZLIB_LEVEL", "6"))
+# Where uploads were saved before file_path existed (applicants carried only the file's name)
+UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploads")
+
+# Applicant fields a text reader has to project
+TEXT_FIELDS = {"resume_text": 1, "resume_blob": 1}
+# Applicants whose text is available, inline or in the store
+HAS_RESUME_TEXT = {"$or": [{"resume_text": {"$exists": True}}, {"resume_blob": {"$exists": True}}]}
+
+
+class BlobCorrupted(ValueError):
+    """A blob's content does not match the hash it is stored under."""
+
+
+def blob_store_enabled():
+    return BLOB_STORE != "off"
+
+# ---------------- Codecs ----------------
+# zstandard's (de)compressor objects must not be shared between threads
+_codec_local = threading.local()
+
+def default_codec():
+    if BLOB_COMPRESSION == "zstd" and zstandard is None:
+        return "zlib"
+    return BLOB_COMPRESSION
+
+def compress(data, codec):
+    if codec == "zstd":
+        if not hasattr(_codec_local, "compressor"):
+            _codec_local.compressor = zstandard.ZstdCompressor(level=BLOB_ZSTD_LEVEL)
+        return _codec_local.compressor.compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, BLOB_ZLIB_LEVEL)
+    if codec == "none":
+        return data
+    raise ValueError(f"Unknown blob codec {codec}")
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; install the zstandard package to read it")
+        if not hasattr(_codec_local, "decompressor"):
+            _codec_local.decompressor = zstandard.ZstdDecompressor()
+        return _codec_local.decompressor.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "none":
+        return data
+    raise ValueError(f"Unknown blob codec {codec}")
+
+# ---------------- Backends ----------------
+class LocalBlobStore:
+    """Content-addressed files under one directory."""
+
+    name = "local"
+
+    def __init__(self, root=BLOB_STORE_DIR):
+        self.root = root
+
+    def _path(self, key, codec):
+        return os.path.join(self.root, key[:2], f"{key}.{codec}")
+
+    def exists(self, key, codec):
+        return os.path.exists(self._path(key, codec))
+
+    def write(self, key, codec, data):
+        path = self._path(key, codec)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def read(self, key, codec):
+        with open(self._path(key, codec), "rb") as f:
+            return f.read()
+
+    def delete(self, key, codec):
+        try:
+            os.remove(self._path(key, codec))
+        except FileNotFoundError:
+            pass
+
+
+class GridFSBlobStore:
+    """Content-addressed files in a GridFS bucket, named ``<key>.<codec>``."""
+
+    name = "gridfs"
+
+    def __init__(self, bucket_name=BLOB_GRIDFS_BUCKET):
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self._bucket_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        # Bound to this process's client, like utils.db.get_client
+        if self._bucket is None or self._bucket_pid != os.getpid():
+            import gridfs
+            from utils.db import get_database
+            with self._lock:
+                if self._bucket is None or self._bucket_pid != os.getpid():
+                    self._bucket = gridfs.GridFSBucket(get_database(), self.bucket_name)
+                    self._bucket_pid = os.getpid()
+        return self._bucket
+
+    def exists(self, key, codec):
+        return any(True for _ in self.bucket.find({"filename": f"{key}.{codec}"}, limit=1))
+
+    def write(self, key, codec, data):
+        # Two processes may store the same blob at once; the copies are identical
+        if not self.exists(key, codec):
+            self.bucket.upload_from_stream(f"{key}.{codec}", data, metadata={"key": key, "codec": codec})
+
+    def read(self, key, codec):
+        return self.bucket.open_download_stream_by_name(f"{key}.{codec}").read()
+
+    def delete(self, key, codec):
+        for grid_out in self.bucket.find({"filename": f"{key}.{codec}"}):
+            self.bucket.delete(grid_out._id)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_blob_store(name=None):
+    """The backend called ``name`` (default ``BLOB_STORE``); refs name the one they were written to."""
+    name = name or BLOB_STORE
+    if name not in _stores:
+        with _stores_lock:
+            if name not in _stores:
+                if name == "local":
+                    _stores[name] = LocalBlobStore()
+                elif name == "gridfs":
+                    _stores[name] = GridFSBlobStore()
+                else:
+                    raise ValueError(f"Unknown blob store {name}")
+    return _stores[name]
+
+# ---------------- Blobs ----------------
+def put_blob(data, **extra):
+    """Compress and store ``data``; returns the reference to keep on the applicant."""
+    key = hashlib.sha256(data).hexdigest()
+    codec = default_codec()
+    stored = compress(data, codec)
+    if codec != "none" and len(stored) >= len(data):
+        codec, stored = "none", data
+    store = get_blob_store()
+    store.write(key, codec, stored)
+    return {"store": store.name, "key": key, "codec": codec, "size": len(data), "stored_size": len(stored), **extra}
+
+def get_blob(ref):
+    data = decompress(get_blob_store(ref["store"]).read(ref["key"], ref["codec"]), ref["codec"])
+    if hashlib.sha256(data).hexdigest() != ref["key"]:
+        raise BlobCorrupted(f"Blob {ref['key']} failed its hash check")
+    return data
+
+# ---------------- Resume Text ----------------
+def text_fields(resume_text):
+    """Applicant fields holding ``resume_text``: a store reference, or the text itself when the store is off."""
+    if not blob_store_enabled():
+        return {"resume_text": resume_text}
+    return {"resume_blob": put_blob(resume_text.encode("utf-8"))}
+
+def text_update(resume_text, **fields):
+    """Update operators that store ``resume_text`` on an applicant along with ``fields``."""
+    update = {"$set": {**text_fields(resume_text), **fields}}
+    if blob_store_enabled():
+        # Applicants stored before the migration carry the text inline
+        update["$unset"] = {"resume_text": ""}
+    return update
+
+def resume_text_of(applicant):
+    """The applicant's resume text (inline or fetched from the store), or None."""
+    if applicant.get("resume_text") is not None:
+        return applicant["resume_text"]
+    ref = applicant.get("resume_blob")
+    if not ref:
+        return None
+    try:
+        return get_blob(ref).decode("utf-8")
+    except Exception:
+        log.exception("Could not read resume text", extra={"applicant_id": str(applicant.get("_id")), "key": ref.get("key")})
+        return None
+
+def resume_texts(applicants):
+    """{_id: text} for the applicants whose text is available."""
+    texts = {}
+    for applicant in applicants:
+        text = resume_text_of(applicant)
+        if text is not None:
+            texts[applicant["_id"]] = text
+    return texts
+
+# ---------------- Uploaded Files ----------------
+def store_upload(source, filename, folder):
+    """Save an uploaded stream; returns (work_path, file_hash, file_fields).
+
+    ``work_path`` is a local copy to extract the text from and
+    ``file_fields`` the applicant fields that point at the original. With the
+    store on, the original goes into it and ``work_path`` is a private copy
+    that ``release_upload`` deletes once it has been read; with the store off
+    it is the shared content-addressed file under ``folder``.
+    """
+    from utils.dedup import save_content_addressed
+
+    if not blob_store_enabled():
+        file_path, file_hash = save_content_addressed(source, filename, folder)
+        return file_path, file_hash, {"file_path": file_path}
+
+    extension = filename.rsplit(".", 1)[1].lower() if "." in filename else "bin"
+    fd, work_path = tempfile.mkstemp(dir=folder, prefix="upload-", suffix=f".{extension}")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            for chunk in iter(lambda: source.read(1 << 16), b""):
+                target.write(chunk)
+        with open(work_path, "rb") as f:
+            ref = put_blob(f.read(), ext=extension)
+    except Exception:
+        release_upload(work_path)
+        raise
+    return work_path, ref["key"], {"file_blob": ref}
+
+def release_upload(work_path):
+    """Delete a private copy made by ``store_upload`` (shared files are kept)."""
+    if blob_store_enabled() and work_path and os.path.exists(work_path):
+        os.remove(work_path)
+
+@contextmanager
+def resume_file(applicant):
+    """Local path of the applicant's original file, materialized from the store if needed."""
+    file_path = local_file_path(applicant)
+    if file_path and os.path.exists(file_path):
+        yield file_path
+        return
+    ref = applicant.get("file_blob")
+    if not ref:
+        raise FileNotFoundError(f"No stored file for applicant {applicant.get('_id')}")
+    fd, path = tempfile.mkstemp(suffix=f".{ref.get('ext', 'bin')}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(get_blob(ref))
+        yield path
+    finally:
+        os.remove(path)
+
+# ---------------- Migration ----------------
+def local_file_path(applicant, upload_folder=UPLOAD_FOLDER):
+    """The applicant's file in ``uploads/``: ``file_path``, or for the oldest applicants their ``filename`` there."""
+    if applicant.get("file_path"):
+        return applicant["file_path"]
+    if applicant.get("filename") and not applicant.get("file_blob"):
+        return os.path.join(upload_folder, applicant["filename"])
+    return None
+
+def migrate(collection, batch_size=200, dry_run=False, keep_files=False, upload_folder=UPLOAD_FOLDER):
+    """Move inline resume text and ``uploads/`` files of existing applicants into the store."""
+    from pymongo import UpdateOne
+
+    stats = {"texts": 0, "files": 0, "missing_files": 0, "bytes": 0, "stored_bytes": 0}
+    moved_files = set()
+    operations = []
+
+    def flush():
+        if operations and not dry_run:
+            collection.bulk_write(operations, ordered=False)
+        operations.clear()
+
+    query = {"$or": [{"resume_text": {"$exists": True}}, {"file_path": {"$exists": True}},
+                     {"filename": {"$exists": True}, "file_blob": {"$exists": False}}]}
+    projection = {"resume_text": 1, "file_path": 1, "filename": 1, "file_blob": 1}
+    for applicant in collection.find(query, projection, batch_size=batch_size):
+        update = {"$set": {}, "$unset": {}}
+        def store(data, **extra):
+            if dry_run:
+                return {"size": len(data), "stored_size": min(len(data), len(compress(data, default_codec())))}
+            return put_blob(data, **extra)
+        if applicant.get("resume_text") is not None:
+            data = applicant["resume_text"].encode("utf-8")
+            ref = store(data)
+            update["$set"]["resume_blob"] = ref
+            update["$unset"]["resume_text"] = ""
+            stats["texts"] += 1
+            stats["bytes"] += ref["size"]
+            stats["stored_bytes"] += ref["stored_size"]
+        file_path = local_file_path(applicant, upload_folder)
+        if file_path:
+            if os.path.exists(file_path):
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                extension = file_path.rsplit(".", 1)[1].lower() if "." in file_path else "bin"
+                ref = store(data, ext=extension)
+                update["$set"]["file_blob"] = ref
+                if applicant.get("file_path"):
+                    update["$unset"]["file_path"] = ""
+                moved_files.add(file_path)
+                stats["files"] += 1
+                stats["bytes"] += ref["size"]
+                stats["stored_bytes"] += ref["stored_size"]
+            else:
+                stats["missing_files"] += 1
+        update = {op: fields for op, fields in update.items() if fields}
+        if update:
+            operations.append(UpdateOne({"_id": applicant["_id"]}, update))
+        if len(operations) >= batch_size:
+            flush()
+    flush()
+
+    if not (dry_run or keep_files):
+        # Uploads are content-addressed and may be shared; delete only unreferenced ones
+        for file_path in moved_files:
+            still_used = {"$or": [{"file_path": file_path},
+                                  {"filename": os.path.basename(file_path), "file_blob": {"$exists": False}, "file_path": {"$exists": False}}]}
+            if not collection.find_one(still_used, {"_id": 1}) and os.path.exists(file_path):
+                os.remove(file_path)
+    return stats
+
+
+if __name__ == "__main__":
+    # python -m utils.blob_store  (from backend/) moves existing applicants' resumes into the store
+    import argparse
+    from utils.db import db
+
+    parser = argparse.ArgumentParser(description="Move resume text and files into the blob store")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="report what would move without writing")
+    parser.add_argument("--keep-files", action="store_true", help="leave the migrated files in uploads/")
+    parser.add_argument("--upload-folder", default=UPLOAD_FOLDER, help="where applicants with only a filename had it saved")
+    args = parser.parse_args()
+    if not blob_store_enabled():
+        raise SystemExit("BLOB_STORE=off; set it to local or gridfs first")
+
+    stats = migrate(db.applicants, batch_size=args.batch_size, dry_run=args.dry_run, keep_files=args.keep_files,
+                    upload_folder=args.upload_folder)
+    ratio = stats["stored_bytes"] / stats["bytes"] if stats["bytes"] else 1.0
+    print(f"[INFO] {'Would move' if args.dry_run else 'Moved'} {stats['texts']} resume texts and {stats['files']} files "
+          f"to the {BLOB_STORE} store ({stats['bytes']} -> {stats['stored_bytes']} bytes, {ratio:.0%})")
+    if stats["missing_files"]:
+        print(f"[WARN] {stats['missing_files']} applicants point at files that no longer exist")
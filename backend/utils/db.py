@@ -1,6 +1,7 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.write_concern import WriteConcern
 from dotenv import load_dotenv
-import os
+import os, threading, time
 
 # Load environment variables from .env file
 load_dotenv()
@@ -10,12 +11,210 @@ MONGO_URI = os.getenv("MONGO_URI")
 if not MONGO_URI:
     raise Exception("MONGO_URI not set in .env")
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
+# Benchmarks and tests point this at a scratch database
+DATABASE_NAME = os.getenv("MONGO_DB_NAME", "ai_hr_db")
+
+# ---------------- Client Settings ----------------
+def _int_env(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+MONGO_MAX_POOL_SIZE = _int_env("MONGO_MAX_POOL_SIZE", 100)
+MONGO_MIN_POOL_SIZE = _int_env("MONGO_MIN_POOL_SIZE", 0)
+# How long a request waits for a free pooled connection before failing fast
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)
+MONGO_CONNECT_TIMEOUT_MS = _int_env("MONGO_CONNECT_TIMEOUT_MS", 5000)
+MONGO_SOCKET_TIMEOUT_MS = _int_env("MONGO_SOCKET_TIMEOUT_MS", 30000)
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+# Bulk applicant inserts can trade durability for throughput, e.g. w=1 without journaling
+MONGO_BULK_WRITE_W = os.getenv("MONGO_BULK_WRITE_W", "1")
+MONGO_BULK_WRITE_JOURNAL = os.getenv("MONGO_BULK_WRITE_JOURNAL", "").lower() == "true"
+
+def client_options():
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+
+# ---------------- Pool Metrics ----------------
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection-pool counters fed by pymongo's CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.checkouts = 0
+            self.checkout_failures = {}
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.pools_cleared = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "open_connections": self.open,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": round(self.in_use / MONGO_MAX_POOL_SIZE, 4) if MONGO_MAX_POOL_SIZE else 0.0,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+                "pools_cleared": self.pools_cleared,
+            }
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        duration = getattr(event, "duration", None)
+        if duration is None:
+            duration = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.wait_total += duration
+            self.wait_max = max(self.wait_max, duration)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+pool_metrics = PoolMetrics()
+
+# ---------------- Client Factory ----------------
+# One client per process, created on first use. A client inherited across
+# fork() (gunicorn --preload, multiprocessing) shares sockets with the parent,
+# so a child process always builds its own.
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = MongoClient(MONGO_URI, connect=False, event_listeners=[pool_metrics], **client_options())
+            _client_pid = pid
+        return _client
+
+def _reset_after_fork():
+    global _client, _client_pid
+    # The inherited client must not be used (or closed) by the child
+    _client, _client_pid = None, None
+    pool_metrics.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+def pool_stats():
+    return pool_metrics.snapshot()
+
+
+class _LazyDatabase:
+    """Module-level stand-in for the Database so `from utils.db import db` never connects at import."""
+
+    def __getattr__(self, name):
+        return getattr(get_database(), name)
+
+    def __getitem__(self, name):
+        return get_database()[name]
+
+
+class _LazyCollection:
+    """Collection stand-in that resolves against the current process's client on every use."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_database()[self._name], attr)
+
 
 # Database
-db = client["ai_hr_db"]
+db = _LazyDatabase()
 
 # Collections
-users_collection = db["users"]      # For storing user signup/login data
-jobs_collection = db["jobs"]        # For storing job posts
+users_collection = _LazyCollection("users")      # For storing user signup/login data
+jobs_collection = _LazyCollection("jobs")        # For storing job posts
+
+def lazy_collection(name):
+    """Collection handle that is safe to keep in long-lived objects across fork()."""
+    return _LazyCollection(name)
+
+def bulk_collection(name):
+    """Collection handle with the write concern configured for bulk inserts."""
+    w = int(MONGO_BULK_WRITE_W) if MONGO_BULK_WRITE_W.isdigit() else MONGO_BULK_WRITE_W
+    concern = WriteConcern(w=w, j=True) if MONGO_BULK_WRITE_JOURNAL else WriteConcern(w=w)
+    return get_database()[name].with_options(write_concern=concern)
+
+def ensure_indexes():
+    """Create the indexes the listing endpoints rely on (no-op if they exist)."""
+    # Keyset pagination of jobs, newest first, optionally per HR/admin
+    db.jobs.create_index([("created_at", -1), ("_id", -1)])
+    db.jobs.create_index([("created_by", 1), ("created_at", -1), ("_id", -1)])
+    # Applicants per job ranked by fit score, or by upload time
+    db.applicants.create_index([("job_id", 1), ("fit_score", -1), ("_id", -1)])
+    db.applicants.create_index([("job_id", 1), ("uploaded_at", -1), ("_id", -1)])
+    # Duplicate resume lookups (utils/dedup.py)
+    db.applicants.create_index([("job_id", 1), ("file_hash", 1)])
+    db.applicants.create_index([("job_id", 1), ("content_hash", 1)])
+    db.applicants.create_index([("job_id", 1), ("simhash_bands", 1)])
+    # Incremental search index sync (utils/search_index.py)
+    db.applicants.create_index("search_updated_at")
+    # Re-matching stored applicants against a job (utils/rematch.py)
+    db.job_matches.create_index([("job_id", 1), ("applicant_id", 1)], unique=True)
+    db.job_matches.create_index([("job_id", 1), ("fit_score", -1), ("_id", -1)])
+    db.job_matches.create_index([("job_id", 1), ("prescreen_score", -1), ("_id", -1)])
+    db.rematch_runs.create_index([("job_id", 1), ("created_at", -1)])
+    db.users.create_index("email")
@@ -0,0 +1,195 @@
+"""Duplicate resume detection.
+
+Each applicant carries three fingerprints:
+
+* ``file_hash``     - sha256 of the uploaded bytes (also the stored file's name or blob key);
+* ``content_hash``  - sha256 of the whitespace-normalized resume text;
+* ``simhash``       - 64-bit SimHash over word 3-shingles, plus ``simhash_bands``,
+  the four 16-bit slices of it tagged with their position.
+
+Two resumes whose SimHashes differ in at most 3 bits must agree on at least
+one of the four bands, so a near-duplicate lookup is a single indexed
+``$in`` query on ``(job_id, simhash_bands)`` followed by a Hamming-distance
+check on the handful of candidates it returns.
+"""
+from utils.analysis_cache import normalize_text
+from dotenv import load_dotenv
+import numpy as np
+import hashlib, os, re, tempfile
+
+load_dotenv()
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+# Max differing SimHash bits to still call two resumes the same; band lookup guarantees recall up to 3
+DEDUP_MAX_DISTANCE = min(3, int(os.getenv("DEDUP_MAX_DISTANCE", "3")))
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+# Applicants in these states are never used as the original of a duplicate
+IGNORED_STATUSES = ["failed", "duplicate"]
+
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+
+# ---------------- Fingerprints ----------------
+def content_hash(text):
+    return hashlib.sha256(normalize_text(text).lower().encode("utf-8")).hexdigest()
+
+def shingles(text):
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+def simhash(text):
+    """64-bit SimHash of the text's word shingles (unsigned int)."""
+    terms = shingles(text)
+    if not terms:
+        return 0
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little") for term in terms],
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(terms)
+    return int(sum(1 << int(bit) for bit in np.flatnonzero(votes > 0)))
+
+def to_signed(value):
+    # BSON only has signed 64-bit integers
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+def simhash_bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(band << BAND_BITS) | ((value >> (band * BAND_BITS)) & mask) for band in range(BANDS)]
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+def fingerprint(resume_text):
+    """Fields stored on an applicant for duplicate lookups."""
+    value = simhash(resume_text)
+    return {
+        "content_hash": content_hash(resume_text),
+        "simhash": to_signed(value),
+        "simhash_bands": simhash_bands(value),
+    }
+
+# ---------------- Content-addressed files ----------------
+def save_content_addressed(source, filename, folder):
+    """Copy a readable binary stream into ``folder`` as ``<sha256>.<ext>``; returns (path, file_hash).
+
+    Identical uploads map to the same file, so concurrent uploads can no longer
+    overwrite each other's resumes under a shared name.
+    """
+    extension = filename.rsplit(".", 1)[1].lower() if "." in filename else "bin"
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            for chunk in iter(lambda: source.read(1 << 16), b""):
+                digest.update(chunk)
+                target.write(chunk)
+        file_hash = digest.hexdigest()
+        file_path = os.path.join(folder, f"{file_hash}.{extension}")
+        os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return file_path, file_hash
+
+# ---------------- Lookups ----------------
+def find_duplicate(collection, job_id, fingerprints, before_id=None, max_distance=DEDUP_MAX_DISTANCE, projection=None):
+    """Earlier applicant of the job matching any of the fingerprints, or None.
+
+    ``before_id`` limits the search to applicants created before that one, so
+    two copies processed at the same time cannot both defer to each other.
+
+    Returns {"applicant": doc, "match": "file" | "exact" | "near", "distance": bits}.
+    """
+    if not DEDUP_ENABLED:
+        return None
+    base = {"job_id": job_id, "status": {"$nin": IGNORED_STATUSES}}
+    if before_id is not None:
+        base["_id"] = {"$lt": before_id}
+
+    for field, match in (("file_hash", "file"), ("content_hash", "exact")):
+        if fingerprints.get(field):
+            existing = collection.find_one({**base, field: fingerprints[field]}, projection)
+            if existing:
+                return {"applicant": existing, "match": match, "distance": 0}
+
+    if fingerprints.get("simhash_bands") and max_distance > 0:
+        fields = dict(projection) if projection else None
+        if fields and all(fields.values()):
+            fields["simhash"] = 1  # inclusion projections must still return the fingerprint
+        best = None
+        for candidate in collection.find({**base, "simhash_bands": {"$in": fingerprints["simhash_bands"]}}, fields):
+            distance = hamming(candidate["simhash"], fingerprints["simhash"])
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, candidate)
+        if best:
+            return {"applicant": best[1], "match": "near", "distance": best[0]}
+    return None
+
+
+class FingerprintIndex:
+    """In-memory counterpart of ``find_duplicate`` for resumes of one upload batch."""
+
+    def __init__(self, max_distance=DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.by_hash = {}
+        self.by_band = {}
+
+    def add(self, key, fingerprints):
+        for field in ("file_hash", "content_hash"):
+            if fingerprints.get(field):
+                self.by_hash.setdefault(fingerprints[field], key)
+        for band in fingerprints.get("simhash_bands", []):
+            self.by_band.setdefault(band, []).append((fingerprints["simhash"], key))
+
+    def find(self, fingerprints):
+        if not DEDUP_ENABLED:
+            return None
+        for field, match in (("file_hash", "file"), ("content_hash", "exact")):
+            key = self.by_hash.get(fingerprints.get(field))
+            if key is not None:
+                return key, match, 0
+        if self.max_distance <= 0:
+            return None
+        best = None
+        for band in fingerprints.get("simhash_bands", []):
+            for value, key in self.by_band.get(band, []):
+                distance = hamming(value, fingerprints["simhash"])
+                if distance <= self.max_distance and (best is None or distance < best[2]):
+                    best = (key, "near", distance)
+        return best
+
+
+def backfill_fingerprints(collection, batch_size=500):
+    """Add dedup fingerprints to applicants stored before they existed; returns the number updated."""
+    from pymongo import UpdateOne
+    from utils.blob_store import resume_text_of, TEXT_FIELDS, HAS_RESUME_TEXT
+
+    updated, operations = 0, []
+    cursor = collection.find({"content_hash": {"$exists": False}, **HAS_RESUME_TEXT}, TEXT_FIELDS)
+    for applicant in cursor:
+        resume_text = resume_text_of(applicant)
+        if resume_text is None:
+            continue
+        operations.append(UpdateOne({"_id": applicant["_id"]}, {"$set": fingerprint(resume_text)}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    # python -m utils.dedup  (from backend/) fingerprints existing applicants
+    from utils.db import db
+    print(f"[INFO] Fingerprinted {backfill_fingerprints(db.applicants)} applicants")
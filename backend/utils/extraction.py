@@ -0,0 +1,203 @@
+"""Resume text extraction.
+
+Extraction is a generator pipeline: each format yields text chunks (PDF
+pages; DOCX headers, body paragraphs and tables in document order, footers)
+and ``extract_text`` joins them once, one per line so section headings stay
+recognizable to the prompt builder, stopping at whichever limit is hit
+first - page count, character count or the per-file time budget. The time
+budget is checked between chunks, so a single pathological page can still
+overrun it by that page's parse time; ``MAX_RESUME_PAGES`` bounds how often
+that can happen. A file still running after ``EXTRACTION_KILL_TIMEOUT`` is
+given up on by ``extract_each``, which kills its pool's workers.
+
+Kept free of Flask, Mongo and Gemini imports so it can run cheaply inside
+``ProcessPoolExecutor`` children. The parsers themselves (PyPDF2,
+python-docx) are imported on first use, so startup does not pay for them.
+"""
+from concurrent.futures import ProcessPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from utils.log import get_logger
+import multiprocessing, os, threading, time
+
+load_dotenv()
+log = get_logger("extraction")
+
+# PDF parsing is CPU-bound, so bulk uploads fan out over processes rather than threads
+EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", "0")) or os.cpu_count() or 1
+MAX_RESUME_BYTES = int(os.getenv("MAX_RESUME_BYTES", str(20 * 1024 * 1024)))
+MAX_RESUME_PAGES = int(os.getenv("MAX_RESUME_PAGES", "30"))
+MAX_RESUME_CHARS = int(os.getenv("MAX_RESUME_CHARS", "100000"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "10"))  # seconds per file
+# Hard limit for a file stuck inside one page; its worker cannot be interrupted, so the pool is replaced
+EXTRACTION_KILL_TIMEOUT = float(os.getenv("EXTRACTION_KILL_TIMEOUT", str(EXTRACTION_TIMEOUT * 3)))
+EXTRACTION_POLL_INTERVAL = 0.5
+# Not fork: the web process has worker, sender and pymongo threads whose held locks a forked child would inherit
+EXTRACTION_START_METHOD = os.getenv("EXTRACTION_START_METHOD", "forkserver")
+
+# ---------------- Chunk Generators ----------------
+def iter_pdf_text(file_path, max_pages=MAX_RESUME_PAGES):
+    import PyPDF2
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for index, page in enumerate(reader.pages):
+            if index >= max_pages:
+                break
+            page_text = page.extract_text()
+            if page_text:
+                yield page_text
+
+def _iter_block_text(blocks):
+    from docx.table import Table
+    for block in blocks:
+        if isinstance(block, Table):
+            yield from _iter_table_text(block)
+        elif block.text:
+            yield block.text
+
+def _iter_table_text(table):
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            # Merged cells repeat across the row; keep each one once
+            text = " ".join(_iter_block_text(cell.iter_inner_content())).strip()
+            if text and (not cells or cells[-1] != text):
+                cells.append(text)
+        if cells:
+            yield " | ".join(cells)
+
+def _iter_header_footer_text(doc, attribute):
+    seen = set()
+    for section in doc.sections:
+        part = getattr(section, attribute)
+        if part.is_linked_to_previous:
+            continue
+        for text in _iter_block_text(part.iter_inner_content()):
+            if text not in seen:
+                seen.add(text)
+                yield text
+
+def iter_docx_text(file_path):
+    import docx
+    doc = docx.Document(file_path)
+    # Contact details often live in the page header of resume templates
+    yield from _iter_header_footer_text(doc, "header")
+    yield from _iter_block_text(doc.iter_inner_content())
+    yield from _iter_header_footer_text(doc, "footer")
+
+CHUNK_READERS = {
+    "pdf": iter_pdf_text,
+    "docx": iter_docx_text,
+}
+
+# ---------------- Extraction ----------------
+def extract_text(file_path, max_chars=MAX_RESUME_CHARS, timeout=EXTRACTION_TIMEOUT):
+    ext = file_path.rsplit(".", 1)[1].lower()
+    reader = CHUNK_READERS.get(ext)
+    if reader is None:
+        return ""
+    try:
+        size = os.path.getsize(file_path)
+        if size > MAX_RESUME_BYTES:
+            log.warning("resume over MAX_RESUME_BYTES; skipped", extra={"file": os.path.basename(file_path), "bytes": size})
+            return ""
+
+        chunks, length = [], 0
+        deadline = time.monotonic() + timeout
+        chunk_iter = reader(file_path)
+        try:
+            for chunk in chunk_iter:
+                chunks.append(chunk)
+                length += len(chunk) + 1
+                if length >= max_chars:
+                    break
+                if time.monotonic() > deadline:
+                    log.warning("extraction budget exceeded; truncated", extra={"file": os.path.basename(file_path), "timeout_s": timeout})
+                    break
+        finally:
+            chunk_iter.close()
+        return "\n".join(chunks)[:max_chars].strip()
+    except Exception as e:
+        log.error("text extraction failed", extra={"file": os.path.basename(file_path), "error": str(e)})
+        return ""
+
+# ---------------- Process Pool ----------------
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = EXTRACTION_START_METHOD
+            if method not in multiprocessing.get_all_start_methods():
+                method = "spawn"  # forkserver is POSIX-only
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_PROCESSES, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+def recycle_extraction_pool(pool):
+    """Kill the workers of a pool with a hung extraction; the next submit starts a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # Other batches' futures on this pool fail with BrokenProcessPool and are resubmitted by their extract_each
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_each(file_paths, kill_timeout=EXTRACTION_KILL_TIMEOUT):
+    """Extract files in the process pool; yields (index, text, error) as each one finishes.
+
+    A file still running after ``kill_timeout`` seconds is reported with an
+    error and its pool is recycled. The batch's other unfinished files are
+    resubmitted to the new pool; a file whose worker died under it any other
+    way is retried once.
+    """
+    def submit(index):
+        pool = get_extraction_pool()
+        pending[pool.submit(extract_text, file_paths[index])] = (index, pool)
+
+    pending, started, retried = {}, {}, set()
+    for index in range(len(file_paths)):
+        submit(index)
+    try:
+        while pending:
+            finished, _ = wait(pending, timeout=EXTRACTION_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, _ = pending.pop(future)
+                started.pop(future, None)
+                try:
+                    yield index, future.result(), None
+                except (BrokenProcessPool, CancelledError) as e:
+                    if index in retried:
+                        yield index, "", str(e) or "Extraction worker died"
+                    else:
+                        retried.add(index)
+                        submit(index)
+                except Exception as e:
+                    yield index, "", str(e)
+
+            # "running" starts when a task enters the pool's call queue, up to one task before a worker takes it
+            now = time.monotonic()
+            hung = [future for future in pending
+                    if future.running() and now - started.setdefault(future, now) > kill_timeout]
+            if hung:
+                broken = {pending[future][1] for future in hung}
+                indexes = [pending.pop(future)[0] for future in hung]
+                for index in indexes:
+                    log.error("extraction timed out; recycling the pool",
+                              extra={"file": os.path.basename(file_paths[index]), "timeout_s": kill_timeout})
+                for pool in broken:
+                    recycle_extraction_pool(pool)
+                for future, (index, pool) in list(pending.items()):
+                    if pool in broken:
+                        del pending[future]
+                        started.pop(future, None)
+                        submit(index)
+                for index in indexes:
+                    yield index, "", f"Extraction timed out after {kill_timeout:g}s"
+    finally:
+        # The consumer went away: drop the files that have not started yet
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,237 @@
+"""Per-job applicant statistics, kept up to date by the applicant writers.
+
+One ``job_stats`` document per job (``_id`` = job id) holds counters that
+every write to ``db.applicants`` adjusts with a single ``$inc``:
+
+* ``applicants`` and ``status.<status>`` for the settled states (completed,
+  failed, duplicate, deferred); the rest are pending or processing;
+* for completed applicants: ``scored``, ``score_sum``, ``above_threshold`` /
+  ``below_threshold`` (the 0.85 rejection cutoff), ``prescreened_out``, a
+  fit-score histogram of ``JOB_STATS_BUCKETS`` buckets and ``skills.<skill>``
+  counts;
+* ``top``: the ``JOB_STATS_TOP_K`` best-scored applicants, kept sorted and
+  bounded with ``$push``/``$sort``/``$slice``.
+
+A change is applied as the difference between the applicant's contribution
+before and after the write, so re-analysis and status changes never count an
+applicant twice. Reading the stats of a job is one ``find_one`` however many
+applicants it has.
+
+Writers go through ``update_applicant`` (a ``find_one_and_update`` that
+returns the previous state) or call ``record_insert`` after inserting.
+Stats updates never fail a write: errors are logged, and ``rebuild``
+(``python -m utils.job_stats``) recomputes the documents from the applicants,
+which also refills ``top`` when an applicant dropped out of it.
+"""
+from utils.db import db, lazy_collection
+from utils.log import get_logger
+from datetime import datetime
+from dotenv import load_dotenv
+import heapq, os
+
+load_dotenv()
+log = get_logger("job_stats")
+
+JOB_STATS_BUCKETS = int(os.getenv("JOB_STATS_BUCKETS", "10"))
+JOB_STATS_TOP_K = int(os.getenv("JOB_STATS_TOP_K", "20"))
+# Skills counted per applicant (analysis results rarely list more)
+JOB_STATS_MAX_SKILLS = int(os.getenv("JOB_STATS_MAX_SKILLS", "30"))
+
+SETTLED_STATUSES = ("completed", "failed", "duplicate", "deferred")
+STATS_PROJECTION = {"job_id": 1, "status": 1, "fit_score": 1, "skills": 1, "prescreened_out": 1, "candidate_name": 1}
+
+def get_stats_collection():
+    return lazy_collection("job_stats")
+
+# ---------------- Contributions ----------------
+def skill_key(skill):
+    """Skill name as a field name: "." and "$" would be read as a path and an operator."""
+    return skill.strip().lower().replace(".", "．").replace("$", "＄")
+
+def skill_name(key):
+    return key.replace("．", ".").replace("＄", "$")
+
+def bucket(score):
+    return str(min(max(int(score * JOB_STATS_BUCKETS), 0), JOB_STATS_BUCKETS - 1))
+
+def scored(applicant):
+    """The fit score of a completed applicant, else None."""
+    score = (applicant or {}).get("fit_score")
+    if applicant and applicant.get("status", "completed") == "completed" and isinstance(score, (int, float)):
+        return float(score)
+    return None
+
+def contribution(applicant):
+    """{counter path: amount} an applicant document adds to its job's stats."""
+    if not applicant:
+        return {}
+    from utils.resume_pipeline import REJECTION_THRESHOLD
+
+    counts = {"applicants": 1}
+    status = applicant.get("status", "completed")
+    if status in SETTLED_STATUSES:
+        counts[f"status.{status}"] = 1
+    if status == "completed" and applicant.get("prescreened_out"):
+        counts["prescreened_out"] = 1
+    score = scored(applicant)
+    if score is not None:
+        counts.update({
+            "scored": 1,
+            "score_sum": score,
+            "above_threshold" if score >= REJECTION_THRESHOLD else "below_threshold": 1,
+            f"histogram.{bucket(score)}": 1,
+        })
+        skills = {skill_key(skill) for skill in applicant.get("skills") or [] if isinstance(skill, str) and skill.strip()}
+        for key in sorted(skills)[:JOB_STATS_MAX_SKILLS]:
+            counts[f"skills.{key}"] = 1
+    return counts
+
+def top_entry(applicant):
+    score = scored(applicant)
+    if score is None:
+        return None
+    return {"applicant_id": str(applicant["_id"]), "name": applicant.get("candidate_name") or "", "fit_score": score}
+
+def delta(before, after):
+    """Counter changes that turn ``before``'s contribution into ``after``'s (zeros left out)."""
+    changes = contribution(after)
+    for path, amount in contribution(before).items():
+        changes[path] = changes.get(path, 0) - amount
+    return {path: amount for path, amount in changes.items() if amount}
+
+# ---------------- Updates ----------------
+def apply(job_id, inc, push=(), pull=None):
+    stats = get_stats_collection()
+    if pull:
+        # $pull and $push cannot touch the same field in one update
+        stats.update_one({"_id": job_id}, {"$pull": {"top": {"applicant_id": pull}}})
+    if not inc and not push:
+        return
+    update = {"$set": {"updated_at": datetime.utcnow()}}
+    if inc:
+        update["$inc"] = inc
+    if push:
+        update["$push"] = {"top": {"$each": list(push), "$sort": {"fit_score": -1}, "$slice": JOB_STATS_TOP_K}}
+    stats.update_one({"_id": job_id}, update, upsert=True)
+
+def record_change(before, after):
+    """Apply one applicant's change (either side may be None for an insert or delete)."""
+    applicant = after or before
+    if not applicant or not applicant.get("job_id"):
+        return
+    old, new = top_entry(before), top_entry(after)
+    changed = old != new
+    try:
+        apply(applicant["job_id"], delta(before, after),
+              push=[new] if new and changed else (), pull=old["applicant_id"] if old and changed else None)
+    except Exception as e:
+        log.error("job stats update failed", extra={"job_id": applicant["job_id"], "error": str(e)})
+
+def record_insert(documents):
+    """Count newly inserted applicants, one update per job."""
+    by_job = {}
+    for document in documents:
+        if not document.get("job_id"):
+            continue
+        inc, push = by_job.setdefault(document["job_id"], ({}, []))
+        for path, amount in contribution(document).items():
+            inc[path] = inc.get(path, 0) + amount
+        entry = top_entry(document)
+        if entry:
+            push.append(entry)
+    for job_id, (inc, push) in by_job.items():
+        try:
+            apply(job_id, inc, push)
+        except Exception as e:
+            log.error("job stats update failed", extra={"job_id": job_id, "error": str(e)})
+
+def update_applicant(applicant_id, update):
+    """``update_one`` on an applicant by id that keeps its job's stats in step; returns the previous state."""
+    before = db.applicants.find_one_and_update({"_id": applicant_id}, update, projection=STATS_PROJECTION)
+    if before is not None:
+        after = {**before, **update.get("$set", {})}
+        for field in update.get("$unset", {}):
+            after.pop(field, None)
+        record_change(before, after)
+    return before
+
+# ---------------- Reads ----------------
+def empty_stats(job_id):
+    return {"_id": job_id, "applicants": 0, "status": {}, "scored": 0, "score_sum": 0.0, "above_threshold": 0,
+            "below_threshold": 0, "prescreened_out": 0, "histogram": {}, "skills": {}, "top": [], "updated_at": None}
+
+def job_stats(job_id, top_skills=20):
+    """The job's stats shaped for the API (see ``GET /api/jobs/<job_id>/stats``)."""
+    from utils.resume_pipeline import REJECTION_THRESHOLD
+
+    stats = get_stats_collection().find_one({"_id": job_id}) or empty_stats(job_id)
+    statuses = {status: stats.get("status", {}).get(status, 0) for status in SETTLED_STATUSES}
+    width = 1 / JOB_STATS_BUCKETS
+    histogram = stats.get("histogram", {})
+    skills = sorted(stats.get("skills", {}).items(), key=lambda item: (-item[1], item[0]))
+    return {
+        "job_id": job_id,
+        "applicants": stats.get("applicants", 0),
+        "in_progress": stats.get("applicants", 0) - sum(statuses.values()),
+        "status": statuses,
+        "scored": stats.get("scored", 0),
+        "avg_fit_score": round(stats.get("score_sum", 0.0) / stats["scored"], 4) if stats.get("scored") else None,
+        "threshold": REJECTION_THRESHOLD,
+        "above_threshold": stats.get("above_threshold", 0),
+        "below_threshold": stats.get("below_threshold", 0),
+        "prescreened_out": stats.get("prescreened_out", 0),
+        "histogram": [{"from": round(index * width, 4), "to": round((index + 1) * width, 4),
+                       "count": histogram.get(str(index), 0)} for index in range(JOB_STATS_BUCKETS)],
+        "top_skills": [{"skill": skill_name(key), "count": count} for key, count in skills[:top_skills] if count > 0],
+        "top_candidates": stats.get("top", []),
+        "updated_at": stats.get("updated_at").isoformat() if stats.get("updated_at") else None,
+    }
+
+# ---------------- Rebuild ----------------
+def nest(counts):
+    """{"histogram.3": 2} -> {"histogram": {"3": 2}} for a whole document write."""
+    document = {}
+    for path, amount in counts.items():
+        if "." in path:
+            group, key = path.split(".", 1)
+            document.setdefault(group, {})[key] = amount
+        else:
+            document[path] = amount
+    return document
+
+def rebuild(job_ids=None, batch_size=1000):
+    """Recompute ``job_stats`` from the applicants (every job, or ``job_ids``); returns {job_id: applicants}.
+
+    Applicant writes that land while a job is being rebuilt can be lost from
+    its counters; run it when uploads are quiet, or run it again.
+    """
+    job_ids = job_ids or db.applicants.distinct("job_id")
+    counted = {}
+    for job_id in job_ids:
+        counts, top = {}, []
+        for applicant in db.applicants.find({"job_id": job_id}, STATS_PROJECTION, batch_size=batch_size):
+            for path, amount in contribution(applicant).items():
+                counts[path] = counts.get(path, 0) + amount
+            entry = top_entry(applicant)
+            if entry:
+                heapq.heappush(top, (entry["fit_score"], entry["applicant_id"], entry))
+                if len(top) > JOB_STATS_TOP_K:
+                    heapq.heappop(top)
+        document = {**empty_stats(job_id), **nest(counts), "updated_at": datetime.utcnow(),
+                    "top": [entry for _, _, entry in sorted(top, key=lambda item: (-item[0], item[1]))]}
+        get_stats_collection().replace_one({"_id": job_id}, document, upsert=True)
+        counted[job_id] = counts.get("applicants", 0)
+    return counted
+
+
+if __name__ == "__main__":
+    # python -m utils.job_stats  (from backend/) recomputes the stats of every job, or of --job-id
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the per-job applicant statistics")
+    parser.add_argument("--job-id", action="append", help="only this job (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    counted = rebuild(args.job_id, batch_size=args.batch_size)
+    print(f"[INFO] Rebuilt stats for {len(counted)} jobs ({sum(counted.values())} applicants)")
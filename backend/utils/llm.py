@@ -0,0 +1,566 @@
+"""Shared Gemini client layer.
+
+Every model call in the app goes through ``generate``:
+
+* ``genai.configure`` runs once, on the first call;
+* ``GenerativeModel`` instances are cached per (model name, options);
+* a process-wide semaphore caps concurrent calls (``LLM_MAX_CONCURRENCY``);
+* a sliding one-minute window enforces request and token budgets
+  (``LLM_REQUESTS_PER_MINUTE`` / ``LLM_TOKENS_PER_MINUTE``);
+* each call gets a timeout, and 429/5xx errors are retried with jittered
+  exponential backoff;
+* latency and token usage are recorded per model (``llm_stats``) and exported
+  as Prometheus metrics; the call's wall time is the ``llm`` stage.
+
+``generate_stream`` is the streaming counterpart: it yields text chunks as
+Gemini produces them and additionally records time to first token. A stream
+holds its slot for as long as the client takes to read it, so streams have
+their own cap (``LLM_STREAM_MAX_CONCURRENCY``) and a slow reader never
+delays the analysis calls.
+
+``generate_async`` / ``generate_stream_async`` are the asyncio versions used
+by the ASGI entry point (``asgi.py``): the same budgets, retries and stats,
+but waiting happens on the event loop, so one process can keep many calls in
+flight without a thread per call. Their concurrency caps are
+``LLM_MAX_CONCURRENCY`` and ``LLM_STREAM_MAX_CONCURRENCY`` per event loop,
+separate from the threads' caps.
+
+Setting ``LLM_FAKE=true`` (or calling ``use_fake_models``) swaps Gemini for
+``FakeGenerativeModel``: deterministic output and configurable latency,
+for offline development and benchmarks.
+"""
+from collections import deque
+from dotenv import load_dotenv
+from utils.log import get_logger
+from utils.metrics import LLM_SECONDS, LLM_TTFT_SECONDS, LLM_RETRIES, LLM_FAILURES, LLM_TOKENS, stage
+import asyncio, json, os, random, re, threading, time, weakref, zlib
+
+load_dotenv()
+log = get_logger("llm")
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+JD_MODEL = os.getenv("GEMINI_JD_MODEL", "gemini-1.5-flash")
+ANALYSIS_MODEL = os.getenv("GEMINI_ANALYSIS_MODEL", "models/gemini-2.5-pro")
+# First tier of tiered analysis (see utils/resume_pipeline.py); ANALYSIS_MODEL re-scores the borderline cases
+ANALYSIS_FAST_MODEL = os.getenv("GEMINI_ANALYSIS_FAST_MODEL", "models/gemini-2.5-flash")
+EMAIL_MODEL = os.getenv("GEMINI_EMAIL_MODEL", "models/gemini-2.5-pro")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_STREAM_MAX_CONCURRENCY = int(os.getenv("LLM_STREAM_MAX_CONCURRENCY", str(LLM_MAX_CONCURRENCY)))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))  # 0 = unlimited
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))      # 0 = unlimited
+LLM_RATE_LIMIT_WAIT = float(os.getenv("LLM_RATE_LIMIT_WAIT", "60"))       # max seconds to queue for budget
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_FAKE = os.getenv("LLM_FAKE", "false").lower() == "true"
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+# Extra fake latency per 1000 prompt tokens, to model input processing time
+LLM_FAKE_MS_PER_1K_TOKENS = float(os.getenv("LLM_FAKE_MS_PER_1K_TOKENS", "0"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+def estimate_tokens(text):
+    # Rough heuristic for Gemini tokenization of English text (~4 chars per token)
+    return len(text) // 4 + 1
+
+# ---------------- Rate Limiting ----------------
+class MinuteRateLimiter:
+    """Sliding 60s window over request count and token usage."""
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()  # [timestamp, tokens]
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+
+    @property
+    def enabled(self):
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+
+    def try_acquire(self, tokens):
+        """Reserve budget if it is available now; returns (entry, None) or (None, seconds to wait)."""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            used = sum(entry[1] for entry in self._window)
+            requests_ok = not self.requests_per_minute or len(self._window) < self.requests_per_minute
+            # A single oversized request is let through once the window is empty
+            tokens_ok = not self.tokens_per_minute or used + tokens <= self.tokens_per_minute or not self._window
+            if requests_ok and tokens_ok:
+                entry = [now, tokens]
+                self._window.append(entry)
+                return entry, None
+            return None, 60 - (now - self._window[0][0])
+
+    def acquire(self, tokens, max_wait=LLM_RATE_LIMIT_WAIT):
+        """Reserve budget for one request; returns the window entry to adjust later."""
+        if not self.enabled:
+            return None
+        deadline = time.monotonic() + max_wait
+        while True:
+            entry, wait = self.try_acquire(tokens)
+            if entry is not None:
+                return entry
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded("LLM rate limit budget exhausted")
+            time.sleep(max(0.01, wait))
+
+    async def acquire_async(self, tokens, max_wait=LLM_RATE_LIMIT_WAIT):
+        if not self.enabled:
+            return None
+        deadline = time.monotonic() + max_wait
+        while True:
+            entry, wait = self.try_acquire(tokens)
+            if entry is not None:
+                return entry
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded("LLM rate limit budget exhausted")
+            await asyncio.sleep(max(0.01, wait))
+
+    def settle(self, entry, actual_tokens):
+        """Replace the estimated token count of a reservation with real usage."""
+        if entry is not None and actual_tokens:
+            with self._lock:
+                entry[1] = actual_tokens
+
+# ---------------- Metrics ----------------
+def failure_reason(error):
+    """Low-cardinality label for a failed call: the HTTP-style code, else the exception type."""
+    try:
+        return str(int(getattr(error, "code", None)))
+    except (TypeError, ValueError):
+        return type(error).__name__
+
+class LLMStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def record(self, model_name, latency, prompt_tokens=0, output_tokens=0, error=None, retries=0, first_token=None):
+        with self._lock:
+            stats = self._models.setdefault(model_name, {
+                "calls": 0, "errors": 0, "retries": 0, "latency_total_s": 0.0, "latency_max_s": 0.0,
+                "prompt_tokens": 0, "output_tokens": 0, "streams": 0, "ttft_total_s": 0.0, "ttft_max_s": 0.0,
+            })
+            if first_token is not None:
+                stats["streams"] += 1
+                stats["ttft_total_s"] += first_token
+                stats["ttft_max_s"] = max(stats["ttft_max_s"], first_token)
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["latency_total_s"] += latency
+            stats["latency_max_s"] = max(stats["latency_max_s"], latency)
+            stats["prompt_tokens"] += prompt_tokens or 0
+            stats["output_tokens"] += output_tokens or 0
+            if error is not None:
+                stats["errors"] += 1
+
+        outcome = "error" if error is not None else "ok"
+        LLM_SECONDS.observe(latency, model=model_name, outcome=outcome)
+        if retries:
+            LLM_RETRIES.inc(retries, model=model_name)
+        if error is not None:
+            LLM_FAILURES.inc(model=model_name, reason=failure_reason(error))
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, model=model_name, direction="prompt")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, model=model_name, direction="output")
+        if first_token is not None:
+            LLM_TTFT_SECONDS.observe(first_token, model=model_name)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for model_name, stats in self._models.items():
+                stats = dict(stats)
+                stats["latency_avg_s"] = round(stats["latency_total_s"] / stats["calls"], 4) if stats["calls"] else 0.0
+                stats["latency_total_s"] = round(stats["latency_total_s"], 4)
+                stats["latency_max_s"] = round(stats["latency_max_s"], 4)
+                stats["ttft_avg_s"] = round(stats["ttft_total_s"] / stats["streams"], 4) if stats["streams"] else 0.0
+                stats["ttft_total_s"] = round(stats["ttft_total_s"], 4)
+                stats["ttft_max_s"] = round(stats["ttft_max_s"], 4)
+                result[model_name] = stats
+            return result
+
+# ---------------- Fake Model ----------------
+class FakeResponse:
+    def __init__(self, text, prompt_tokens, output_tokens):
+        self.text = text
+        self.usage_metadata = type("UsageMetadata", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": output_tokens,
+            "total_token_count": prompt_tokens + output_tokens,
+        })()
+
+
+class FakeStream:
+    """Iterable of response chunks, like ``generate_content(stream=True)``."""
+
+    def __init__(self, text, prompt_tokens, chunk_delay=0.0):
+        self.pieces = re.findall(r"\S+\s*", text) or [text]
+        self.chunk_delay = chunk_delay
+        self.usage_metadata = FakeResponse(text, prompt_tokens, estimate_tokens(text)).usage_metadata
+
+    def __iter__(self):
+        for start in range(0, len(self.pieces), 4):
+            if start and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield FakeResponse("".join(self.pieces[start:start + 4]), 0, 0)
+
+    async def __aiter__(self):
+        for start in range(0, len(self.pieces), 4):
+            if start and self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield FakeResponse("".join(self.pieces[start:start + 4]), 0, 0)
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for ``genai.GenerativeModel`` with deterministic output."""
+
+    latency_ms = LLM_FAKE_LATENCY_MS
+    ms_per_1k_tokens = LLM_FAKE_MS_PER_1K_TOKENS
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    @staticmethod
+    def _score(text):
+        return round((zlib.crc32(text.encode("utf-8")) % 100) / 100, 2)
+
+    @classmethod
+    def _analysis(cls, resume_text):
+        email = re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", resume_text)
+        first_line = resume_text.strip().split("\n", 1)[0][:60]
+        return {
+            "fit_score": cls._score(resume_text),
+            "summary": "Synthetic analysis from the fake model.",
+            "education": ["BSc Computer Science"],
+            "skills": sorted(set(re.findall(r"\b(Python|SQL|React|AWS|Docker|Java)\b", resume_text)))[:5],
+            "experience": ["Software Engineer"],
+            "projects": [],
+            "weak_areas": [],
+            "recommendations": [],
+            "candidate_name": " ".join(first_line.split()[:2]),
+            "candidate_email": email.group(0) if email else "",
+        }
+
+    def respond(self, prompt):
+        if "[Resume 0]" in prompt:
+            resumes = re.findall(r"\[Resume (\d+)\]\n(.*?)\n\[End of Resume \1\]", prompt, re.DOTALL)
+            return json.dumps([{"index": int(i), **self._analysis(text)} for i, text in resumes])
+        if "Resume Text:" in prompt:
+            return json.dumps(self._analysis(prompt.split("Resume Text:", 1)[1]))
+        if "rejection email template" in prompt:
+            return ("Dear $candidate_name,\n\nThank you for applying for the $job_title position at $company_name. "
+                    "Your screening score was $score; we will not be moving forward at this time.\n\nBest regards,\n$company_name")
+        if "rejection email" in prompt:
+            return "Dear Candidate,\n\nThank you for applying. We will not be moving forward at this time.\n\nBest regards,\nHR Team"
+        return "Job Summary\nA synthetic job description.\n\nResponsibilities\n- Build things\n\nRequirements\n- Experience"
+
+    def _stream(self, prompt, text):
+        # The configured latency is spread over the chunks; the first arrives after a tenth of it
+        chunks = max(1, (len(re.findall(r"\S+\s*", text)) + 3) // 4)
+        return FakeStream(text, estimate_tokens(prompt), self.latency_ms * 0.9 / 1000 / chunks)
+
+    def _delay_ms(self, prompt):
+        return self.latency_ms + self.ms_per_1k_tokens * estimate_tokens(prompt) / 1000
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        text = self.respond(prompt)
+        if stream:
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 10000)
+            return self._stream(prompt, text)
+        if self._delay_ms(prompt):
+            time.sleep(self._delay_ms(prompt) / 1000)
+        return FakeResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        text = self.respond(prompt)
+        if stream:
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 10000)
+            return self._stream(prompt, text)
+        if self._delay_ms(prompt):
+            await asyncio.sleep(self._delay_ms(prompt) / 1000)
+        return FakeResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+
+# ---------------- Client ----------------
+_configured = False
+_models = {}
+_models_lock = threading.Lock()
+_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_stream_semaphore = threading.BoundedSemaphore(LLM_STREAM_MAX_CONCURRENCY)
+rate_limiter = MinuteRateLimiter()
+stats = LLMStats()
+_model_factory = None
+
+def use_fake_models(latency_ms=None, ms_per_1k_tokens=None):
+    """Route every model through FakeGenerativeModel (tests, benchmarks, offline dev)."""
+    if latency_ms is not None:
+        FakeGenerativeModel.latency_ms = latency_ms
+    if ms_per_1k_tokens is not None:
+        FakeGenerativeModel.ms_per_1k_tokens = ms_per_1k_tokens
+    set_model_factory(FakeGenerativeModel)
+
+def set_model_factory(factory):
+    """Plug in any callable ``factory(model_name, **options)`` returning a model object."""
+    global _model_factory
+    with _models_lock:
+        _model_factory = factory
+        _models.clear()
+
+def _configure():
+    global _configured
+    if not _configured:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _configured = True
+
+def _default_factory(model_name, **options):
+    import google.generativeai as genai
+    _configure()
+    return genai.GenerativeModel(model_name, **options)
+
+def get_model(model_name, **options):
+    """Cached model instance for a name and constructor options."""
+    key = (model_name, json.dumps(options, sort_keys=True, default=str))
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                factory = _model_factory or (FakeGenerativeModel if LLM_FAKE else _default_factory)
+                model = _models[key] = factory(model_name, **options)
+    return model
+
+def is_retryable(error):
+    code = getattr(error, "code", None)
+    try:
+        return int(code) in RETRYABLE_STATUS
+    except (TypeError, ValueError):
+        return False
+
+def backoff_delay(attempt):
+    # Full jitter: spreads simultaneous retries out instead of synchronizing them
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+def usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "candidates_token_count", 0) or 0
+
+def budget_tokens(prompt, generation_config):
+    """Tokens to reserve from the rate limiter: the prompt estimate plus the output cap."""
+    max_output = (generation_config or {}).get("max_output_tokens", 0) if isinstance(generation_config, dict) else 0
+    return estimate_tokens(prompt) + max_output
+
+def request_kwargs(generation_config, timeout, stream=False):
+    kwargs = {"request_options": {"timeout": timeout}}
+    if stream:
+        kwargs["stream"] = True
+    if generation_config is not None:
+        kwargs["generation_config"] = generation_config
+    return kwargs
+
+def generate(model_name, prompt, generation_config=None, timeout=LLM_TIMEOUT, **model_options):
+    """Call ``generate_content`` through the shared limits; returns the SDK response."""
+    with stage("llm"):
+        return _generate(model_name, prompt, generation_config, timeout, **model_options)
+
+def _generate(model_name, prompt, generation_config, timeout, **model_options):
+    model = get_model(model_name, **model_options)
+    reservation = rate_limiter.acquire(budget_tokens(prompt, generation_config))
+
+    started = time.perf_counter()
+    retries = 0
+    with _semaphore:
+        while True:
+            try:
+                response = model.generate_content(prompt, **request_kwargs(generation_config, timeout))
+                break
+            except Exception as e:
+                if retries < LLM_MAX_RETRIES and is_retryable(e):
+                    delay = backoff_delay(retries)
+                    retries += 1
+                    log.warning("gemini call failed, retrying", extra={
+                        "model": model_name, "reason": failure_reason(e), "retry": retries, "delay_s": round(delay, 2)})
+                    time.sleep(delay)
+                    continue
+                stats.record(model_name, time.perf_counter() - started, error=e, retries=retries)
+                raise
+
+    prompt_tokens, output_tokens = usage_tokens(response)
+    rate_limiter.settle(reservation, prompt_tokens + output_tokens)
+    stats.record(model_name, time.perf_counter() - started, prompt_tokens, output_tokens, retries=retries)
+    return response
+
+def chunk_text(chunk):
+    # .text raises ValueError for chunks without parts (e.g. a final safety/stop chunk)
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def generate_stream(model_name, prompt, generation_config=None, timeout=LLM_TIMEOUT, **model_options):
+    """Yield text chunks from a streamed ``generate_content`` call.
+
+    Uses the same rate limits and stats as ``generate`` under the stream cap;
+    a failed call is only retried if nothing has been yielded yet.
+    """
+    model = get_model(model_name, **model_options)
+    reservation = rate_limiter.acquire(budget_tokens(prompt, generation_config))
+
+    started = time.perf_counter()
+    first_token = None
+    retries = 0
+    with _stream_semaphore:
+        while True:
+            try:
+                response = model.generate_content(prompt, **request_kwargs(generation_config, timeout, stream=True))
+                for chunk in response:
+                    text = chunk_text(chunk)
+                    if not text:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    yield text
+                break
+            except Exception as e:
+                if first_token is None and retries < LLM_MAX_RETRIES and is_retryable(e):
+                    delay = backoff_delay(retries)
+                    retries += 1
+                    log.warning("gemini stream failed, retrying", extra={
+                        "model": model_name, "reason": failure_reason(e), "retry": retries, "delay_s": round(delay, 2)})
+                    time.sleep(delay)
+                    continue
+                stats.record(model_name, time.perf_counter() - started, error=e, retries=retries, first_token=first_token)
+                raise
+
+    prompt_tokens, output_tokens = usage_tokens(response)
+    rate_limiter.settle(reservation, prompt_tokens + output_tokens)
+    stats.record(model_name, time.perf_counter() - started, prompt_tokens, output_tokens,
+                 retries=retries, first_token=first_token or time.perf_counter() - started)
+
+def generate_text(model_name, prompt, **kwargs):
+    return generate(model_name, prompt, **kwargs).text.strip()
+
+# ---------------- Async Client ----------------
+_async_semaphores = weakref.WeakKeyDictionary()
+
+def _async_semaphore(stream=False):
+    """The call or stream cap of the running event loop (an asyncio.Semaphore is bound to one loop)."""
+    loop = asyncio.get_running_loop()
+    semaphores = _async_semaphores.get(loop)
+    if semaphores is None:
+        semaphores = _async_semaphores[loop] = {
+            "call": asyncio.Semaphore(LLM_MAX_CONCURRENCY),
+            "stream": asyncio.Semaphore(LLM_STREAM_MAX_CONCURRENCY),
+        }
+    return semaphores["stream" if stream else "call"]
+
+async def _call_async(model, prompt, kwargs):
+    method = getattr(model, "generate_content_async", None)
+    if method is None:
+        # Factories without an async API still work, one thread per call
+        return await asyncio.to_thread(model.generate_content, prompt, **kwargs)
+    return await method(prompt, **kwargs)
+
+async def generate_async(model_name, prompt, generation_config=None, timeout=LLM_TIMEOUT, **model_options):
+    """Awaitable ``generate``; returns the SDK response."""
+    with stage("llm"):
+        model = get_model(model_name, **model_options)
+        reservation = await rate_limiter.acquire_async(budget_tokens(prompt, generation_config))
+
+        started = time.perf_counter()
+        retries = 0
+        async with _async_semaphore():
+            while True:
+                try:
+                    response = await _call_async(model, prompt, request_kwargs(generation_config, timeout))
+                    break
+                except Exception as e:
+                    if retries < LLM_MAX_RETRIES and is_retryable(e):
+                        delay = backoff_delay(retries)
+                        retries += 1
+                        log.warning("gemini call failed, retrying", extra={
+                            "model": model_name, "reason": failure_reason(e), "retry": retries, "delay_s": round(delay, 2)})
+                        await asyncio.sleep(delay)
+                        continue
+                    stats.record(model_name, time.perf_counter() - started, error=e, retries=retries)
+                    raise
+
+        prompt_tokens, output_tokens = usage_tokens(response)
+        rate_limiter.settle(reservation, prompt_tokens + output_tokens)
+        stats.record(model_name, time.perf_counter() - started, prompt_tokens, output_tokens, retries=retries)
+        return response
+
+async def generate_stream_async(model_name, prompt, generation_config=None, timeout=LLM_TIMEOUT, **model_options):
+    """Async generator counterpart of ``generate_stream``."""
+    model = get_model(model_name, **model_options)
+    reservation = await rate_limiter.acquire_async(budget_tokens(prompt, generation_config))
+
+    started = time.perf_counter()
+    first_token = None
+    retries = 0
+    async with _async_semaphore(stream=True):
+        while True:
+            try:
+                response = await _call_async(model, prompt, request_kwargs(generation_config, timeout, stream=True))
+                if hasattr(response, "__aiter__"):
+                    async for chunk in response:
+                        text = chunk_text(chunk)
+                        if not text:
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield text
+                else:
+                    # A synchronous stream (thread fallback): pull each chunk off the event loop
+                    chunks = iter(response)
+                    while True:
+                        chunk = await asyncio.to_thread(next, chunks, None)
+                        if chunk is None:
+                            break
+                        text = chunk_text(chunk)
+                        if not text:
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield text
+                break
+            except Exception as e:
+                if first_token is None and retries < LLM_MAX_RETRIES and is_retryable(e):
+                    delay = backoff_delay(retries)
+                    retries += 1
+                    log.warning("gemini stream failed, retrying", extra={
+                        "model": model_name, "reason": failure_reason(e), "retry": retries, "delay_s": round(delay, 2)})
+                    await asyncio.sleep(delay)
+                    continue
+                stats.record(model_name, time.perf_counter() - started, error=e, retries=retries, first_token=first_token)
+                raise
+
+    prompt_tokens, output_tokens = usage_tokens(response)
+    rate_limiter.settle(reservation, prompt_tokens + output_tokens)
+    stats.record(model_name, time.perf_counter() - started, prompt_tokens, output_tokens,
+                 retries=retries, first_token=first_token or time.perf_counter() - started)
+
+def llm_stats():
+    return {
+        "fake": _model_factory is FakeGenerativeModel or (_model_factory is None and LLM_FAKE),
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "max_stream_concurrency": LLM_STREAM_MAX_CONCURRENCY,
+        "models": stats.snapshot(),
+    }
@@ -0,0 +1,414 @@
+"""Mail outbox: persisted messages, pooled SMTP connections, background sending.
+
+Routes call ``queue_email`` instead of talking to SMTP. Messages are stored
+in the Mongo ``outbox`` collection and an ``OutboxSender`` thread claims them
+in batches, sends each batch over one reused (pooled) SMTP connection and
+retries failures with exponential backoff. Claims use ``find_one_and_update``
+so several processes can drain the same outbox.
+
+``send_now`` is the synchronous path for bulk dispatch (``/send-responses``):
+it sends a list of messages over one pooled connection chunk by chunk and
+records every message in the outbox, so whatever did not go through is
+retried by the sender like any queued message.
+
+A message's body is dropped once it is sent or has failed for good (it can
+hold a password reset), and the rest of the record expires after
+``OUTBOX_RETENTION_DAYS`` through a TTL index on ``expires_at``.
+
+Point ``SMTP_HOST``/``SMTP_PORT`` at a local debug server (for example
+``python -m aiosmtpd -n -l localhost:1025`` with ``SMTP_USE_TLS=false``) to
+test without a real mail account.
+"""
+from datetime import datetime, timedelta
+from email import charset
+from email.header import Header
+from email.mime.text import MIMEText
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+from utils.log import get_logger
+from utils.metrics import EMAILS, stage
+import os, smtplib, threading
+
+load_dotenv()
+log = get_logger("mailer")
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "20"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))  # seconds
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "600"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+# Sent and failed messages are deleted this long after they settle
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "30"))
+# Messages sent by send_now between two outbox writes
+DISPATCH_CHUNK_SIZE = int(os.getenv("DISPATCH_CHUNK_SIZE", "50"))
+# "thread" sends from inside the Flask process, "off" leaves it to `python worker.py --outbox`
+OUTBOX_MODE = os.getenv("OUTBOX_MODE", "thread").lower()
+
+# The candidate-facing routes always used MAIL_*, password recovery used EMAIL_*
+ACCOUNTS = {
+    "default": (os.getenv("MAIL_USERNAME"), os.getenv("MAIL_PASSWORD")),
+    "auth": (os.getenv("EMAIL_USER") or os.getenv("MAIL_USERNAME"),
+             os.getenv("EMAIL_PASS") or os.getenv("MAIL_PASSWORD")),
+}
+
+# ---------------- SMTP Connection Pool ----------------
+class SMTPConnectionPool:
+    def __init__(self, username, password, host=SMTP_HOST, port=SMTP_PORT,
+                 use_tls=SMTP_USE_TLS, max_size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self._count("opened")
+        return server
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                server = self._idle.pop() if self._idle else None
+            if server is None:
+                return self._connect()
+            try:
+                # Idle connections may have been dropped by the server
+                if server.noop()[0] == 250:
+                    self._count("reused")
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self.discard(server)
+
+    def release(self, server):
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(server)
+                return
+        self._quit(server)
+
+    def discard(self, server):
+        self._count("discarded")
+        self._quit(server)
+
+    def _quit(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server in idle:
+            self._quit(server)
+
+def mail_configured(account="default"):
+    """Whether the account has SMTP credentials (a local debug server needs none)."""
+    username, password = ACCOUNTS.get(account, ACCOUNTS["default"])
+    return bool(username and password)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(account="default"):
+    with _pools_lock:
+        pool = _pools.get(account)
+        if pool is None:
+            username, password = ACCOUNTS.get(account, ACCOUNTS["default"])
+            pool = _pools[account] = SMTPConnectionPool(username, password)
+        return pool
+
+# The global "utf-8" charset can be re-registered without a body encoding (Flask-Mail
+# used to), which leaves raw non-ASCII in the message; pin our own base64 variant
+UTF8_BASE64 = charset.Charset("utf-8")
+UTF8_BASE64.body_encoding = charset.BASE64
+
+def build_message(sender, recipient, subject, body):
+    msg = MIMEText(body, "plain", UTF8_BASE64)
+    msg["Subject"] = Header(subject, "utf-8")
+    msg["From"] = sender or ""
+    msg["To"] = recipient
+    return msg
+
+# ---------------- Outbox ----------------
+_wakeup = threading.Event()
+
+def get_outbox():
+    from utils.db import lazy_collection
+    return lazy_collection("outbox")
+
+def queue_email(recipient, subject, body, account="default", kind=None):
+    """Persist a message to the outbox and wake the sender; returns its id."""
+    now = datetime.utcnow()
+    message_id = get_outbox().insert_one({
+        "to": recipient,
+        "subject": subject,
+        "body": body,
+        "account": account,
+        "kind": kind,
+        "status": "queued",
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+    }).inserted_id
+    EMAILS.inc(outcome="queued")
+    _wakeup.set()
+    return message_id
+
+def outbox_stats():
+    outbox = get_outbox()
+    return {status: outbox.count_documents({"status": status}) for status in ("queued", "sending", "sent", "failed")}
+
+def backoff_delay(attempts):
+    return min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+
+def expires_at(now):
+    return now + timedelta(days=OUTBOX_RETENTION_DAYS)
+
+
+class OutboxSender:
+    def __init__(self, collection=None, batch_size=OUTBOX_BATCH_SIZE, poll_interval=OUTBOX_POLL_INTERVAL):
+        self.collection = collection if collection is not None else get_outbox()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+        self._thread.start()
+        log.info("started mail outbox sender")
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        _wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def prepare(self):
+        """Index and recovery of stale claims; done on the sender thread so startup does not wait on Mongo."""
+        self.collection.create_index([("status", 1), ("next_attempt_at", 1)])
+        # Only sent and failed messages carry expires_at
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        # Records settled before bodies were dropped on settling
+        self.collection.update_many({"status": {"$in": ["sent", "failed"]}, "body": {"$exists": True}},
+                                    {"$unset": {"body": ""}})
+        requeued = self.requeue_stale()
+        if requeued:
+            log.info("re-queued stale outbox messages", extra={"count": requeued})
+
+    def _run(self):
+        try:
+            self.prepare()
+        except Exception:
+            log.exception("outbox sender setup failed")
+        while not self._stop.is_set():
+            # Cleared before draining: a message queued from here on sets it again and cuts the wait short
+            _wakeup.clear()
+            try:
+                sent = self.drain_once()
+            except Exception:
+                log.exception("outbox sender iteration failed")
+                sent = 0
+            if not sent:
+                _wakeup.wait(self.poll_interval)
+
+    def claim_batch(self):
+        batch = []
+        now = datetime.utcnow()
+        while len(batch) < self.batch_size:
+            message = self.collection.find_one_and_update(
+                {"status": "queued", "next_attempt_at": {"$lte": now}},
+                {"$set": {"status": "sending", "claimed_at": now}, "$inc": {"attempts": 1}},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if message is None:
+                break
+            batch.append(message)
+        return batch
+
+    def drain_once(self):
+        """Claim and send one batch; returns the number of messages handled."""
+        batch = self.claim_batch()
+        by_account = {}
+        for message in batch:
+            by_account.setdefault(message.get("account", "default"), []).append(message)
+        for account, messages in by_account.items():
+            self.send_batch(get_pool(account), messages)
+        return len(batch)
+
+    def send_batch(self, pool, messages):
+        server = None
+        for position, message in enumerate(messages):
+            try:
+                if server is None:
+                    try:
+                        server = pool.acquire()
+                    except Exception as e:
+                        # No connection: the rest of the batch waits for the same retry instead of reconnecting each
+                        log.warning("smtp connect failed", extra={"to": message["to"], "error": str(e)})
+                        self.mark_retry(message, e)
+                        retry_at = datetime.utcnow() + timedelta(seconds=backoff_delay(message["attempts"]))
+                        self.release_claims(messages[position + 1:], e, retry_at)
+                        return
+                msg = build_message(pool.username, message["to"], message["subject"], message["body"])
+                with stage("smtp_send"):
+                    server.sendmail(pool.username or "", [message["to"]], msg.as_string())
+                EMAILS.inc(outcome="sent")
+                now = datetime.utcnow()
+                self.collection.update_one({"_id": message["_id"]}, {
+                    "$set": {"status": "sent", "sent_at": now, "error": None, "expires_at": expires_at(now)},
+                    "$unset": {"body": ""},
+                })
+            except Exception as e:
+                log.warning("email send failed", extra={
+                    "to": message["to"], "attempt": message["attempts"], "error": str(e)})
+                self.mark_retry(message, e)
+                # Connection-level failures poison the connection; recipient errors do not
+                if server is not None and not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)):
+                    pool.discard(server)
+                    server = None
+        if server is not None:
+            pool.release(server)
+
+    def mark_retry(self, message, error):
+        """Queue the message again with backoff, or fail it when out of attempts or refused for good."""
+        now = datetime.utcnow()
+        if message["attempts"] >= OUTBOX_MAX_ATTEMPTS or permanent_failure(error):
+            EMAILS.inc(outcome="failed")
+            update = {"$set": {"status": "failed", "error": str(error), "failed_at": now, "expires_at": expires_at(now)},
+                      "$unset": {"body": ""}}
+        else:
+            EMAILS.inc(outcome="retry")
+            update = {"$set": {"status": "queued", "error": str(error),
+                               "next_attempt_at": now + timedelta(seconds=backoff_delay(message["attempts"]))}}
+        self.collection.update_one({"_id": message["_id"]}, update)
+
+    def release_claims(self, messages, error, retry_at):
+        """Put claimed messages that were never tried back in the queue, giving back the attempt the claim took."""
+        if not messages:
+            return 0
+        return self.collection.update_many(
+            {"_id": {"$in": [message["_id"] for message in messages]}, "status": "sending"},
+            {"$set": {"status": "queued", "error": str(error), "next_attempt_at": retry_at}, "$inc": {"attempts": -1}},
+        ).modified_count
+
+    def requeue_stale(self, older_than=timedelta(minutes=5)):
+        """Return messages stuck in "sending" (sender died mid-batch) to the queue."""
+        return self.collection.update_many(
+            {"status": "sending", "claimed_at": {"$lt": datetime.utcnow() - older_than}},
+            {"$set": {"status": "queued", "next_attempt_at": datetime.utcnow()}},
+        ).modified_count
+
+
+# ---------------- Direct Dispatch ----------------
+def permanent_failure(error):
+    """A 5xx refusal of the recipient or message: retrying it will not help."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, (smtplib.SMTPDataError, smtplib.SMTPSenderRefused)) and error.smtp_code >= 500
+
+def send_now(messages, account="default", chunk_size=DISPATCH_CHUNK_SIZE):
+    """Send ``messages`` ({"to", "subject", "body", "kind"}) right away; returns one result per message.
+
+    Everything goes over a single pooled connection, reopened once if the
+    server drops it; after a second drop, or when it cannot connect, the
+    remaining messages are left to the outbox sender. After each chunk the messages are written to the outbox
+    in one insert: delivered ones as "sent", 5xx refusals as "failed" and the
+    rest as "queued" for the outbox sender to retry. A result is
+    {"status", "outbox_id", "error"}.
+    """
+    pool = get_pool(account)
+    outbox = get_outbox()
+    results, server, connect_error, dropped = [], None, None, 0
+    try:
+        for start in range(0, len(messages), chunk_size):
+            documents = []
+            for message in messages[start:start + chunk_size]:
+                error = connect_error
+                if error is None:
+                    try:
+                        if server is None:
+                            server = pool.acquire()
+                        msg = build_message(pool.username, message["to"], message["subject"], message["body"])
+                        with stage("smtp_send"):
+                            server.sendmail(pool.username or "", [message["to"]], msg.as_string())
+                    except Exception as e:
+                        error = e
+                        log.warning("email send failed", extra={"to": message["to"], "error": str(e)})
+                        if server is None:
+                            # Could not connect: the outbox sender takes the rest
+                            connect_error = e
+                        elif not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)):
+                            pool.discard(server)
+                            server = None
+                            dropped += 1
+                            if dropped > 1:
+                                connect_error = e
+                documents.append(dispatch_document(message, account, error))
+            results += record_dispatch(outbox, documents)
+    finally:
+        if server is not None:
+            pool.release(server)
+    if any(result["status"] == "queued" for result in results):
+        _wakeup.set()
+    return results
+
+def dispatch_document(message, account, error):
+    now = datetime.utcnow()
+    document = {"to": message["to"], "subject": message["subject"],
+                "account": account, "kind": message.get("kind"), "attempts": 1, "created_at": now}
+    if error is None:
+        EMAILS.inc(outcome="sent")
+        document.update(status="sent", sent_at=now, error=None, expires_at=expires_at(now))
+    elif permanent_failure(error):
+        EMAILS.inc(outcome="failed")
+        document.update(status="failed", error=str(error), failed_at=now, expires_at=expires_at(now))
+    else:
+        # Only a message left for the sender to retry keeps its body
+        EMAILS.inc(outcome="retry")
+        document.update(status="queued", body=message["body"], error=str(error),
+                        next_attempt_at=now + timedelta(seconds=backoff_delay(1)))
+    return document
+
+def record_dispatch(outbox, documents):
+    try:
+        ids = [str(outbox_id) for outbox_id in outbox.insert_many(documents).inserted_ids]
+    except Exception as e:
+        # Sent mail stays sent; only the retries are lost without the outbox
+        log.error("could not record dispatched emails", extra={"count": len(documents), "error": str(e)})
+        return [{"status": "failed" if document["status"] == "queued" else document["status"],
+                 "outbox_id": None, "error": document["error"]} for document in documents]
+    return [{"status": document["status"], "outbox_id": outbox_id, "error": document["error"]}
+            for document, outbox_id in zip(documents, ids)]
+
+
+def start_outbox_sender():
+    if OUTBOX_MODE != "thread":
+        return None
+    return OutboxSender().start()
@@ -0,0 +1,207 @@
+"""Process-local metrics in the Prometheus text format.
+
+Counters and histograms are registered once at import time and served by
+``GET /metrics``. Label values are passed as keyword arguments::
+
+    LLM_FAILURES.inc(model="gemini-1.5-flash", reason="503")
+    with stage("extract_text"):
+        ...
+
+``stage`` also adds its duration to the current trace (see ``start_trace``),
+so a request or background task can log a per-stage breakdown of where its
+time went. Traces live in a ``ContextVar``, so concurrent requests and
+worker threads each collect their own.
+
+Metrics are kept per process: with several gunicorn workers or
+``worker.py`` processes, scrape each of them (or aggregate in Prometheus).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect, threading, time
+
+# Seconds; covers a Mongo lookup (ms) up to a slow Gemini call (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._series = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(series))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _render_series(self, series):
+        return [f"{self.name}_total{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in series]
+
+
+class Gauge(Metric):
+    """A value set directly, or read from ``func`` at scrape time (unlabelled)."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), func=None):
+        super().__init__(name, documentation, labels)
+        self.func = func
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def _render_series(self, series):
+        if self.func is not None:
+            try:
+                series = [((), self.func())]
+            except Exception:
+                series = []
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in series]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels):
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return {"count": series["count"], "sum": series["sum"]} if series else {"count": 0, "sum": 0.0}
+
+    def _render_series(self, series):
+        lines = []
+        for key, data in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), data["counts"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(data['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {data['count']}")
+        return lines
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------------- Metrics ----------------
+HTTP_REQUEST_SECONDS = Histogram("hr_http_request_seconds", "HTTP request latency", ("method", "endpoint", "status"))
+STAGE_SECONDS = Histogram("hr_stage_seconds", "Time spent in one stage of a request or task", ("stage",))
+TASK_SECONDS = Histogram("hr_task_seconds", "Background task run time", ("kind", "outcome"))
+LLM_SECONDS = Histogram("hr_llm_request_seconds", "Gemini call latency including retries", ("model", "outcome"))
+LLM_TTFT_SECONDS = Histogram("hr_llm_time_to_first_token_seconds", "Time to the first streamed chunk", ("model",))
+LLM_RETRIES = Counter("hr_llm_retries", "Gemini calls retried after a 429/5xx", ("model",))
+LLM_FAILURES = Counter("hr_llm_failures", "Gemini calls that failed after all retries", ("model", "reason"))
+LLM_TOKENS = Counter("hr_llm_tokens", "Tokens reported by Gemini", ("model", "direction"))
+JSON_PARSE_FALLBACKS = Counter(
+    "hr_json_parse_fallbacks", "Model responses that could not be parsed as the expected JSON", ("path", "reason"))
+EMAILS = Counter("hr_emails", "Outbox emails by outcome (queued, sent, retry, failed)", ("outcome",))
+RESUMES = Counter("hr_resumes", "Resume processing outcomes (a deferred resume later counts again)", ("outcome",))
+ANALYSIS_ESCALATIONS = Counter(
+    "hr_analysis_escalations", "Analyses passed on to the next model tier (borderline score or invalid output)",
+    ("path", "reason"))
+ANALYSIS_VALIDATION_FAILURES = Counter(
+    "hr_analysis_validation_failures", "Parsed analysis responses that did not match the response schema",
+    ("path", "model"))
+PROMPT_TOKENS = Counter(
+    "hr_prompt_tokens", "Estimated analysis prompt input tokens before (raw) and after (sent) the budget", ("part", "kind"))
+
+# ---------------- Stage traces ----------------
+_trace = ContextVar("trace", default=None)
+
+def start_trace():
+    """Begin collecting stage durations for the current request or task; returns the token for end_trace."""
+    return _trace.set({})
+
+def end_trace(token):
+    """Stop the trace started with ``token``; returns {stage: milliseconds}."""
+    stages = _trace.get() or {}
+    _trace.reset(token)
+    return {name: round(seconds * 1000, 2) for name, seconds in stages.items()}
+
+def current_trace():
+    return _trace.get()
+
+@contextmanager
+def stage(name):
+    """Time a block into ``hr_stage_seconds`` and the current trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        stages = _trace.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + elapsed
@@ -0,0 +1,72 @@
+"""Keyset (cursor) pagination helpers.
+
+A page is requested with ``?limit=`` and the opaque ``?cursor=`` returned by
+the previous page. The cursor holds the sort value and ``_id`` of the last
+document served, so the next page is an index range scan that costs the
+same no matter how deep into the collection it is (unlike ``skip``).
+"""
+from bson import ObjectId
+from datetime import datetime
+import base64, json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def encode_cursor(value, doc_id):
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps({"v": value, "id": str(doc_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Return (value, ObjectId) from a cursor string; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = data["v"]
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return value, ObjectId(data["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def keyset_filter(field, cursor, descending=True):
+    """Mongo filter selecting documents strictly after the cursor in (field, _id) order."""
+    if not cursor:
+        return {}
+    value, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [{field: {op: value}}, {field: value, "_id": {op: doc_id}}]}
+
+def keyset_sort(field, descending=True):
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+def fetch_page(collection, query, field, limit, cursor=None, projection=None, descending=True):
+    """Run one keyset page; returns (documents, next_cursor or None)."""
+    cursor_filter = keyset_filter(field, cursor, descending)
+    if cursor_filter:
+        query = {"$and": [query, cursor_filter]} if query else cursor_filter
+    docs = list(collection.find(query, projection).sort(keyset_sort(field, descending)).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(field), last["_id"])
+    return docs, next_cursor
+
+def parse_fields(value, allowed=None):
+    """Projection from a comma-separated ``?fields=`` value, or None when absent."""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    if allowed is not None:
+        fields = [field for field in fields if field in allowed]
+    return {field: 1 for field in fields} or None
@@ -0,0 +1,172 @@
+"""Local pre-screening of resumes against a job, before any LLM call.
+
+The score (0-1) blends two signals:
+
+* skill coverage - the share of the job's ``skills`` found in the resume;
+* term similarity - cosine between sublinear term-frequency vectors of the
+  resume and of the job description plus skills.
+
+Resumes are turned into sparse hashed unigram/bigram counts once, at upload
+time, and stored on the applicant as ``prescreen_features``. Scoring a whole
+pool is then a single NumPy gather + ``reduceat`` over the concatenated
+features, with no per-token Python work. The score only depends on the job
+and the resume, so a value computed for one upload is directly comparable
+with one computed while re-ranking a pool.
+"""
+from bson.binary import Binary
+from dotenv import load_dotenv
+import numpy as np
+import os, re, threading, zlib
+
+load_dotenv()
+
+# Jobs without their own prescreen_cutoff use this; 0 disables skipping
+PRESCREEN_DEFAULT_CUTOFF = float(os.getenv("PRESCREEN_DEFAULT_CUTOFF", "0"))
+# "skip" stores the pre-screen result without calling Gemini, "defer" queues
+# the analysis at low priority instead
+PRESCREEN_DEFAULT_ACTION = os.getenv("PRESCREEN_DEFAULT_ACTION", "skip").lower()
+PRESCREEN_ACTIONS = ("skip", "defer")
+# Skipped resumes get no fit score; when true they still get the rejection email
+PRESCREEN_REJECTION_EMAIL = os.getenv("PRESCREEN_REJECTION_EMAIL", "false").lower() == "true"
+SKILL_WEIGHT = 0.6
+FEATURE_BITS = 20
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have in into is it its of on or our
+such that the their they this to was we were will with you your who what which while
+job role position team work working company candidate candidates required requirements
+responsibilities responsible summary including ability strong experience years year
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+def term_ids(tokens):
+    """Hashed feature ids of the unigrams and bigrams of a token list."""
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(term.encode("utf-8")) & FEATURE_MASK for term in terms]
+
+def featurize(text):
+    """Sparse hashed counts of a text as (sorted uint32 ids, uint16 counts)."""
+    ids = np.array(term_ids(tokenize(text)), dtype=np.uint32)
+    ids, counts = np.unique(ids, return_counts=True)
+    return ids, np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16)
+
+def encode_features(ids, counts):
+    """Features in the form stored on applicant documents as ``prescreen_features``."""
+    return {"ids": Binary(ids.tobytes()), "counts": Binary(counts.tobytes())}
+
+def decode_features(stored):
+    return (np.frombuffer(stored["ids"], dtype=np.uint32),
+            np.frombuffer(stored["counts"], dtype=np.uint16))
+
+def parse_skills(skills):
+    if isinstance(skills, str):
+        skills = re.split(r"[,;\n|/]", skills)
+    return [skill.strip() for skill in skills or [] if skill and skill.strip()]
+
+
+class JobScorer:
+    def __init__(self, description, skills):
+        skill_terms = []
+        for skill in dict.fromkeys(s.lower() for s in parse_skills(skills)):
+            tokens = tokenize(skill)
+            if tokens:
+                # A multi-word skill is present when all of its bigrams are
+                skill_terms.append(term_ids(tokens)[len(tokens):] if len(tokens) > 1 else term_ids(tokens))
+        self.skill_count = len(skill_terms)
+
+        skill_text = " ".join(" ".join(tokenize(s)) for s in parse_skills(skills))
+        ids, counts = featurize(f"{description} {skill_text}")
+        weights = np.log1p(counts.astype(np.float32))
+        norm = np.linalg.norm(weights)
+        self.job_ids = ids
+        self.job_weights = weights / norm if norm else weights
+
+        # Every distinct skill feature id, and for each skill which of them it needs
+        self.skill_ids = np.unique(np.array([i for terms in skill_terms for i in terms], dtype=np.uint32))
+        self.skill_requirements = np.zeros((len(self.skill_ids), self.skill_count), dtype=np.float32)
+        for column, terms in enumerate(skill_terms):
+            for term in set(terms):
+                self.skill_requirements[np.searchsorted(self.skill_ids, term), column] = 1
+        self.skill_needed = self.skill_requirements.sum(axis=0)
+
+    def score_features(self, features):
+        """Pre-screen scores in [0, 1] for a list of (ids, counts) pairs."""
+        docs = len(features)
+        if docs == 0:
+            return np.zeros(0, dtype=np.float32)
+        lengths = np.array([len(ids) for ids, _ in features], dtype=np.int64)
+        if lengths.sum() == 0:
+            return np.zeros(docs, dtype=np.float32)
+        all_ids = np.concatenate([ids for ids, _ in features])
+        all_values = np.log1p(np.concatenate([counts for _, counts in features]).astype(np.float32))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        nonempty = lengths > 0
+        doc_of = np.repeat(np.arange(docs), lengths)
+
+        def per_doc(values):
+            totals = np.zeros(docs, dtype=np.float32)
+            totals[nonempty] = np.add.reduceat(values, starts[nonempty])
+            return totals
+
+        # ----- cosine against the job vector -----
+        weight = np.zeros(len(all_ids), dtype=np.float32)
+        if len(self.job_ids):
+            pos = np.minimum(np.searchsorted(self.job_ids, all_ids), len(self.job_ids) - 1)
+            hit = self.job_ids[pos] == all_ids
+            weight[hit] = self.job_weights[pos[hit]]
+        norms = np.sqrt(per_doc(all_values * all_values))
+        norms[norms == 0] = 1.0
+        similarity = per_doc(all_values * weight) / norms
+
+        if not self.skill_count:
+            return np.clip(similarity, 0, 1)
+
+        # ----- skill coverage -----
+        present = np.zeros((docs, len(self.skill_ids)), dtype=np.float32)
+        pos = np.minimum(np.searchsorted(self.skill_ids, all_ids), len(self.skill_ids) - 1)
+        hit = self.skill_ids[pos] == all_ids
+        present[doc_of[hit], pos[hit]] = 1
+        matched = (present @ self.skill_requirements) >= self.skill_needed
+        coverage = matched.mean(axis=1)
+        return np.clip(SKILL_WEIGHT * coverage + (1 - SKILL_WEIGHT) * similarity, 0, 1)
+
+    def score(self, resume_texts):
+        return self.score_features([featurize(text) for text in resume_texts])
+
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+_SCORER_CACHE_SIZE = 256
+
+def get_scorer(job):
+    """Scorer for a job document, cached on its id, description and skills."""
+    key = (str(job.get("_id", "")), job.get("description", ""), str(job.get("skills", "")))
+    with _scorers_lock:
+        scorer = _scorers.get(key)
+    if scorer is None:
+        # Built outside the lock; if two threads race, both keep the first one stored
+        scorer = JobScorer(job.get("description", ""), job.get("skills", ""))
+        with _scorers_lock:
+            if key not in _scorers and len(_scorers) >= _SCORER_CACHE_SIZE:
+                _scorers.pop(next(iter(_scorers)))
+            scorer = _scorers.setdefault(key, scorer)
+    return scorer
+
+def prescreen_scores(resume_texts, job):
+    """Return (scores, stored_features) for a list of resumes."""
+    features = [featurize(text) for text in resume_texts]
+    scores = get_scorer(job).score_features(features)
+    return [round(float(score), 4) for score in scores], [encode_features(*f) for f in features]
+
+def prescreen_policy(job):
+    """Return (cutoff, action) configured for a job."""
+    cutoff = job.get("prescreen_cutoff")
+    cutoff = PRESCREEN_DEFAULT_CUTOFF if cutoff is None else float(cutoff)
+    action = job.get("prescreen_action") or PRESCREEN_DEFAULT_ACTION
+    return cutoff, action
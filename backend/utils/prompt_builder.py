@@ -0,0 +1,224 @@
+"""Token-budgeted inputs for the resume analysis prompt.
+
+A resume goes through four steps before it is put in front of Gemini:
+
+1. whitespace is normalized: runs of spaces collapsed, bullet glyphs unified,
+   blank lines squeezed;
+2. boilerplate is dropped: long lines repeated in the document (page headers
+   and footers extracted once per page), page numbers and stock lines such as
+   "References available upon request";
+3. the text is split into sections at their headings (experience, skills,
+   education, projects, ...; the lines before the first heading are the
+   ``header`` with the name and contact details);
+4. sections are fitted into ``RESUME_TOKEN_BUDGET``: every section first gets
+   up to ``PROMPT_SECTION_FLOOR`` of the budget, then the rest goes out in
+   ``PROMPT_SECTION_PRIORITY`` order. A section that does not fit is cut at a
+   line boundary (its first lines, usually the most recent roles, are kept)
+   and the sections stay in document order.
+
+Job descriptions get the same treatment against ``JD_TOKEN_BUDGET``, with
+requirements and responsibilities first and company blurbs, benefits and
+equal-opportunity statements last. Every resume of a job shares the
+condensed description, so it is cached in-process by content hash.
+
+Token counts are ``estimate_tokens`` estimates. Text that already fits its
+budget is only normalized; a budget of 0 turns the cut off.
+"""
+from utils.analysis_cache import LRUCache
+from utils.llm import estimate_tokens
+from dotenv import load_dotenv
+import hashlib, os, re
+
+load_dotenv()
+
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))  # 0 = no limit
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "800"))            # 0 = no limit
+PROMPT_SECTION_PRIORITY = [name.strip() for name in os.getenv(
+    "PROMPT_SECTION_PRIORITY", "header,skills,experience,education,projects,summary,certifications,other"
+).split(",") if name.strip()]
+JD_SECTION_PRIORITY = ["header", "requirements", "responsibilities", "summary", "preferred", "other", "about", "benefits"]
+# Share of the budget each section is guaranteed before the rest is handed out by priority
+PROMPT_SECTION_FLOOR = float(os.getenv("PROMPT_SECTION_FLOOR", "0.1"))
+JD_CACHE_SIZE = int(os.getenv("JD_CACHE_SIZE", "256"))
+JD_CACHE_TTL = 3600
+
+# Changes whenever the budgets do, so cached analyses of differently cut prompts are not mixed up
+BUDGET_SIGNATURE = f"r{RESUME_TOKEN_BUDGET}-j{JD_TOKEN_BUDGET}-f{PROMPT_SECTION_FLOOR}-{'.'.join(PROMPT_SECTION_PRIORITY)}"
+
+RESUME_SECTIONS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective", "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "career history", "relevant experience"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "competencies", "technologies", "tech stack"),
+    "education": ("education", "academic background", "academics", "education and training"),
+    "projects": ("projects", "personal projects", "key projects", "selected projects", "academic projects"),
+    "certifications": ("certifications", "certificates", "licenses", "courses", "training"),
+    "other": ("awards", "achievements", "publications", "languages", "interests", "hobbies", "volunteering",
+              "volunteer experience", "references", "activities", "extracurricular activities"),
+}
+JD_SECTIONS = {
+    "summary": ("job summary", "summary", "overview", "about the role", "the role", "position summary", "job description"),
+    "responsibilities": ("responsibilities", "key responsibilities", "what you will do", "what you'll do", "duties", "your role"),
+    "requirements": ("requirements", "qualifications", "required skills", "required qualifications", "skills",
+                     "must have", "what you bring", "who you are", "experience"),
+    "preferred": ("preferred qualifications", "preferred skills", "nice to have", "nice-to-have", "bonus points", "preferred"),
+    "about": ("about us", "about the company", "who we are", "our company", "company overview"),
+    "benefits": ("benefits", "perks", "what we offer", "compensation", "why join us"),
+}
+
+BOILERPLATE_RE = re.compile(
+    r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|-?\s*\d{1,3}\s*-?|curriculum vitae|cv|r[eé]sum[eé]"
+    r"|references? (?:are )?(?:available )?(?:up)?on request\.?|confidential"
+    r"|.*\bequal opportunity employer\b.*|.*\bwithout regard to (?:race|age|gender)\b.*"
+    r"|i hereby declare\b.*)$",
+    re.IGNORECASE,
+)
+# Lines at least this long are dropped when they repeat (page headers/footers, pasted bullets)
+MIN_DUPLICATE_CHARS = 12
+TRUNCATION_MARK = " [...]"
+
+
+def _heading_pattern(table):
+    aliases = sorted(((alias, name) for name, names in table.items() for alias in names), key=lambda item: -len(item[0]))
+    lookup = {alias: name for alias, name in aliases}
+    # A heading is a line of its own ("SKILLS") or a label followed by a colon ("Skills: Python, SQL")
+    pattern = re.compile(
+        r"^[#*\-\s]*(" + "|".join(re.escape(alias) for alias, _ in aliases) + r")\s*(?::\s*(.*)|\s*)$",
+        re.IGNORECASE,
+    )
+    return pattern, lookup
+
+RESUME_HEADINGS = _heading_pattern(RESUME_SECTIONS)
+JD_HEADINGS = _heading_pattern(JD_SECTIONS)
+
+# ---------------- Cleanup ----------------
+def normalize(text):
+    """Lines of ``text`` with whitespace collapsed and runs of blank lines squeezed to one."""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[•▪●◦‣⁃]", "-", text)
+    text = re.sub(r"[^\S\n]+", " ", text)
+    lines, blank = [], False
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            if lines and not blank:
+                lines.append("")
+            blank = True
+            continue
+        lines.append(line)
+        blank = False
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+def drop_boilerplate(lines):
+    """Remove stock phrases, page numbers and repeated lines; returns (lines, dropped count)."""
+    kept, seen, dropped = [], set(), 0
+    for line in lines:
+        if line:
+            key = line.lower()
+            if BOILERPLATE_RE.match(line) or (len(line) >= MIN_DUPLICATE_CHARS and key in seen):
+                dropped += 1
+                continue
+            seen.add(key)
+        kept.append(line)
+    return kept, dropped
+
+# ---------------- Sections ----------------
+def split_sections(lines, headings=RESUME_HEADINGS):
+    """[(name, lines)] in document order; each section's lines start with its heading."""
+    pattern, lookup = headings
+    sections = [("header", [])]
+    for line in lines:
+        match = pattern.match(line) if line else None
+        if match:
+            sections.append((lookup[match.group(1).lower()], [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, section_lines) for name, section_lines in sections if any(section_lines)]
+
+def _tokens(lines):
+    return estimate_tokens("\n".join(lines))
+
+def cut_lines(lines, budget):
+    """The leading lines of a section that fit ``budget`` tokens; the last one may be cut at a word."""
+    if _tokens(lines) <= budget:
+        return lines
+    kept, chars = [], budget * 4 - len(TRUNCATION_MARK)
+    for line in lines:
+        if len(line) + 1 <= chars:
+            kept.append(line)
+            chars -= len(line) + 1
+            continue
+        if chars >= 40:
+            kept.append(line[:chars].rsplit(" ", 1)[0] + TRUNCATION_MARK)
+        elif kept:
+            kept[-1] += TRUNCATION_MARK
+        break
+    return kept
+
+def allocate(costs, names, budget, priority, floor=PROMPT_SECTION_FLOOR):
+    """Tokens granted to each section: a floor for all of them, then the rest by priority."""
+    rank = {name: index for index, name in enumerate(priority)}
+    order = sorted(range(len(costs)), key=lambda i: (rank.get(names[i], len(priority)), i))
+    grants, left = [0] * len(costs), budget
+    for i in order:
+        grants[i] = min(costs[i], int(budget * floor), left)
+        left -= grants[i]
+    for i in order:
+        extra = min(costs[i] - grants[i], left)
+        grants[i] += extra
+        left -= extra
+    return grants
+
+def fit_to_budget(text, budget, headings=RESUME_HEADINGS, priority=PROMPT_SECTION_PRIORITY):
+    """Condense ``text`` into ``budget`` tokens.
+
+    Returns {"text", "raw_tokens", "tokens", "boilerplate_lines", "sections",
+    "truncated", "dropped"}; ``sections`` names the sections found, in order.
+    """
+    raw_tokens = estimate_tokens(text or "")
+    lines, boilerplate = drop_boilerplate(normalize(text))
+    sections = split_sections(lines, headings)
+    truncated, dropped = [], []
+    if budget and _tokens(lines) > budget:
+        # Each joined section costs one newline more than on its own
+        costs = [_tokens(section_lines) + 1 for _, section_lines in sections]
+        grants = allocate(costs, [name for name, _ in sections], budget, priority)
+        fitted = []
+        for (name, section_lines), cost, grant in zip(sections, costs, grants):
+            kept = cut_lines(section_lines, grant - 1) if grant > 1 else []
+            if not kept:
+                dropped.append(name)
+                continue
+            if grant < cost:
+                truncated.append(name)
+            fitted.append((name, kept))
+        sections = fitted
+    condensed = "\n".join(line for _, section_lines in sections for line in section_lines)
+    return {
+        "text": condensed,
+        "raw_tokens": raw_tokens,
+        "tokens": estimate_tokens(condensed),
+        "boilerplate_lines": boilerplate,
+        "sections": [name for name, _ in sections],
+        "truncated": truncated,
+        "dropped": dropped,
+    }
+
+# ---------------- Prompt Inputs ----------------
+def condense_resume(resume_text, budget=None):
+    """The resume as it goes into the analysis prompt (see ``fit_to_budget``)."""
+    return fit_to_budget(resume_text, RESUME_TOKEN_BUDGET if budget is None else budget)
+
+_jd_cache = LRUCache(max_size=JD_CACHE_SIZE, ttl=JD_CACHE_TTL)
+
+def condense_job_description(job_desc, budget=None):
+    """The job description as it goes into the analysis prompt, cached per text and budget."""
+    budget = JD_TOKEN_BUDGET if budget is None else budget
+    key = hashlib.sha256(f"{budget}\0{job_desc or ''}".encode("utf-8")).hexdigest()
+    condensed = _jd_cache.get(key)
+    if condensed is None:
+        condensed = fit_to_budget(job_desc, budget, JD_HEADINGS, JD_SECTION_PRIORITY)
+        _jd_cache.set(key, condensed)
+    return condensed
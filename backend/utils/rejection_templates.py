@@ -0,0 +1,180 @@
+"""Rejection emails rendered from templates instead of one LLM call per candidate.
+
+Modes (``REJECTION_EMAIL_MODE``, overridable per job with ``rejection_email_mode``):
+
+* ``template``  - one of the built-in templates below, rendered locally (default);
+* ``generated`` - Gemini writes one template per job and company, which is cached
+  in the ``email_templates`` collection and rendered for every candidate;
+* ``llm``       - a fresh Gemini-written email for each candidate (the original
+  behaviour, one extra model call per rejection).
+
+Templates are ``string.Template`` bodies using ``$candidate_name``,
+``$job_title``, ``$company_name`` and ``$score``.
+"""
+from string import Template
+from datetime import datetime
+from dotenv import load_dotenv
+from utils.log import get_logger
+import os, re, threading, zlib
+
+load_dotenv()
+log = get_logger("rejection_templates")
+
+REJECTION_EMAIL_MODE = os.getenv("REJECTION_EMAIL_MODE", "template").lower()
+REJECTION_EMAIL_MODES = ("template", "generated", "llm")
+# Bump when the generation prompt changes so cached templates are regenerated
+TEMPLATE_PROMPT_VERSION = 1
+PLACEHOLDERS = ("candidate_name", "job_title", "company_name", "score")
+
+DEFAULT_TEMPLATES = [
+    Template("""Dear $candidate_name,
+
+Thank you for your interest in the $job_title position at $company_name and for the time you put into your application.
+
+After reviewing your profile, we have decided not to move forward with your application at this time. Your initial screening score was $score, and we received applications that more closely match the requirements of this role.
+
+We encourage you to keep an eye on our openings and to apply again for positions that fit your experience. We wish you every success in your job search.
+
+Best regards,
+$company_name Recruitment Team"""),
+    Template("""Dear $candidate_name,
+
+We appreciate you applying for the $job_title role at $company_name.
+
+We have carefully reviewed your application, and unfortunately we will not be progressing it to the next stage. In our initial screening your profile scored $score against the requirements of this position.
+
+This decision was not easy, and it does not reflect on your potential. We would be glad to see your application for future roles that match your skills.
+
+Kind regards,
+$company_name Hiring Team"""),
+    Template("""Hello $candidate_name,
+
+Thank you for applying for the $job_title position at $company_name.
+
+After an initial screening, in which your application scored $score, we have decided to continue with other candidates whose experience aligns more closely with this role.
+
+We are grateful for your interest in $company_name and hope you will consider applying for other openings with us in the future. Best of luck with your next steps.
+
+Warm regards,
+$company_name Talent Acquisition"""),
+]
+
+
+def rejection_subject(job_title, company_name):
+    return f"Application Update for {job_title} at {company_name}"
+
+def template_values(candidate_name, job_title, company_name, fit_score):
+    return {
+        "candidate_name": candidate_name or "Candidate",
+        "job_title": job_title,
+        "company_name": company_name,
+        "score": f"{fit_score * 100:.2f}%",
+    }
+
+def pick_default_template(candidate_email):
+    # Stable per candidate, so a re-sent email reads the same
+    return DEFAULT_TEMPLATES[zlib.crc32((candidate_email or "").encode("utf-8")) % len(DEFAULT_TEMPLATES)]
+
+def valid_template(body):
+    """A generated template must address the candidate and use only known placeholders."""
+    used = set(re.findall(r"\$\{?([_a-zA-Z][_a-zA-Z0-9]*)", body))
+    return "candidate_name" in used and used <= set(PLACEHOLDERS)
+
+# ---------------- LLM-written templates ----------------
+_generated = {}
+_generated_lock = threading.Lock()
+
+def get_template_collection():
+    from utils.db import lazy_collection
+    return lazy_collection("email_templates")
+
+def template_id(job, company_name):
+    return f"rejection:{job.get('_id', '')}:{company_name}:v{TEMPLATE_PROMPT_VERSION}"
+
+def build_template_prompt(job_title, company_name):
+    return f"""
+Write ONE professional, polite, and encouraging rejection email template for candidates
+who applied for the {job_title} position at {company_name}.
+Use these placeholders exactly as written: $candidate_name, $job_title, $company_name and
+$score (the candidate's initial screening score, e.g. 72.50%).
+Do NOT use any other $ placeholders, brackets or blanks to fill in.
+Do NOT include any extra commentary or mention AI generation.
+Return ONLY the email body text.
+"""
+
+def get_generated_template(job, company_name):
+    """Template written by Gemini once per job and company; None if it cannot be produced."""
+    from utils.llm import generate_text, EMAIL_MODEL
+
+    key = template_id(job, company_name)
+    template = _generated.get(key)
+    if template is not None:
+        return template
+
+    with _generated_lock:
+        template = _generated.get(key)
+        if template is not None:
+            return template
+        collection = get_template_collection()
+        stored = collection.find_one({"_id": key})
+        if stored:
+            body = stored["body"]
+        else:
+            try:
+                body = generate_text(EMAIL_MODEL, build_template_prompt(job.get("title", "the position"), company_name))
+                body = re.sub(r"^(Of course.*?(email|template)\.?)\s*", "", body, flags=re.IGNORECASE)
+            except Exception as e:
+                log.error("rejection template generation failed", extra={"template": key, "error": str(e)})
+                return None
+            if not valid_template(body):
+                log.warning("generated template has unexpected placeholders, using built-in templates", extra={"template": key})
+                return None
+            collection.update_one({"_id": key}, {"$set": {
+                "body": body,
+                "job_id": str(job.get("_id", "")),
+                "company_name": company_name,
+                "created_at": datetime.utcnow(),
+            }}, upsert=True)
+        template = _generated[key] = Template(body)
+        return template
+
+def clear_generated_templates(job_id):
+    """Drop the cached LLM-written templates of a job (memory and Mongo)."""
+    prefix = f"rejection:{job_id}:"
+    with _generated_lock:
+        for key in [key for key in _generated if key.startswith(prefix)]:
+            del _generated[key]
+    return get_template_collection().delete_many({"job_id": str(job_id)}).deleted_count
+
+# ---------------- Per-candidate LLM emails ----------------
+def llm_rejection_email(candidate_name, job_title, company_name, fit_score):
+    from utils.llm import generate_text, EMAIL_MODEL
+
+    email_msg = f"""
+Generate ONLY a professional, polite, and encouraging rejection email for {candidate_name}
+who applied for the {job_title} position at {company_name}.
+Mention that they scored {fit_score*100:.2f}% in the initial screening.
+Do NOT include any extra commentary or mention AI generation.
+Return ONLY the email text.
+"""
+    polite_reply = generate_text(EMAIL_MODEL, email_msg)
+    return re.sub(r"^(Of course.*?email\.?)\s*", "", polite_reply, flags=re.IGNORECASE)
+
+# ---------------- Rendering ----------------
+def rejection_mode(job):
+    mode = (job.get("rejection_email_mode") or REJECTION_EMAIL_MODE).lower()
+    return mode if mode in REJECTION_EMAIL_MODES else "template"
+
+def render_rejection_email(job, company_name, candidate_name, candidate_email, fit_score):
+    """Return (subject, body) of the rejection email for one candidate."""
+    job_title = job.get("title", "the position")
+    subject = rejection_subject(job_title, company_name)
+    mode = rejection_mode(job)
+
+    if mode == "llm":
+        return subject, llm_rejection_email(candidate_name, job_title, company_name, fit_score)
+
+    template = get_generated_template(job, company_name) if mode == "generated" else None
+    if template is None:
+        template = pick_default_template(candidate_email)
+    return subject, template.safe_substitute(template_values(candidate_name, job_title, company_name, fit_score))
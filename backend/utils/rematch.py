@@ -0,0 +1,285 @@
+"""Re-match the stored applicant pool against a job.
+
+A new job only sees the resumes uploaded for it. A re-match run scores every
+usable applicant of the *other* jobs against it and keeps the best ones as
+``job_matches``:
+
+1. ``scoring``   - applicants are read in ``_id`` order, ``REMATCH_CHUNK_SIZE``
+   at a time, and ranked with the local pre-screen scorer (stored
+   ``prescreen_features``, no LLM). Only the best ``REMATCH_KEEP`` survive,
+   one per distinct resume text.
+2. ``analyzing`` - the top ``REMATCH_ANALYZE_TOP`` of those get the full Gemini
+   analysis, a few resumes per task.
+
+Every chunk is its own background task. The run document in ``rematch_runs``
+holds the cursor, the current shortlist and a ``step`` counter, so a run
+continues from its last finished chunk after a restart or a failure, and a
+task delivered twice only counts once.
+"""
+from utils.db import db
+from utils.task_queue import task_handler, enqueue, PRIORITY_LOW, TASK_QUEUE_BACKEND
+from utils.prescreen import featurize, encode_features, decode_features, get_scorer
+from utils.resume_pipeline import analyze_resumes_batch, BATCH_SCORING_MAX_RESUMES
+from utils.blob_store import resume_texts, TEXT_FIELDS, HAS_RESUME_TEXT
+from pymongo import UpdateOne
+from datetime import datetime
+from bson import ObjectId
+from utils.log import get_logger
+from dotenv import load_dotenv
+import numpy as np
+import os
+
+load_dotenv()
+log = get_logger("rematch")
+
+REMATCH_ON_CREATE = os.getenv("REMATCH_ON_CREATE", "true").lower() == "true"
+REMATCH_CHUNK_SIZE = int(os.getenv("REMATCH_CHUNK_SIZE", "2000"))
+# Shortlist kept from the scoring stage (and stored as job_matches)
+REMATCH_KEEP = int(os.getenv("REMATCH_KEEP", "200"))
+# How many of the shortlist get a Gemini analysis
+REMATCH_ANALYZE_TOP = int(os.getenv("REMATCH_ANALYZE_TOP", "20"))
+REMATCH_ANALYZE_CHUNK = int(os.getenv("REMATCH_ANALYZE_CHUNK", str(BATCH_SCORING_MAX_RESUMES)))
+
+# Applicants in these states are not offered as matches
+IGNORED_STATUSES = ["failed", "duplicate"]
+ACTIVE = "running"
+
+
+# ---------------- Runs ----------------
+def run_response(run):
+    if not run:
+        return None
+    return {
+        "run_id": str(run["_id"]),
+        "job_id": run["job_id"],
+        "status": run["status"],
+        "stage": run["stage"],
+        "scanned": run.get("scanned", 0),
+        "shortlisted": len(run.get("top", [])),
+        "analyzed": run.get("analyzed", 0),
+        "to_analyze": min(REMATCH_ANALYZE_TOP, len(run.get("top", []))),
+        "error": run.get("error"),
+        "created_at": run.get("created_at"),
+        "updated_at": run.get("updated_at"),
+        "finished_at": run.get("finished_at"),
+    }
+
+def latest_run(job_id):
+    return db.rematch_runs.find_one({"job_id": job_id}, sort=[("created_at", -1), ("_id", -1)])
+
+def enqueue_step(run):
+    enqueue("rematch_step", {"run_id": str(run["_id"]), "step": run.get("step", 0)}, priority=PRIORITY_LOW)
+
+def start_rematch(job_id, restart=False):
+    """Start a re-match run for a job, or return the one already running.
+
+    A failed run is resumed from its last finished chunk unless ``restart``.
+    Returns the run document.
+    """
+    run = latest_run(job_id)
+    if run and not restart:
+        if run["status"] == ACTIVE:
+            return run
+        if run["status"] == "failed":
+            db.rematch_runs.update_one({"_id": run["_id"]}, {
+                "$set": {"status": ACTIVE, "updated_at": datetime.utcnow()}, "$unset": {"error": ""},
+            })
+            run["status"] = ACTIVE
+            run.pop("error", None)
+            enqueue_step(run)
+            return run
+    if run and run["status"] == ACTIVE:
+        # Outstanding tasks of the old run are dropped by the status check in process_rematch_step
+        db.rematch_runs.update_one({"_id": run["_id"]}, {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}})
+
+    now = datetime.utcnow()
+    run = {
+        "job_id": job_id,
+        "status": ACTIVE,
+        "stage": "scoring",
+        "step": 0,
+        "last_id": None,
+        "scanned": 0,
+        "top": [],
+        "analyzed": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    run["_id"] = db.rematch_runs.insert_one(run).inserted_id
+    enqueue_step(run)
+    return run
+
+def resume_rematch_runs():
+    """Re-enqueue unfinished runs after a restart; the in-memory queue loses its tasks."""
+    if TASK_QUEUE_BACKEND == "mongo":
+        return 0  # tasks survive in the tasks collection
+    resumed = 0
+    for run in db.rematch_runs.find({"status": ACTIVE}, {"step": 1}):
+        enqueue_step(run)
+        resumed += 1
+    if resumed:
+        log.info("resumed re-match runs", extra={"count": resumed})
+    return resumed
+
+def advance(run, fields, extra=None):
+    """Save a finished step; False if another delivery of the same step got there first."""
+    update = {"$set": {**fields, "step": run["step"] + 1, "updated_at": datetime.utcnow()}}
+    if extra:
+        update.update(extra)
+    result = db.rematch_runs.update_one({"_id": run["_id"], "step": run["step"], "status": ACTIVE}, update)
+    return result.modified_count == 1
+
+# ---------------- Scoring stage ----------------
+def pool_query(job_id, last_id):
+    query = {"job_id": {"$ne": job_id}, "status": {"$nin": IGNORED_STATUSES}, **HAS_RESUME_TEXT}
+    if last_id is not None:
+        query["_id"] = {"$gt": last_id}
+    return query
+
+def load_features(chunk):
+    """Stored pre-screen features of a chunk, computing (and saving) any that are missing."""
+    missing = [applicant["_id"] for applicant in chunk if "prescreen_features" not in applicant]
+    backfill = {}
+    if missing:
+        texts = resume_texts(db.applicants.find({"_id": {"$in": missing}}, TEXT_FIELDS))
+        backfill = {applicant_id: featurize(text) for applicant_id, text in texts.items()}
+        db.applicants.bulk_write([
+            UpdateOne({"_id": applicant_id}, {"$set": {"prescreen_features": encode_features(*features)}})
+            for applicant_id, features in backfill.items()
+        ], ordered=False)
+    return [backfill.get(a["_id"]) or decode_features(a["prescreen_features"]) for a in chunk]
+
+def merge_top(top, chunk, scores, keep=REMATCH_KEEP):
+    """Best ``keep`` entries of the shortlist plus a scored chunk, one per resume text."""
+    floor = top[-1]["score"] if len(top) >= keep else -1.0
+    # Only chunk entries that can still make the shortlist are turned into dicts
+    candidates = np.flatnonzero(scores > floor)
+    if len(candidates) > keep:
+        candidates = candidates[np.argpartition(scores[candidates], -keep)[-keep:]]
+
+    best = {entry["key"]: entry for entry in top}
+    for i in candidates:
+        applicant = chunk[i]
+        entry = {
+            "applicant_id": applicant["_id"],
+            "source_job_id": applicant.get("job_id"),
+            "score": round(float(scores[i]), 4),
+            # The same resume uploaded for several jobs is matched once
+            "key": applicant.get("content_hash") or str(applicant["_id"]),
+        }
+        current = best.get(entry["key"])
+        if current is None or entry["score"] > current["score"]:
+            best[entry["key"]] = entry
+    return sorted(best.values(), key=lambda entry: (-entry["score"], entry["applicant_id"]))[:keep]
+
+def store_shortlist(run, job_id, top):
+    """Replace the job's matches with the scoring stage's shortlist."""
+    now = datetime.utcnow()
+    applicants = {doc["_id"]: doc for doc in db.applicants.find(
+        {"_id": {"$in": [entry["applicant_id"] for entry in top]}},
+        {"candidate_name": 1, "candidate_email": 1, "filename": 1},
+    )}
+    operations = []
+    for rank, entry in enumerate(top, start=1):
+        applicant = applicants.get(entry["applicant_id"], {})
+        operations.append(UpdateOne({"job_id": job_id, "applicant_id": str(entry["applicant_id"])}, {
+            "$set": {
+                "run_id": run["_id"],
+                "source_job_id": entry["source_job_id"],
+                "candidate_name": applicant.get("candidate_name", ""),
+                "candidate_email": applicant.get("candidate_email", ""),
+                "filename": applicant.get("filename", ""),
+                "prescreen_score": entry["score"],
+                "prescreen_rank": rank,
+                "updated_at": now,
+            },
+            "$setOnInsert": {"analyzed": False},
+        }, upsert=True))
+    if operations:
+        db.job_matches.bulk_write(operations, ordered=False)
+    db.job_matches.delete_many({"job_id": job_id, "run_id": {"$ne": run["_id"]}})
+
+def score_chunk(run, job):
+    chunk = list(db.applicants.find(
+        pool_query(run["job_id"], run.get("last_id")),
+        {"prescreen_features": 1, "content_hash": 1, "job_id": 1},
+    ).sort("_id", 1).limit(REMATCH_CHUNK_SIZE))
+
+    top = run.get("top", [])
+    if chunk:
+        scores = get_scorer(job).score_features(load_features(chunk))
+        top = merge_top(top, chunk, scores)
+
+    fields = {"top": top}
+    if len(chunk) < REMATCH_CHUNK_SIZE:
+        store_shortlist(run, run["job_id"], top)
+        fields["stage"] = "analyzing"
+        if not top or REMATCH_ANALYZE_TOP <= 0:
+            fields.update({"status": "completed", "finished_at": datetime.utcnow()})
+    else:
+        fields["last_id"] = chunk[-1]["_id"]
+    return advance(run, fields, {"$inc": {"scanned": len(chunk)}}), fields.get("status", ACTIVE)
+
+# ---------------- Analysis stage ----------------
+def analyze_chunk(run, job):
+    top = run.get("top", [])
+    to_analyze = min(REMATCH_ANALYZE_TOP, len(top))
+    start = run.get("analyzed", 0)
+    entries = top[start:min(start + REMATCH_ANALYZE_CHUNK, to_analyze)]
+
+    # Fetched from the blob store for just the few applicants being analyzed
+    texts = resume_texts(db.applicants.find(
+        {"_id": {"$in": [entry["applicant_id"] for entry in entries]}}, TEXT_FIELDS
+    ))
+    entries = [entry for entry in entries if entry["applicant_id"] in texts]
+    results = analyze_resumes_batch([texts[entry["applicant_id"]] for entry in entries], job.get("description", ""))
+
+    now = datetime.utcnow()
+    operations = []
+    for entry, analysis_result in zip(entries, results):
+        fields = {
+            "analyzed": True,
+            "fit_score": analysis_result["fit_score"],
+            "summary": analysis_result["summary"],
+            "skills": analysis_result.get("skills", []),
+            "weak_areas": analysis_result.get("weak_areas", []),
+            "recommendations": analysis_result.get("recommendations", []),
+            "analyzed_at": now,
+            "updated_at": now,
+        }
+        for key in ("candidate_name", "candidate_email"):
+            if analysis_result.get(key):
+                fields[key] = analysis_result[key]
+        operations.append(UpdateOne({"job_id": run["job_id"], "applicant_id": str(entry["applicant_id"])}, {"$set": fields}))
+    if operations:
+        db.job_matches.bulk_write(operations, ordered=False)
+
+    analyzed = start + REMATCH_ANALYZE_CHUNK
+    fields = {"analyzed": min(analyzed, to_analyze)}
+    if analyzed >= to_analyze:
+        fields.update({"status": "completed", "finished_at": datetime.utcnow()})
+    return advance(run, fields), fields.get("status", ACTIVE)
+
+# ---------------- Worker ----------------
+@task_handler("rematch_step")
+def process_rematch_step(payload):
+    run = db.rematch_runs.find_one({"_id": ObjectId(payload["run_id"])})
+    if not run or run["status"] != ACTIVE or run.get("step", 0) != payload["step"]:
+        return  # cancelled, finished, or a step that was already done
+
+    try:
+        job = db.jobs.find_one({"_id": ObjectId(run["job_id"])})
+        if not job:
+            raise ValueError("Job not found")
+        step = score_chunk if run["stage"] == "scoring" else analyze_chunk
+        saved, status = step(run, job)
+    except Exception as e:
+        log.exception("re-match step failed", extra={"run_id": payload["run_id"], "step": payload["step"]})
+        db.rematch_runs.update_one({"_id": run["_id"], "step": run["step"]}, {
+            "$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()},
+        })
+        return
+
+    if saved and status == ACTIVE:
+        run["step"] += 1
+        enqueue_step(run)
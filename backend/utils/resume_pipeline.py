@@ -0,0 +1,674 @@
+from utils.db import db
+from utils.task_queue import task_handler, enqueue, PRIORITY_LOW
+from utils.extraction import extract_text
+from utils.analysis_cache import get_analysis_cache, cache_key, ANALYSIS_CACHE_ENABLED
+from utils.prescreen import prescreen_scores, prescreen_policy, PRESCREEN_REJECTION_EMAIL
+from utils.mailer import queue_email
+from utils.rejection_templates import render_rejection_email
+from utils.dedup import fingerprint, find_duplicate
+from utils.search_index import search_fields
+from utils.blob_store import text_update, resume_text_of, resume_file
+from utils.job_stats import update_applicant, record_change
+from utils.llm import generate_text, estimate_tokens, ANALYSIS_MODEL, ANALYSIS_FAST_MODEL
+from utils.prompt_builder import condense_resume, condense_job_description, BUDGET_SIGNATURE
+from utils.metrics import (
+    stage, JSON_PARSE_FALLBACKS, RESUMES, PROMPT_TOKENS, ANALYSIS_ESCALATIONS, ANALYSIS_VALIDATION_FAILURES,
+)
+from utils.log import get_logger
+from datetime import datetime
+from bson import ObjectId
+import os, json, re
+import dotenv
+
+dotenv.load_dotenv()
+log = get_logger("resume_pipeline")
+
+REJECTION_THRESHOLD = 0.85
+# Batched scoring packs several resumes for the same job into one Gemini call
+BATCH_SCORING_TOKEN_BUDGET = int(os.getenv("BATCH_SCORING_TOKEN_BUDGET", "60000"))
+BATCH_SCORING_MAX_RESUMES = int(os.getenv("BATCH_SCORING_MAX_RESUMES", "10"))
+
+# ---------------- Job Context ----------------
+def load_job_context(job_id):
+    """Return (job, company_name) for a job id, or (None, None) if the job is missing."""
+    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    if not job:
+        return None, None
+
+    # Fetch company name from HR/admin
+    company_name = "Our Company"
+    created_by = job.get("created_by")  # HR/admin email
+    if created_by:
+        hr_doc = db.users.find_one({"email": created_by})
+        if hr_doc and hr_doc.get("company_name"):
+            company_name = hr_doc["company_name"]
+    return job, company_name
+
+# ---------------- Gemini Resume Analysis ----------------
+def empty_analysis():
+    return {
+        "fit_score": 0,
+        "summary": "Parsing failed",
+        "education": [],
+        "skills": [],
+        "experience": [],
+        "projects": [],
+        "weak_areas": [],
+        "recommendations": [],
+        "candidate_name": "",
+        "candidate_email": ""
+    }
+
+# Bump whenever the analysis prompt or output handling changes so cached results are not reused
+ANALYSIS_PROMPT_VERSION = 3
+# The prompt also depends on the token budgets it was cut to
+ANALYSIS_CACHE_VERSION = f"{ANALYSIS_PROMPT_VERSION}:{BUDGET_SIGNATURE}"
+
+# Tiered scoring: ANALYSIS_FAST_MODEL scores every resume and only the results within
+# ANALYSIS_ESCALATION_MARGIN of the rejection threshold (or that fail validation) are
+# scored again by ANALYSIS_MODEL
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "tiered").lower()  # tiered | single
+ANALYSIS_ESCALATION_MARGIN = float(os.getenv("ANALYSIS_ESCALATION_MARGIN", "0.1"))
+# Ask Gemini for JSON matching ANALYSIS_RESPONSE_SCHEMA instead of free text
+ANALYSIS_JSON_MODE = os.getenv("ANALYSIS_JSON_MODE", "true").lower() == "true"
+
+ANALYSIS_SCHEMA = """{
+  "fit_score": <float 0-1>,
+  "summary": "<short professional summary>",
+  "education": ["<degree/institution>"],
+  "skills": ["<skill1>", "<skill2>"],
+  "experience": ["<role1>", "<role2>"],
+  "projects": ["<project1>", "<project2>"],
+  "weak_areas": ["<weak1>", "<weak2>"],
+  "recommendations": ["<rec1>", "<rec2>"],
+  "candidate_name": "<full name if available>",
+  "candidate_email": "<email if available>"
+}"""
+
+# The same fields as a Gemini response_schema (an OpenAPI subset), also used to validate responses
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+ANALYSIS_FIELDS = {
+    "fit_score": {"type": "number"},
+    "summary": {"type": "string"},
+    "education": _STRING_LIST,
+    "skills": _STRING_LIST,
+    "experience": _STRING_LIST,
+    "projects": _STRING_LIST,
+    "weak_areas": _STRING_LIST,
+    "recommendations": _STRING_LIST,
+    "candidate_name": {"type": "string"},
+    "candidate_email": {"type": "string"},
+}
+ANALYSIS_RESPONSE_SCHEMA = {"type": "object", "properties": ANALYSIS_FIELDS, "required": list(ANALYSIS_FIELDS)}
+BATCH_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {"index": {"type": "integer"}, **ANALYSIS_FIELDS},
+    "required": ["index", *ANALYSIS_FIELDS],
+}
+BATCH_RESPONSE_SCHEMA = {"type": "array", "items": BATCH_ITEM_SCHEMA}
+
+def build_analysis_prompt(resume_text, job_desc):
+    return f"""
+You are an AI HR assistant. Analyze this resume against the job description.
+Return ONLY a valid JSON like this:
+{ANALYSIS_SCHEMA}
+Job Description:
+{job_desc}
+Resume Text:
+{resume_text}
+"""
+
+def prompt_inputs(resume_texts, job_desc):
+    """Condensed resumes and job description for the analysis prompts; logs and counts the tokens saved."""
+    with stage("prompt_build"):
+        resumes = [condense_resume(text) for text in resume_texts]
+        job = condense_job_description(job_desc)
+    raw = sum(resume["raw_tokens"] for resume in resumes)
+    sent = sum(resume["tokens"] for resume in resumes)
+    PROMPT_TOKENS.inc(raw, part="resume", kind="raw")
+    PROMPT_TOKENS.inc(sent, part="resume", kind="sent")
+    PROMPT_TOKENS.inc(job["raw_tokens"], part="job_description", kind="raw")
+    PROMPT_TOKENS.inc(job["tokens"], part="job_description", kind="sent")
+    log.info("analysis prompt inputs", extra={
+        "resumes": len(resumes),
+        "resume_tokens": raw,
+        "resume_tokens_sent": sent,
+        "job_tokens": job["raw_tokens"],
+        "job_tokens_sent": job["tokens"],
+        "tokens_saved": raw - sent + job["raw_tokens"] - job["tokens"],
+        "truncated": sorted({name for resume in resumes for name in resume["truncated"]}),
+        "dropped": sorted({name for resume in resumes for name in resume["dropped"]}),
+    })
+    return [resume["text"] for resume in resumes], job["text"]
+
+def merge_analysis(result):
+    """Copy the known keys of a parsed model result over the empty defaults."""
+    analysis_result = empty_analysis()
+    for key in analysis_result.keys():
+        if key in result:
+            analysis_result[key] = result[key]
+    return analysis_result
+
+# ---------------- Response Validation ----------------
+JSON_TYPES = {"object": dict, "array": list, "string": str, "number": (int, float), "integer": int, "boolean": bool}
+
+def schema_error(value, schema, path="$"):
+    """The first way ``value`` breaks ``schema`` (the response_schema subset above), or None."""
+    kind = schema["type"]
+    if not isinstance(value, JSON_TYPES[kind]) or (isinstance(value, bool) and kind != "boolean"):
+        return f"{path}: expected {kind}"
+    if kind == "object":
+        for name in schema.get("required", ()):
+            if name not in value:
+                return f"{path}.{name}: missing"
+        for name, field in schema.get("properties", {}).items():
+            error = schema_error(value[name], field, f"{path}.{name}") if name in value else None
+            if error:
+                return error
+    elif kind == "array":
+        for index, item in enumerate(value):
+            error = schema_error(item, schema["items"], f"{path}[{index}]")
+            if error:
+                return error
+    return None
+
+def analysis_error(result, schema=ANALYSIS_RESPONSE_SCHEMA):
+    """Why a parsed analysis cannot be used (schema mismatch, score outside 0-1), or None."""
+    error = schema_error(result, schema)
+    if error is None and not 0 <= result["fit_score"] <= 1:
+        error = "$.fit_score: outside 0-1"
+    return error
+
+def parse_model_json(raw_text, path, model_name, pattern=r"\{.*\}"):
+    """Decode a response: the whole text (JSON mode) or else the outermost JSON value in it; None if neither."""
+    try:
+        return json.loads(raw_text)
+    except ValueError:
+        pass
+    match = re.search(pattern, raw_text, re.DOTALL)
+    if not match:
+        JSON_PARSE_FALLBACKS.inc(path=path, reason="no_json")
+        log.warning("analysis response has no JSON", extra={"path": path, "model": model_name, "chars": len(raw_text)})
+        return None
+    try:
+        return json.loads(match.group(0))
+    except ValueError as e:
+        JSON_PARSE_FALLBACKS.inc(path=path, reason="invalid_json")
+        log.warning("analysis response is not valid JSON", extra={"path": path, "model": model_name, "error": str(e)})
+        return None
+
+def analysis_generation_config(schema):
+    if not ANALYSIS_JSON_MODE:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+# ---------------- Model Tiers ----------------
+def analysis_models():
+    """Models an analysis goes through, cheapest first."""
+    if ANALYSIS_MODE == "tiered" and ANALYSIS_FAST_MODEL != ANALYSIS_MODEL:
+        return [ANALYSIS_FAST_MODEL, ANALYSIS_MODEL]
+    return [ANALYSIS_MODEL]
+
+def tiers_key(models):
+    """Model part of the analysis cache key: results of different tier setups are not mixed."""
+    if len(models) == 1:
+        return models[0]
+    return ">".join(models) + f"@{ANALYSIS_ESCALATION_MARGIN}"
+
+def escalation_reason(result, last):
+    """None if ``result`` is final, else why it goes to the next tier ("invalid" or "borderline")."""
+    if result is None:
+        return "invalid"
+    if not last and abs(result["fit_score"] - REJECTION_THRESHOLD) < ANALYSIS_ESCALATION_MARGIN:
+        return "borderline"
+    return None
+
+def escalate(path, reason, model_name, next_model, result):
+    ANALYSIS_ESCALATIONS.inc(path=path, reason=reason)
+    log.info("analysis escalated", extra={
+        "path": path, "reason": reason, "model": model_name, "next_model": next_model,
+        "fit_score": result["fit_score"] if result else None,
+    })
+
+# ---------------- Single Resume Analysis ----------------
+def request_analysis(model_name, resume_text, job_desc):
+    """One model's validated analysis of a resume, or None if the call, the parse or the validation failed."""
+    try:
+        [prompt_resume], prompt_job = prompt_inputs([resume_text], job_desc)
+        raw_text = generate_text(model_name, build_analysis_prompt(prompt_resume, prompt_job),
+                                 generation_config=analysis_generation_config(ANALYSIS_RESPONSE_SCHEMA))
+    except Exception:
+        log.exception("gemini analysis call failed", extra={"model": model_name})
+        return None
+
+    with stage("json_parse"):
+        result = parse_model_json(raw_text, "analysis", model_name)
+        if result is None:
+            return None
+        error = analysis_error(result)
+    if error:
+        ANALYSIS_VALIDATION_FAILURES.inc(path="analysis", model=model_name)
+        log.warning("analysis response failed validation", extra={"model": model_name, "error": error})
+        return None
+    return merge_analysis(result)
+
+def analyze_resume(resume_text, job_desc, models=None):
+    """Analyze one resume, moving up the model tiers while the result is borderline or invalid."""
+    models = models or analysis_models()
+    cache = get_analysis_cache() if ANALYSIS_CACHE_ENABLED else None
+    key = cache_key(resume_text, job_desc, ANALYSIS_CACHE_VERSION, tiers_key(models))
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    fallback = None
+    for tier, model_name in enumerate(models):
+        last = tier == len(models) - 1
+        result = request_analysis(model_name, resume_text, job_desc)
+        reason = escalation_reason(result, last)
+        if reason is None:
+            # Only validated results are cached; failures should be retried next time
+            if cache is not None:
+                cache.set(key, result, model_name)
+            return result
+        fallback = result or fallback
+        if not last:
+            escalate("analysis", reason, model_name, models[tier + 1], result)
+    # The last tier failed: a borderline score from a cheaper tier beats "Parsing failed"
+    return fallback or empty_analysis()
+
+# ---------------- Batched Resume Analysis ----------------
+def build_batch_prompt(resume_texts, job_desc):
+    resumes = "\n".join(
+        f"[Resume {index}]\n{text}\n[End of Resume {index}]" for index, text in enumerate(resume_texts)
+    )
+    return f"""
+You are an AI HR assistant. Analyze each of the {len(resume_texts)} resumes below against the same job description.
+Return ONLY a valid JSON array with exactly one object per resume, in this form:
+[
+  {{"index": <resume number>, ...fields...}}
+]
+where the fields of each object are:
+{ANALYSIS_SCHEMA}
+Evaluate every resume independently.
+Job Description:
+{job_desc}
+Resumes:
+{resumes}
+"""
+
+def pack_batches(resume_texts, job_desc, token_budget=BATCH_SCORING_TOKEN_BUDGET, max_resumes=BATCH_SCORING_MAX_RESUMES):
+    """Group resume indices so each group's prompt stays within the token budget."""
+    base_tokens = estimate_tokens(build_batch_prompt([], condense_job_description(job_desc)["text"]))
+    batches, current, used = [], [], base_tokens
+    for index, text in enumerate(resume_texts):
+        tokens = estimate_tokens(text) + 20
+        if current and (used + tokens > token_budget or len(current) >= max_resumes):
+            batches.append(current)
+            current, used = [], base_tokens
+        current.append(index)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_response(raw_text, count, model_name=ANALYSIS_MODEL):
+    """Return {index: analysis_result} for every entry of the model's JSON array that passes validation."""
+    items = parse_model_json(raw_text, "batch", model_name, pattern=r"\[.*\]")
+    if not isinstance(items, list):
+        return {}
+    parsed = {}
+    for item in items:
+        error = analysis_error(item, BATCH_ITEM_SCHEMA)
+        if error is None and not 0 <= item["index"] < count:
+            error = "$.index: out of range"
+        if error:
+            ANALYSIS_VALIDATION_FAILURES.inc(path="batch", model=model_name)
+            log.warning("batch entry failed validation", extra={"model": model_name, "error": error})
+            continue
+        parsed[item["index"]] = merge_analysis(item)
+    return parsed
+
+def request_batch(model_name, resume_texts, job_desc):
+    """{position: analysis} for the resumes one batched call scored validly."""
+    try:
+        prompt_texts, prompt_job = prompt_inputs(resume_texts, job_desc)
+        raw_text = generate_text(model_name, build_batch_prompt(prompt_texts, prompt_job),
+                                 generation_config=analysis_generation_config(BATCH_RESPONSE_SCHEMA))
+    except Exception:
+        log.exception("gemini batch analysis failed", extra={"model": model_name, "resumes": len(resume_texts)})
+        return {}
+    with stage("json_parse"):
+        parsed = parse_batch_response(raw_text, len(resume_texts), model_name)
+    if len(parsed) < len(resume_texts):
+        JSON_PARSE_FALLBACKS.inc(len(resume_texts) - len(parsed), path="batch", reason="missing_entries")
+        log.warning("batch response incomplete, falling back per resume",
+                    extra={"model": model_name, "returned": len(parsed), "expected": len(resume_texts)})
+    return parsed
+
+def analyze_resumes_batch(resume_texts, job_desc, models=None):
+    """Analyze many resumes for one job, packing several per Gemini call.
+
+    Each model tier scores the resumes still open in batches; the borderline
+    and invalid ones move on to the next tier. Cached results are reused, and
+    any resume a batched response does not cover is re-analyzed on its own
+    with the same model.
+    """
+    models = models or analysis_models()
+    results = [None] * len(resume_texts)
+    cache = get_analysis_cache() if ANALYSIS_CACHE_ENABLED else None
+    keys = [cache_key(text, job_desc, ANALYSIS_CACHE_VERSION, tiers_key(models)) for text in resume_texts]
+    pending = []
+    for index, key in enumerate(keys):
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.append(index)
+
+    # Packed by the size the resumes will have in the prompt
+    condensed = {index: condense_resume(resume_texts[index])["text"] for index in pending}
+    fallback = {}
+    for tier, model_name in enumerate(models):
+        last = tier == len(models) - 1
+        escalated = []
+        for batch in pack_batches([condensed[index] for index in pending], job_desc):
+            indices = [pending[i] for i in batch]
+            parsed = request_batch(model_name, [resume_texts[i] for i in indices], job_desc) if len(indices) > 1 else {}
+            for position, index in enumerate(indices):
+                result = parsed.get(position) or request_analysis(model_name, resume_texts[index], job_desc)
+                reason = escalation_reason(result, last)
+                if reason is None:
+                    results[index] = result
+                    if cache is not None:
+                        cache.set(keys[index], result, model_name)
+                    continue
+                fallback[index] = result or fallback.get(index)
+                if last:
+                    results[index] = fallback[index] or empty_analysis()
+                else:
+                    escalate("batch", reason, model_name, models[tier + 1], result)
+                    escalated.append(index)
+        pending = escalated
+    return results
+
+# ---------------- Local Pre-screening ----------------
+def prescreen(resume_texts, job):
+    """Score resumes locally and decide which of them still need the LLM.
+
+    Returns (scores, decisions, features); a decision is None when the resume
+    should be analyzed now, otherwise the job's prescreen action ("skip" or
+    "defer"). Features are stored on the applicant for fast re-ranking.
+    """
+    scores, features = prescreen_scores(resume_texts, job)
+    cutoff, action = prescreen_policy(job)
+    decisions = [action if score < cutoff else None for score in scores]
+    return scores, decisions, features
+
+def prescreened_analysis(score):
+    """Analysis result stored for a resume that was screened out without an LLM call.
+
+    It has no ``fit_score``: the pre-screen score is not on the same scale,
+    so it is kept apart as ``prescreen_score``.
+    """
+    analysis_result = empty_analysis()
+    analysis_result["fit_score"] = None
+    analysis_result["prescreen_score"] = score
+    analysis_result["summary"] = "Below the pre-screening cutoff for this job (not sent for AI analysis)"
+    return analysis_result
+
+def applicant_fields(analysis_result):
+    """Map an analysis result onto the applicant document fields."""
+    return {
+        "fit_score": analysis_result["fit_score"],
+        "skills_summary": analysis_result["summary"],
+        "education": analysis_result.get("education", []),
+        "skills": analysis_result.get("skills", []),
+        "experience": analysis_result.get("experience", []),
+        "projects": analysis_result.get("projects", []),
+        "weak_areas": analysis_result.get("weak_areas", []),
+        "recommendations": analysis_result.get("recommendations", []),
+        "candidate_name": analysis_result.get("candidate_name", ""),
+        "candidate_email": analysis_result.get("candidate_email", ""),
+    }
+
+def analysis_response(analysis_result):
+    """Shape an analysis result the way the upload API has always returned it."""
+    return {
+        "fit_score": round(analysis_result["fit_score"] * 100, 2) if analysis_result["fit_score"] is not None else None,
+        "summary": analysis_result["summary"],
+        "education": analysis_result["education"],
+        "skills": analysis_result["skills"],
+        "experience": analysis_result["experience"],
+        "projects": analysis_result["projects"],
+        "weak_areas": analysis_result["weak_areas"],
+        "recommendations": analysis_result["recommendations"],
+        "candidate_name": analysis_result.get("candidate_name", ""),
+        "candidate_email": analysis_result.get("candidate_email", ""),
+    }
+
+# ---------------- Send Email based on Fit Score ----------------
+def notify_candidate(resume_text, analysis_result, job, company_name, applicant_id=None):
+    """Queue the rejection email for a low-scoring candidate.
+
+    With an ``applicant_id`` the email is claimed on the applicant's
+    ``response_email`` first, so a retried task never emails them twice.
+    Pre-screened resumes (no fit score) are only emailed with
+    ``PRESCREEN_REJECTION_EMAIL`` on.
+    """
+    fit_score = analysis_result["fit_score"]
+    if fit_score is None:
+        if not PRESCREEN_REJECTION_EMAIL:
+            return
+        fit_score = analysis_result.get("prescreen_score") or 0
+    candidate_email = analysis_result.get("candidate_email")
+    if not candidate_email:
+        email_match = re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", resume_text)
+        candidate_email = email_match.group(0) if email_match else None
+
+    if not candidate_email:
+        return
+
+    candidate_name = analysis_result.get("candidate_name", "Candidate")
+    if analysis_result["fit_score"] is None or fit_score < REJECTION_THRESHOLD:
+        # Rejection email sent automatically, rendered from a template unless the job opts into per-candidate LLM emails
+        if applicant_id is not None and not claim_response(applicant_id, "rejection"):
+            log.info("candidate already notified; email skipped", extra={"applicant_id": str(applicant_id)})
+            return
+        try:
+            email_subject, polite_reply = render_rejection_email(
+                job, company_name, candidate_name, candidate_email, fit_score
+            )
+            outbox_id = queue_email(candidate_email, email_subject, polite_reply, kind="rejection")
+            if applicant_id is not None:
+                db.applicants.update_one({"_id": applicant_id}, {"$set": {"response_email.outbox_id": str(outbox_id)}})
+        except Exception as e:
+            if applicant_id is not None:
+                db.applicants.update_one({"_id": applicant_id}, {"$unset": {"response_email": ""}})
+            log.error("rejection email failed", extra={"to": candidate_email, "error": str(e)})
+    else:
+        # Score >= 85% → do not send invitation automatically
+        # HR/admin must schedule date/time and send invitation manually
+        log.info("candidate above threshold, awaiting HR scheduling",
+                 extra={"candidate_name": candidate_name, "fit_score": fit_score})
+
+def claim_response(applicant_id, outcome):
+    """Record that ``outcome``'s email is going out unless the applicant already got one; returns whether it did."""
+    return db.applicants.update_one(
+        {"_id": applicant_id, "response_email": {"$exists": False}},
+        {"$set": {"response_email": {"outcome": outcome, "status": "queued", "outbox_id": None, "at": datetime.utcnow()}}},
+    ).modified_count == 1
+
+# ---------------- Background Analysis Tasks ----------------
+# Statuses a task may (re)claim; "processing" covers a retry after the worker died mid-task
+CLAIMABLE_STATUSES = ["pending", "processing", "deferred"]
+
+def claim_applicant(applicant_id):
+    """Atomically move an unfinished applicant to "processing"; returns it, or None if missing or already done."""
+    applicant = db.applicants.find_one_and_update(
+        {"_id": applicant_id, "status": {"$in": CLAIMABLE_STATUSES}},
+        {"$set": {"status": "processing"}},
+    )
+    if applicant is not None:
+        record_change(applicant, {**applicant, "status": "processing"})
+    return applicant
+
+def mark_failed(applicant_id, error):
+    RESUMES.inc(outcome="failed")
+    update_applicant(applicant_id, {"$set": {
+        "status": "failed",
+        "error": error,
+        "completed_at": datetime.utcnow(),
+    }})
+
+def mark_duplicate(applicant_id, resume_text, duplicate):
+    RESUMES.inc(outcome="duplicate")
+    update_applicant(applicant_id, text_update(
+        resume_text,
+        status="duplicate",
+        duplicate_of=str(duplicate["applicant"]["_id"]),
+        duplicate_match=duplicate["match"],
+        completed_at=datetime.utcnow(),
+    ))
+
+def resolve_job(payload, job_id):
+    # Bulk uploads resolve the job once per batch and pass it along
+    job_context = payload.get("job_context")
+    if job_context:
+        return job_context, job_context["company_name"]
+    return load_job_context(job_id)
+
+def complete_applicant(applicant_id, resume_text, analysis_result, job, company_name, **extra):
+    update = applicant_fields(analysis_result)
+    update.update({
+        **search_fields(resume_text, analysis_result.get("skills")),
+        "status": "completed",
+        "completed_at": datetime.utcnow(),
+        **extra,
+    })
+    with stage("mongo_insert"):
+        update_applicant(applicant_id, text_update(resume_text, **update))
+    with stage("email"):
+        notify_candidate(resume_text, analysis_result, job, company_name, applicant_id)
+    RESUMES.inc(outcome="prescreened_out" if extra.get("prescreened_out") else "completed")
+
+def defer_applicant(applicant_id, resume_text, score, features, job_context=None):
+    """Park a screened-out applicant and queue its analysis behind everything else."""
+    RESUMES.inc(outcome="deferred")
+    update_applicant(applicant_id, text_update(
+        resume_text,
+        **search_fields(resume_text),
+        prescreen_score=score,
+        prescreen_features=features,
+        status="deferred",
+    ))
+    payload = {"applicant_id": str(applicant_id), "deferred": True}
+    if job_context:
+        payload["job_context"] = job_context
+    return enqueue("analyze_resume", payload, priority=PRIORITY_LOW)
+
+def run_analysis(applicant_id, resume_text, job, company_name, payload):
+    """Pre-screen, then analyze (or skip/defer) one applicant and store the outcome."""
+    with stage("prescreen"):
+        [score], [decision], [features] = prescreen([resume_text], job)
+    if payload.get("deferred"):
+        decision = None
+    if decision == "defer":
+        defer_applicant(applicant_id, resume_text, score, features, payload.get("job_context"))
+        return
+    if decision == "skip":
+        analysis_result = prescreened_analysis(score)
+    else:
+        analysis_result = analyze_resume(resume_text, job.get("description", ""))
+    complete_applicant(applicant_id, resume_text, analysis_result, job, company_name,
+                       prescreen_score=score, prescreen_features=features, prescreened_out=decision == "skip")
+
+def load_resume_text(applicant):
+    """The applicant's stored resume text, or the text of its uploaded file."""
+    resume_text = resume_text_of(applicant)
+    if not resume_text:
+        with stage("extract_text"), resume_file(applicant) as file_path:
+            resume_text = extract_text(file_path)
+    return resume_text
+
+@task_handler("analyze_resume")
+def process_pending_applicant(payload):
+    """Run the full analysis pipeline for an applicant stored with status "pending"."""
+    applicant_id = ObjectId(payload["applicant_id"])
+    with stage("mongo_lookup"):
+        applicant = claim_applicant(applicant_id)
+    if not applicant:
+        log.warning("applicant no longer exists or is already processed", extra={"applicant_id": str(applicant_id)})
+        return
+
+    try:
+        # Bulk uploads extract text up front; single async uploads leave it to the worker
+        resume_text = load_resume_text(applicant)
+        if not resume_text.strip():
+            mark_failed(applicant_id, "Parsing failed (no text found)")
+            return
+
+        with stage("mongo_lookup"):
+            job, company_name = resolve_job(payload, applicant["job_id"])
+        if not job:
+            mark_failed(applicant_id, "Job not found")
+            return
+
+        # Bulk uploads are fingerprinted (and deduplicated) at ingest; single async uploads are not yet
+        if "content_hash" not in applicant:
+            with stage("fingerprint"):
+                fingerprints = fingerprint(resume_text)
+            with stage("mongo_lookup"):
+                db.applicants.update_one({"_id": applicant_id}, {"$set": fingerprints})
+                duplicate = None
+                if payload.get("check_duplicates", True):
+                    duplicate = find_duplicate(db.applicants, applicant["job_id"], fingerprints,
+                                               before_id=applicant_id, projection={"_id": 1})
+            if duplicate:
+                mark_duplicate(applicant_id, resume_text, duplicate)
+                return
+
+        run_analysis(applicant_id, resume_text, job, company_name, payload)
+    except Exception as e:
+        mark_failed(applicant_id, str(e))
+        raise
+
+@task_handler("analyze_resume_batch")
+def process_pending_batch(payload):
+    """Score a group of pending applicants for the same job with batched prompts."""
+    applicant_ids = [ObjectId(applicant_id) for applicant_id in payload["applicant_ids"]]
+    # A retried batch only picks up the applicants an earlier attempt did not finish
+    with stage("mongo_lookup"):
+        found = [applicant for applicant in map(claim_applicant, applicant_ids) if applicant is not None]
+    if not found:
+        return
+
+    job, company_name = resolve_job(payload, found[0]["job_id"])
+    if not job:
+        for applicant in found:
+            mark_failed(applicant["_id"], "Job not found")
+        return
+
+    try:
+        with stage("extract_text"):
+            resume_texts = [load_resume_text(applicant) for applicant in found]
+        with stage("prescreen"):
+            scores, decisions, features = prescreen(resume_texts, job)
+        to_analyze = [i for i, decision in enumerate(decisions) if decision is None]
+        results = analyze_resumes_batch([resume_texts[i] for i in to_analyze], job.get("description", ""))
+        analyzed = dict(zip(to_analyze, results))
+
+        for i, applicant in enumerate(found):
+            if decisions[i] == "defer":
+                defer_applicant(applicant["_id"], resume_texts[i], scores[i], features[i], payload.get("job_context"))
+                continue
+            analysis_result = analyzed.get(i) or prescreened_analysis(scores[i])
+            complete_applicant(applicant["_id"], resume_texts[i], analysis_result, job, company_name,
+                               prescreen_score=scores[i], prescreen_features=features[i],
+                               prescreened_out=decisions[i] == "skip")
+    except Exception as e:
+        for applicant in found:
+            if db.applicants.find_one({"_id": applicant["_id"], "status": "processing"}, {"_id": 1}):
+                mark_failed(applicant["_id"], str(e))
+        raise
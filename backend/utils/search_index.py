@@ -0,0 +1,463 @@
+"""Semantic candidate search: hashed n-gram embeddings in a local vector index.
+
+Embeddings are signed feature-hashed word vectors (tokenized and hashed like
+the pre-screen features in ``utils/prescreen.py``, unigrams only - bigrams
+doubled the hash collisions for no gain in recall) folded into
+``SEARCH_VECTOR_DIM`` dimensions, with the candidate's structured ``skills``
+weighted up, and L2-normalized so a dot product is a cosine similarity.
+
+Writers (upload routes, queue workers - any process) only store the vector on
+the applicant as ``search_vector`` together with ``search_updated_at``. The
+``SearchIndex`` pulls new and changed vectors from Mongo by that timestamp, so
+it picks up applicants written by other processes and resumes after a
+restart from where it stopped.
+
+The files have a single writer: the process holding the ``index.lock`` file
+lock, taken on its first sync and kept until it exits. Syncing runs in a
+background thread (``start_search_sync``), never on a request. Every other
+process maps the files read-only and reloads them when ``meta.json`` changes
+(``refresh``), so gunicorn workers share one index without overwriting each
+other's rows.
+
+The index is an IVF (inverted file) index over float16 vectors kept in
+memory-mapped files under ``SEARCH_INDEX_DIR``. Below ``SEARCH_INDEX_TRAIN_MIN``
+vectors it is scanned flat; past that, k-means centroids are trained once and
+a query only scans the ``SEARCH_INDEX_PROBES`` closest lists.
+"""
+from utils.prescreen import tokenize, parse_skills, FEATURE_MASK
+from bson import ObjectId
+from bson.binary import Binary
+from datetime import datetime, timedelta
+from utils.log import get_logger
+from dotenv import load_dotenv
+import numpy as np
+import json, os, threading, time, zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single process there
+    fcntl = None
+
+load_dotenv()
+log = get_logger("search_index")
+
+SEARCH_VECTOR_DIM = int(os.getenv("SEARCH_VECTOR_DIM", "256"))
+# Empty keeps the index in memory only (rebuilt from Mongo on start)
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", os.path.join(os.getcwd(), "search_index"))
+SEARCH_INDEX_TRAIN_MIN = int(os.getenv("SEARCH_INDEX_TRAIN_MIN", "20000"))
+SEARCH_INDEX_PROBES = int(os.getenv("SEARCH_INDEX_PROBES", "64"))
+SEARCH_SYNC_INTERVAL = float(os.getenv("SEARCH_SYNC_INTERVAL", "1"))  # min seconds between syncs
+# "thread" syncs from a background thread of each API process (one of them wins the lock), "off" leaves it
+# to `python worker.py --search-sync`
+SEARCH_SYNC_MODE = os.getenv("SEARCH_SYNC_MODE", "thread").lower()
+SKILL_WEIGHT = 2.0
+# Re-read writes this far behind the sync mark, in case they committed out of order
+SYNC_OVERLAP = timedelta(seconds=5)
+INDEX_VERSION = 1
+
+
+# ---------------- Embeddings ----------------
+def word_features(text):
+    """Hashed word ids (same hash space as the pre-screen) and their counts."""
+    ids = np.array([zlib.crc32(token.encode("utf-8")) & FEATURE_MASK for token in tokenize(text)], dtype=np.uint32)
+    return np.unique(ids, return_counts=True)
+
+def embed_features(ids, counts, dim=SEARCH_VECTOR_DIM):
+    """Fold hashed term counts into a dense vector (feature hashing with a sign bit)."""
+    vector = np.zeros(dim, dtype=np.float32)
+    if len(ids):
+        ids = ids.astype(np.uint32)
+        signs = np.where((ids >> np.uint32(19)) & np.uint32(1), 1.0, -1.0).astype(np.float32)
+        np.add.at(vector, (ids % np.uint32(dim)).astype(np.int64), signs * np.log1p(counts.astype(np.float32)))
+    return vector
+
+def embed(text, skills=None, dim=SEARCH_VECTOR_DIM):
+    """Normalized embedding of a resume (or query) and optional skill list."""
+    vector = embed_features(*word_features(text), dim=dim)
+    skill_text = " ".join(parse_skills(skills)) if skills else ""
+    if skill_text:
+        vector += SKILL_WEIGHT * embed_features(*word_features(skill_text), dim=dim)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def search_fields(resume_text, skills=None):
+    """Fields stored on an applicant so the search index picks it up."""
+    return {
+        "search_vector": Binary(embed(resume_text, skills).astype(np.float16).tobytes()),
+        "search_updated_at": datetime.utcnow(),
+    }
+
+# ---------------- Vector Index ----------------
+class SearchIndex:
+    def __init__(self, directory=SEARCH_INDEX_DIR, dim=SEARCH_VECTOR_DIM,
+                 train_min=SEARCH_INDEX_TRAIN_MIN, probes=SEARCH_INDEX_PROBES):
+        self.directory = directory or None
+        self.dim = dim
+        self.train_min = train_min
+        self.probes = probes
+        self.count = 0
+        self.capacity = 0
+        self.synced_until = None
+        self.centroids = None
+        self.vectors = self.ids = self.lists = None
+        self.row_of = {}
+        self.members = []
+        self._member_arrays = []
+        self._lock = threading.RLock()
+        self._last_sync = 0.0
+        # An in-memory index belongs to its process; files are written only under the lock
+        self.writer = self.directory is None
+        self._lock_handle = None
+        self._meta_stamp = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load()
+        else:
+            self._allocate(1024)
+
+    # ----- storage -----
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self, name, dtype, shape, mode):
+        if self.directory is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode=mode, shape=shape)
+
+    def _map(self, capacity, mode):
+        self.vectors = self._open("vectors.f16", np.float16, (capacity, self.dim), mode)
+        self.ids = self._open("ids.bin", np.uint8, (capacity, 12), mode)
+        self.lists = self._open("lists.i32", np.int32, (capacity,), mode)
+        self.capacity = capacity
+
+    def _allocate(self, capacity):
+        """(Re)open the backing arrays with room for ``capacity`` vectors, keeping existing rows."""
+        old = (self.vectors, self.ids, self.lists, self.count)
+        if self.directory:
+            for array in old[:3]:
+                if isinstance(array, np.memmap) and array.mode == "r+":
+                    array.flush()
+            for name, itemsize in (("vectors.f16", 2 * self.dim), ("ids.bin", 12), ("lists.i32", 4)):
+                with open(self._path(name), "ab") as f:
+                    f.truncate(capacity * itemsize)
+        self._map(capacity, "r+")
+        if self.directory is None and old[0] is not None:
+            self.vectors[:old[3]], self.ids[:old[3]], self.lists[:old[3]] = old[0][:old[3]], old[1][:old[3]], old[2][:old[3]]
+
+    def _stamp(self):
+        # meta.json is replaced on every save, so a new inode means another save
+        stat = os.stat(self._path("meta.json"))
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, writable=False):
+        """Map the files as of the last save: read-only, or read-write for the writer."""
+        if self.directory is None or not os.path.exists(self._path("meta.json")):
+            return False
+        stamp = self._stamp()
+        with open(self._path("meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION or meta.get("dim") != self.dim:
+            log.warning("search index on disk has a different format; rebuilding from Mongo", extra={"directory": self.directory})
+            return False
+        self.count = meta["count"]
+        self.synced_until = datetime.fromisoformat(meta["synced_until"]) if meta.get("synced_until") else None
+        self._map(meta["capacity"], "r+" if writable else "r")
+        self.centroids = np.load(self._path("centroids.npy")) if os.path.exists(self._path("centroids.npy")) else None
+        # Only the writer looks rows up by applicant
+        raw = np.asarray(self.ids[:self.count]).tobytes() if writable else b""
+        self.row_of = {raw[row * 12:row * 12 + 12]: row for row in range(self.count)} if writable else {}
+        self._rebuild_lists()
+        self._meta_stamp = stamp
+        log.info("loaded search index", extra={"vectors": self.count, "writable": writable})
+        return True
+
+    def refresh(self):
+        """Reload if the writer has saved since this process last looked; True when it did."""
+        if self.writer:
+            return False  # the writer's own saves are what is on disk
+        try:
+            stamp = self._stamp()
+        except FileNotFoundError:
+            return False
+        if stamp == self._meta_stamp:
+            return False
+        with self._lock:
+            return stamp != self._meta_stamp and self._load()
+
+    def _acquire_writer(self):
+        """Become the index's single writer; False if another process already is."""
+        if self.writer:
+            return True
+        handle = open(self._path("index.lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+        # Held until the process exits; the OS drops it then and another process takes over
+        self._lock_handle = handle
+        self.writer = True
+        # The previous writer may have saved after this process last loaded
+        if not self._load(writable=True):
+            self.count, self.synced_until, self.centroids, self.row_of = 0, None, None, {}
+            self.vectors = self.ids = self.lists = None
+            self._allocate(1024)
+            self._rebuild_lists()
+        log.info("became the search index writer", extra={"directory": self.directory, "pid": os.getpid()})
+        return True
+
+    def _require_writer(self):
+        if not self._acquire_writer():
+            raise RuntimeError(f"search index {self.directory} is written by another process")
+
+    def save(self):
+        if self.directory is None:
+            return
+        with self._lock:
+            self._require_writer()
+            for array in (self.vectors, self.ids, self.lists):
+                array.flush()
+            if self.centroids is not None:
+                # Readers may load centroids at any time: write aside, then swap in
+                with open(self._path("centroids.tmp"), "wb") as f:
+                    np.save(f, self.centroids)
+                os.replace(self._path("centroids.tmp"), self._path("centroids.npy"))
+            elif os.path.exists(self._path("centroids.npy")):
+                os.remove(self._path("centroids.npy"))  # left over from an index in another format
+            meta = {
+                "version": INDEX_VERSION, "dim": self.dim, "count": self.count, "capacity": self.capacity,
+                "synced_until": self.synced_until.isoformat() if self.synced_until else None,
+            }
+            temp_path = self._path("meta.json.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(temp_path, self._path("meta.json"))
+            self._meta_stamp = self._stamp()
+
+    # ----- inverted lists -----
+    def _rebuild_lists(self):
+        if self.centroids is None:
+            self.members, self._member_arrays = [], []
+            return
+        assignments = np.asarray(self.lists[:self.count])
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        self.members = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(self.centroids))]
+        self._member_arrays = [None] * len(self.centroids)
+
+    def _assign(self, vectors):
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def train(self, lists=None, iterations=10, sample_size=100000, seed=0):
+        """Spherical k-means over a sample of the stored vectors, then re-assign every row."""
+        with self._lock:
+            self._require_writer()
+            lists = lists or max(16, min(1024, int(4 * np.sqrt(self.count))))
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(self.count, min(self.count, sample_size), replace=False))
+            sample = np.asarray(self.vectors[sample_rows], dtype=np.float32)
+            centroids = sample[rng.choice(len(sample), lists, replace=False)]
+            for _ in range(iterations):
+                labels = np.concatenate([np.argmax(chunk @ centroids.T, axis=1) for chunk in np.array_split(sample, max(1, len(sample) // 8192))])
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                sums[empty] = centroids[empty]  # keep the old centroid for empty clusters
+                norms[empty] = 1
+                centroids = sums / norms
+            self.centroids = centroids.astype(np.float32)
+            for start in range(0, self.count, 65536):
+                stop = min(self.count, start + 65536)
+                self.lists[start:stop] = self._assign(np.asarray(self.vectors[start:stop], dtype=np.float32))
+            self._rebuild_lists()
+            log.info("trained search index", extra={"lists": lists, "vectors": self.count})
+
+    # ----- updates -----
+    def add(self, applicant_ids, vectors):
+        """Insert or replace the vectors of the given applicants."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            self._require_writer()
+            assignments = self._assign(vectors) if self.centroids is not None else np.full(len(vectors), -1, np.int32)
+            for applicant_id, vector, assignment in zip(applicant_ids, vectors, assignments):
+                key = ObjectId(applicant_id).binary
+                row = self.row_of.get(key)
+                previous = None
+                if row is None:
+                    if self.count >= self.capacity:
+                        self._allocate(self.capacity * 2)
+                    row = self.row_of[key] = self.count
+                    self.ids[row] = np.frombuffer(key, dtype=np.uint8)
+                    self.count += 1
+                else:
+                    previous = int(self.lists[row])
+                self.vectors[row] = vector
+                self.lists[row] = assignment
+                if self.centroids is not None and previous != assignment:
+                    if previous is not None and previous >= 0:
+                        self.members[previous].remove(row)
+                        self._member_arrays[previous] = None
+                    self.members[assignment].append(row)
+                    self._member_arrays[assignment] = None
+            if self.centroids is None and self.count >= self.train_min:
+                self.train()
+
+    def sync(self, collection, force=False, batch_size=5000):
+        """Pull vectors written since the last sync; returns the number applied.
+
+        Only the writer syncs: in any other process this returns 0 and
+        ``refresh`` picks up the writer's saves instead.
+        """
+        if not force and time.monotonic() - self._last_sync < SEARCH_SYNC_INTERVAL:
+            return 0
+        with self._lock:
+            if not self._acquire_writer():
+                return 0
+            self._last_sync = time.monotonic()
+            query = {"search_updated_at": {"$exists": True}}
+            if self.synced_until is not None:
+                query["search_updated_at"] = {"$gte": self.synced_until - SYNC_OVERLAP}
+            cursor = collection.find(query, {"search_vector": 1, "search_updated_at": 1}).sort("search_updated_at", 1)
+            applied, ids, vectors, latest = 0, [], [], self.synced_until
+            for applicant in cursor.batch_size(batch_size):
+                vector = np.frombuffer(applicant["search_vector"], dtype=np.float16)
+                if len(vector) != self.dim:
+                    continue  # written with another SEARCH_VECTOR_DIM; rebuild to re-embed
+                ids.append(applicant["_id"])
+                vectors.append(vector)
+                latest = max(latest, applicant["search_updated_at"]) if latest else applicant["search_updated_at"]
+                if len(ids) >= batch_size:
+                    self.add(ids, vectors)
+                    applied, ids, vectors = applied + len(ids), [], []
+            if ids:
+                self.add(ids, vectors)
+                applied += len(ids)
+            if latest is not None and latest != self.synced_until:
+                self.synced_until = latest
+                self.save()
+            return applied
+
+    # ----- queries -----
+    def _members(self, list_id):
+        array = self._member_arrays[list_id]
+        if array is None:
+            array = self._member_arrays[list_id] = np.array(self.members[list_id], dtype=np.int64)
+        return array
+
+    def search(self, query_vector, k=20):
+        """Return [(applicant_id, similarity)] of the k nearest stored vectors."""
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        with self._lock:
+            if self.count == 0:
+                return []
+            if self.centroids is None:
+                rows = None
+                scores = np.concatenate([
+                    np.asarray(self.vectors[start:min(self.count, start + 65536)], dtype=np.float32) @ query_vector
+                    for start in range(0, self.count, 65536)
+                ])
+            else:
+                probes = np.argsort(self.centroids @ query_vector)[::-1][:self.probes]
+                # Sorted rows keep the memory-mapped reads sequential
+                rows = np.sort(np.concatenate([self._members(int(list_id)) for list_id in probes]))
+                if len(rows) == 0:
+                    return []
+                scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query_vector
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            found = top if rows is None else rows[top]
+            return [(ObjectId(bytes(self.ids[row])), float(scores[i])) for row, i in zip(found, top)]
+
+    def stats(self):
+        return {
+            "vectors": self.count,
+            "dim": self.dim,
+            "lists": 0 if self.centroids is None else len(self.centroids),
+            "probes": self.probes,
+            "on_disk": self.directory is not None,
+            "writer": self.writer,
+            "synced_until": self.synced_until.isoformat() if self.synced_until else None,
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
+
+# ---------------- Background Sync ----------------
+def _sync_loop():
+    from utils.db import db
+
+    index = get_search_index()
+    while True:
+        try:
+            # A no-op outside the writer, whose saves refresh() then picks up
+            index.sync(db.applicants, force=True)
+            index.refresh()
+        except Exception:
+            log.exception("search index sync failed")
+        time.sleep(max(SEARCH_SYNC_INTERVAL, 0.05))
+
+def start_search_sync(mode=None):
+    """Keep the index in step with Mongo from a background thread (``SEARCH_SYNC_MODE=thread``)."""
+    if (mode or SEARCH_SYNC_MODE) != "thread":
+        return None
+    thread = threading.Thread(target=_sync_loop, name="search-sync", daemon=True)
+    thread.start()
+    log.info("started search index sync")
+    return thread
+
+def index_in_use(directory=SEARCH_INDEX_DIR):
+    """True if a running process holds the write lock of the index in ``directory``."""
+    if not directory or fcntl is None or not os.path.exists(os.path.join(directory, "index.lock")):
+        return False
+    with open(os.path.join(directory, "index.lock"), "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    return False
+
+def reembed_applicants(collection, batch_size=500):
+    """Recompute ``search_vector`` for every applicant with resume text; returns the count."""
+    from pymongo import UpdateOne
+    from utils.blob_store import resume_text_of, TEXT_FIELDS, HAS_RESUME_TEXT
+
+    updated, operations = 0, []
+    for applicant in collection.find(HAS_RESUME_TEXT, {**TEXT_FIELDS, "skills": 1}):
+        resume_text = resume_text_of(applicant)
+        if resume_text is None:
+            continue
+        operations.append(UpdateOne({"_id": applicant["_id"]},
+                                    {"$set": search_fields(resume_text, applicant.get("skills"))}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    # python -m utils.search_index  (from backend/) re-embeds every applicant and rebuilds the index
+    import shutil
+    from utils.db import db
+
+    if index_in_use():
+        raise SystemExit(f"[ERROR] {SEARCH_INDEX_DIR} is being written by a running process; "
+                         "stop it (or set SEARCH_SYNC_MODE=off there) before rebuilding")
+    print(f"[INFO] Embedded {reembed_applicants(db.applicants)} applicants")
+    if SEARCH_INDEX_DIR and os.path.isdir(SEARCH_INDEX_DIR):
+        shutil.rmtree(SEARCH_INDEX_DIR)
+    index = SearchIndex()
+    print(f"[INFO] Indexed {index.sync(db.applicants, force=True)} vectors")
@@ -0,0 +1,228 @@
+"""Background task queue and worker pool.
+
+Tasks are small dicts ``{"_id", "kind", "payload", "priority", "attempts"}``.
+A handler is registered per ``kind`` with ``@task_handler`` and receives the
+payload. Higher priorities are served first, FIFO within a priority.
+
+Two queue backends are available, selected with ``TASK_QUEUE_BACKEND``:
+
+* ``memory`` (default) - a process-local ``queue.Queue``. Needs no broker, but
+  only workers running inside the Flask process (``RESUME_WORKER_MODE=thread``)
+  can see its tasks.
+* ``mongo`` - tasks are stored in the ``tasks`` collection and claimed
+  atomically with ``find_one_and_update``, so any number of processes (the
+  Flask app and/or ``python worker.py``) can share them.
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+from utils.log import get_logger
+from utils.metrics import TASK_SECONDS, start_trace, end_trace
+import itertools, os, queue, threading, time
+
+load_dotenv()
+log = get_logger("task_queue")
+
+TASK_QUEUE_BACKEND = os.getenv("TASK_QUEUE_BACKEND", "memory").lower()
+RESUME_WORKERS = int(os.getenv("RESUME_WORKERS", "2"))
+# "thread" runs workers inside the Flask process, "process" expects a separate
+# `python worker.py`, "off" disables background processing entirely.
+RESUME_WORKER_MODE = os.getenv("RESUME_WORKER_MODE", "thread").lower()
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+HANDLERS = {}
+
+def task_handler(kind):
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+# ---------------- Queue Backends ----------------
+class MemoryQueue:
+    def __init__(self, max_attempts=TASK_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+
+    def _push(self, task):
+        self._queue.put((-task["priority"], next(self._sequence), task))
+
+    def put(self, kind, payload, priority=PRIORITY_NORMAL):
+        task = {"_id": ObjectId(), "kind": kind, "payload": payload, "priority": priority, "attempts": 0}
+        self._push(task)
+        return task["_id"]
+
+    def get(self, timeout=1.0):
+        try:
+            _, _, task = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        task["attempts"] += 1
+        return task
+
+    def ack(self, task):
+        pass
+
+    def fail(self, task, error):
+        if task["attempts"] < self.max_attempts:
+            self._push(task)
+
+    def size(self):
+        return self._queue.qsize()
+
+
+class MongoQueue:
+    def __init__(self, collection, max_attempts=TASK_MAX_ATTEMPTS, poll_interval=0.5):
+        self.collection = collection
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._indexed = False
+
+    def _ensure_index(self):
+        # On first use rather than at construction, so startup does not wait on Mongo
+        if not self._indexed:
+            self.collection.create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+            self._indexed = True
+
+    def put(self, kind, payload, priority=PRIORITY_NORMAL):
+        self._ensure_index()
+        return self.collection.insert_one({
+            "kind": kind,
+            "payload": payload,
+            "priority": priority,
+            "status": "queued",
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+        }).inserted_id
+
+    def get(self, timeout=1.0):
+        self._ensure_index()
+        deadline = time.monotonic() + timeout
+        while True:
+            task = self.collection.find_one_and_update(
+                {"status": "queued"},
+                {"$set": {"status": "running", "started_at": datetime.utcnow()}, "$inc": {"attempts": 1}},
+                sort=[("priority", -1), ("created_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if task or time.monotonic() >= deadline:
+                return task
+            time.sleep(self.poll_interval)
+
+    def ack(self, task):
+        self.collection.update_one(
+            {"_id": task["_id"]},
+            {"$set": {"status": "done", "finished_at": datetime.utcnow()}},
+        )
+
+    def fail(self, task, error):
+        status = "queued" if task["attempts"] < self.max_attempts else "failed"
+        self.collection.update_one(
+            {"_id": task["_id"]},
+            {"$set": {"status": status, "error": str(error), "finished_at": datetime.utcnow()}},
+        )
+
+    def requeue_stale(self, older_than=timedelta(minutes=10)):
+        """Put tasks whose worker died mid-run back on the queue."""
+        result = self.collection.update_many(
+            {"status": "running", "started_at": {"$lt": datetime.utcnow() - older_than}},
+            {"$set": {"status": "queued"}},
+        )
+        return result.modified_count
+
+    def size(self):
+        return self.collection.count_documents({"status": "queued"})
+
+# ---------------- Worker Pool ----------------
+class WorkerPool:
+    def __init__(self, task_queue, workers=RESUME_WORKERS, app=None):
+        self.task_queue = task_queue
+        self.workers = workers
+        self.app = app
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"task-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log.info("started background task workers", extra={"workers": self.workers, "queue": type(self.task_queue).__name__})
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        self.start()
+        try:
+            while any(t.is_alive() for t in self._threads):
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _run(self):
+        while not self._stop.is_set():
+            task = self.task_queue.get(timeout=1.0)
+            if task is None:
+                continue
+            self.run_task(task)
+
+    def run_task(self, task):
+        handler = HANDLERS.get(task["kind"])
+        if handler is None:
+            log.error("no handler registered for task kind", extra={"kind": task["kind"]})
+            self.task_queue.fail(task, "no handler")
+            return
+        started = time.perf_counter()
+        token = start_trace()
+        outcome = "ok"
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    handler(task["payload"])
+            else:
+                handler(task["payload"])
+            self.task_queue.ack(task)
+        except Exception as e:
+            outcome = "error"
+            log.exception("task failed", extra={"task_id": str(task["_id"]), "kind": task["kind"], "attempt": task["attempts"]})
+            self.task_queue.fail(task, e)
+        finally:
+            elapsed = time.perf_counter() - started
+            stages = end_trace(token)
+            TASK_SECONDS.observe(elapsed, kind=task["kind"], outcome=outcome)
+            log.info("task", extra={"task_id": str(task["_id"]), "kind": task["kind"], "outcome": outcome,
+                                    "duration_ms": round(elapsed * 1000, 2), "stages": stages})
+
+# ---------------- Process-wide Queue ----------------
+_task_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue():
+    global _task_queue
+    with _queue_lock:
+        if _task_queue is None:
+            if TASK_QUEUE_BACKEND == "mongo":
+                from utils.db import lazy_collection
+                _task_queue = MongoQueue(lazy_collection("tasks"))
+            else:
+                _task_queue = MemoryQueue()
+        return _task_queue
+
+def enqueue(kind, payload, priority=PRIORITY_NORMAL):
+    return get_queue().put(kind, payload, priority)
+
+def start_workers(app, workers=RESUME_WORKERS):
+    """Start in-process workers for the Flask app when RESUME_WORKER_MODE=thread."""
+    if RESUME_WORKER_MODE != "thread" or workers <= 0:
+        return None
+    return WorkerPool(get_queue(), workers=workers, app=app).start()
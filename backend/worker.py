@@ -0,0 +1,58 @@
+"""Standalone resume-analysis worker.
+
+Run alongside the API with a shared Mongo-backed queue:
+
+    TASK_QUEUE_BACKEND=mongo RESUME_WORKER_MODE=process python app.py
+    TASK_QUEUE_BACKEND=mongo python worker.py --workers 4
+
+Add ``--outbox`` to also drain the mail outbox from this process (pair it
+with ``OUTBOX_MODE=off`` on the API), and ``--search-sync`` to keep the
+candidate search index in step with Mongo (pair it with
+``SEARCH_SYNC_MODE=off``; the API processes then only read the index).
+"""
+import argparse, os
+
+# This process is the worker: importing the Flask app below must not start a
+# second set of in-process workers or outbox senders
+os.environ["RESUME_WORKER_MODE"] = "process"
+os.environ["OUTBOX_MODE"] = "off"
+
+from utils import task_queue
+from utils.task_queue import WorkerPool, get_queue, MongoQueue, RESUME_WORKERS
+from utils.mailer import OutboxSender
+from utils.search_index import start_search_sync
+import utils.resume_pipeline  # noqa: F401  (registers task handlers)
+import utils.rematch  # noqa: F401
+from utils.log import get_logger
+
+log = get_logger("worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI HR System background worker")
+    parser.add_argument("--workers", type=int, default=RESUME_WORKERS, help="number of worker threads")
+    parser.add_argument("--outbox", action="store_true", help="also run the mail outbox sender")
+    parser.add_argument("--search-sync", action="store_true", help="also write the search index")
+    args = parser.parse_args()
+
+    if task_queue.TASK_QUEUE_BACKEND != "mongo":
+        raise SystemExit("worker.py needs TASK_QUEUE_BACKEND=mongo to share tasks with the API process")
+
+    from app import create_app
+    # Only the app context is needed here; this process runs its own workers and sender
+    app = create_app(start_background=False)
+
+    queue = get_queue()
+    if isinstance(queue, MongoQueue):
+        requeued = queue.requeue_stale()
+        if requeued:
+            log.info("re-queued stale tasks", extra={"count": requeued})
+    if args.outbox:
+        OutboxSender().start()
+    if args.search_sync:
+        start_search_sync("thread")
+    WorkerPool(queue, workers=args.workers, app=app).run_forever()
+
+
+if __name__ == "__main__":
+    main()
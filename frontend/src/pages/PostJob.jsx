@@ -31,19 +31,49 @@ export default function PostJob() {
     }
 
     setLoading(true);
+    setCopied(false);
     try {
-      const res = await axios.post("http://127.0.0.1:5000/api/generate-jd", {
-        title: form.title,
-        skills: form.skills,
-        experience: form.experience,
+      // Stream the description (Server-Sent Events) so text shows up as it is generated
+      const res = await fetch("http://127.0.0.1:5000/api/generate-jd/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          title: form.title,
+          skills: form.skills,
+          experience: form.experience,
+        }),
       });
-
-      const jd = res.data.description;
-      setForm({ ...form, description: jd });
-      setCopied(false);
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error(data.error || "Unknown error");
+      }
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let jd = "";
+      setForm((prev) => ({ ...prev, description: "" }));
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const eventLine = raw.split("\n").find((line) => line.startsWith("event: "));
+          const dataLine = raw.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine.slice(6));
+          const event = eventLine ? eventLine.slice(7) : "message";
+          if (event === "error") throw new Error(data.error);
+          jd = event === "done" ? data.description : jd + data.text;
+          setForm((prev) => ({ ...prev, description: jd }));
+        }
+      }
     } catch (err) {
-      console.error(err.response?.data || err);
-      alert(`Error generating description: ${err.response?.data?.error || "Unknown error"}`);
+      console.error(err);
+      alert(`Error generating description: ${err.message || "Unknown error"}`);
     } finally {
       setLoading(false);
     }